@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from hackathon.live import websocket_application  # noqa: E402  (needs the app registry loaded)
+from hackathon.reaper import start_reaper  # noqa: E402
+
+start_reaper()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
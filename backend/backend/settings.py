@@ -43,8 +43,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
+    # First, so CORS preflights are answered before anything else runs
     'hackathon.middleware.CorsMiddleware',
+    # Next, so its latencies cover everything below (including micro-cache hits)
+    'hackathon.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'hackathon.middleware.CompressionMiddleware',
+    'hackathon.middleware.ReadCacheMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,6 +99,92 @@ DATABASE_ROUTERS = [
 ]
 
 
+# Word cloud game
+# 'batched' queues validated responses and writes them in the background (hackathon/ingest.py)
+RESPONSE_INGEST_MODE = os.getenv('RESPONSE_INGEST_MODE', 'sync')
+
+# Stages applied to submitted words (hackathon/wordnorm.py); 'block' rejects WORD_BLOCKLIST
+# and profanity. 'light_stem' (plurals) and 'stopwords' are opt-in: the cloud shows the
+# normalized form. Re-run `manage.py renormalize_words` after changing them.
+WORD_NORMALIZATION_STAGES = ('nfkc_casefold', 'fold_accents', 'block')
+WORD_BLOCKLIST = [word.strip() for word in os.getenv('WORD_BLOCKLIST', '').split(',') if word.strip()]
+
+# Disk tier of the rendered wordcloud.svg/.png cache (hackathon/render.py); empty disables it
+WORDCLOUD_RENDER_CACHE_DIR = os.getenv('WORDCLOUD_RENDER_CACHE_DIR', str(BASE_DIR / 'render_cache'))
+
+# Identical GETs of the public round read endpoints within this window share one
+# response (hackathon/middleware.py); 0 disables the micro-cache
+READ_CACHE_TTL_SECONDS = float(os.getenv('READ_CACHE_TTL_SECONDS', '0.5'))
+# Smaller responses are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+# OTP gateway client (hackathon/otp_gateway.py); the URL and auth header come from
+# OTP_GATEWAY_URL / OTP_GATEWAY_AUTH_HEADER
+OTP_GATEWAY_CONNECT_TIMEOUT = float(os.getenv('OTP_GATEWAY_CONNECT_TIMEOUT', '2'))
+OTP_GATEWAY_READ_TIMEOUT = float(os.getenv('OTP_GATEWAY_READ_TIMEOUT', '8'))
+OTP_GATEWAY_MAX_RETRIES = 2
+OTP_GATEWAY_MAX_CONNECTIONS = 10
+
+# Login password checks (hackathon/password_pool.py), per server process: worker
+# processes (0 = on the request thread) and logins running or queued before new
+# ones get a 503
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', '2'))
+PASSWORD_MAX_PENDING = int(os.getenv('PASSWORD_MAX_PENDING', '16'))
+# Scheme and work factor of new password hashes (hackathon/hashers.py): 'pbkdf2_sha256'
+# or 'scrypt' (N must be a power of two). Existing hashes are upgraded at their next
+# successful login.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', '260000'))
+PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', str(2 ** 15)))
+
+# Deleting dead sessions and OTP challenges (hackathon/reaper.py, `manage.py reap_auth`):
+# rows are kept this long after expiring / being revoked or consumed, and deleted in
+# batches of this size. A positive interval also reaps from a thread of each server process.
+REAPER_RETENTION_HOURS = float(os.getenv('REAPER_RETENTION_HOURS', '24'))
+REAPER_BATCH_SIZE = 1000
+REAPER_BATCH_PAUSE_SECONDS = 0.05
+REAPER_INTERVAL_SECONDS = float(os.getenv('REAPER_INTERVAL_SECONDS', '0'))
+
+# Sessions are cached per process (hackathon/session_cache.py); logouts and imports done
+# by other processes are picked up this often
+SESSION_REVOCATION_POLL_SECONDS = float(os.getenv('SESSION_REVOCATION_POLL_SECONDS', '1'))
+
+# Phone/email -> team accounts lookups of login and OTP requests are cached this long
+# per process (hackathon/identity.py); 0 disables the cache. Team changes made by other
+# processes clear it within SESSION_REVOCATION_POLL_SECONDS; the TTL bounds the rest
+IDENTITY_CACHE_TTL_SECONDS = float(os.getenv('IDENTITY_CACHE_TTL_SECONDS', '30'))
+
+# Request metrics (hackathon/metrics.py): /api/_metrics answers scrapers presenting this
+# bearer token (unset: the endpoint is off), and slower requests are logged with their SQL
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_SLOW_REQUEST_SECONDS = float(os.getenv('METRICS_SLOW_REQUEST_SECONDS', '1'))
+
+# Per-client limits on the login, OTP and respond endpoints (hackathon/ratelimit.py):
+# scope -> key -> rate(s) as 'count/period'. Excess requests get a 429 with Retry-After.
+# A venue puts every team behind one NAT address, so the per-identifier/member limits
+# do the work and the 'ip' ones are loose ceilings (respond: anonymous requests only).
+# Keys are checked in order, so a throttled identifier spends none of its address's budget.
+RATE_LIMITS = {
+    'login': {'identifier': ('5/m', '30/h'), 'ip': '600/m'},
+    'otp_request': {'identifier': ('3/m', '10/h'), 'ip': '200/m'},
+    'otp_verify': {'challenge': '5/5m', 'ip': '600/m'},
+    'respond': {'member': '20/m', 'ip': '600/m'},
+}
+# Counters per process ('hackathon.ratelimit.InMemoryBackend') or shared through the
+# RATE_LIMIT_CACHE cache ('hackathon.ratelimit.CacheBackend')
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'hackathon.ratelimit.InMemoryBackend')
+RATE_LIMIT_CACHE = 'default'
+# Behind a reverse proxy: the header it puts the client address in (e.g. 'X-Forwarded-For')
+RATE_LIMIT_CLIENT_IP_HEADER = os.getenv('RATE_LIMIT_CLIENT_IP_HEADER', '')
+
+# Route the hot round endpoints and the OTP endpoints to their native async views
+# (hackathon/async_views.py); turn on only when serving through ASGI
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', '') == '1'
+
+# Dotted path of the pub/sub backend behind the live update streams (hackathon/live.py)
+LIVE_UPDATES_BACKEND = os.getenv('LIVE_UPDATES_BACKEND', 'hackathon.live.InMemoryBackend')
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+from hackathon.reaper import start_reaper  # noqa: E402  (needs the app registry loaded)
+
+start_reaper()
@@ -0,0 +1,144 @@
+"""Sync vs async round views under ASGI, driven in-process (no server or HTTP client needed).
+
+Usage:
+    python benchmarks/bench_async_views.py --round 12 --requests 5000 --concurrency 500
+
+Runs the same polling workload through ``backend.asgi.application`` twice, with
+ASYNC_VIEWS=0 and ASYNC_VIEWS=1, each in a fresh interpreter (the URLconf picks
+the views at import). Clients poll the round detail, ``/wordcloud`` and
+``/leaderboard``; after their first poll they send the ETag back, so most
+requests end in a 304 as they do in production. The read micro-cache is turned
+off (READ_CACHE_TTL_SECONDS=0) so the views themselves are measured. Uses the
+database from DJANGO_SETTINGS_MODULE (default ``backend.settings``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def _get(application, path: str, etag: str | None) -> tuple[int, str | None]:
+    headers = [(b'host', b'localhost')]
+    if etag:
+        headers.append((b'if-none-match', etag.encode()))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client never disconnects; Django cancels this once the response is sent.
+        await asyncio.Future()
+
+    status, response_etag = 0, None
+
+    async def send(message):
+        nonlocal status, response_etag
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            headers = {name.lower(): value for name, value in message['headers']}
+            response_etag = headers.get(b'etag', b'').decode() or None
+
+    await application(scope, receive, send)
+    return status, response_etag
+
+
+async def _run(round_id: int, requests: int, concurrency: int) -> dict:
+    from backend.asgi import application
+
+    paths = [f'/api/rounds/{round_id}', f'/api/rounds/{round_id}/wordcloud', f'/api/rounds/{round_id}/leaderboard']
+    statuses: Counter[int] = Counter()
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+
+    async def client() -> None:
+        etags: dict[str, str] = {}
+        for i in remaining:
+            path = paths[i % len(paths)]
+            started = time.perf_counter()
+            status, etag = await _get(application, path, etags.get(path))
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+            if etag:
+                etags[path] = etag
+
+    await _get(application, paths[0], None)  # warm up connections and in-process stores
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': requests,
+        'wall': wall,
+        'mean': statistics.mean(latencies),
+        'p50': _percentile(latencies, 50),
+        'p99': _percentile(latencies, 99),
+        'statuses': dict(statuses),
+    }
+
+
+def _worker(args: argparse.Namespace) -> None:
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    print(json.dumps(asyncio.run(_run(args.round_id, args.requests, args.concurrency))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--round', dest='round_id', type=int, required=True)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        _worker(args)
+        return
+
+    for label, flag in (('sync views', '0'), ('async views', '1')):
+        env = {**os.environ, 'ASYNC_VIEWS': flag, 'READ_CACHE_TTL_SECONDS': '0'}
+        out = subprocess.run(
+            [sys.executable, __file__, '--worker', '--round', str(args.round_id),
+             '--requests', str(args.requests), '--concurrency', str(args.concurrency)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(
+            f'{label:<12} {result["requests"] / result["wall"]:>8,.0f} req/s  '
+            f'latency ms: mean {result["mean"] * 1000:.1f}, p50 {result["p50"] * 1000:.1f}, '
+            f'p99 {result["p99"] * 1000:.1f}  '
+            'status codes: ' + ', '.join(f'{code}: {count}' for code, count in sorted(result['statuses'].items()))
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+"""Throughput and latency of the hot game endpoints on a seeded database, with regression checks.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--engines sqlite,mysql] [--teams 500] [--members 4]
+        [--responses 2000] [--requests 2000] [--logins 100] [--concurrency 32] [--output results.json]
+    python benchmarks/bench_endpoints.py --output new.json --baseline old.json
+
+Each engine runs in a fresh interpreter. ``sqlite`` migrates throwaway database
+files. ``mysql`` uses the databases from ``backend/settings.py`` (the DB_* and
+STUDENT_DB_* env vars); it is skipped when they cannot be reached. Its rows are
+seeded under ``bench-`` usernames and deleted afterwards.
+
+The seed is made from the real models:
+- ``--teams`` teams of ``--members`` members, each member with a session.
+- An active round holding ``--responses`` responses, with their scores and
+  round counters.
+- ``--rounds`` rounds per team for the my-rounds listing.
+
+``--concurrency`` client threads then drive each scenario through Django's
+request handler, in-process (no server needed):
+
+    wordcloud    GET /api/rounds/<id>/wordcloud on the seeded round
+    leaderboard  GET /api/rounds/<id>/leaderboard on the seeded round
+    my_rounds    GET /api/rounds/my, as a different member each time
+    submit       POST /api/rounds/<id>/respond, each member answering once
+    login        POST /api/login by phone, at the configured password hasher cost
+
+Rate limits and the read micro-cache are off, so the views themselves are
+measured. ASYNC_VIEWS, RESPONSE_INGEST_MODE and the PASSWORD_* settings come from
+the environment, as in production.
+
+``--output`` writes the results as JSON. Given ``--baseline`` (an earlier
+output), each scenario is compared with it. The exit status is 1 when
+throughput drops by more than ``--max-throughput-drop``, p99 grows by more than
+``--max-p99-increase``, or the share of failed requests (anything but 2xx/304,
+such as the login pool's 503s) rises by more than ``--max-error-increase``.
+Throughput and latency count answered requests only.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+ENGINES = ('sqlite', 'mysql')
+SCENARIOS = ('wordcloud', 'leaderboard', 'my_rounds', 'submit', 'login')
+# Run once untimed first (connections, in-process stores, the password pool); a
+# warm-up submit would use up the members' one answer per round
+WARMED_UP = ('wordcloud', 'leaderboard', 'my_rounds', 'login')
+OK_STATUSES = {200, 201, 202, 304}
+
+PREFIX = 'bench-'
+PASSWORD = 'Bench@123'
+WORDS = [
+    'python', 'django', 'react', 'cloud', 'mysql', 'cache', 'queue', 'async', 'index', 'speed',
+    'latency', 'thread', 'socket', 'kernel', 'vector', 'tensor', 'lambda', 'docker', 'rust', 'golang',
+]
+BATCH_SIZE = 1000
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+@dataclass
+class Seeded:
+    read_round_id: int
+    submit_round_ids: list[int]
+    phones: list[str]  # One per member, in seeding order
+    tokens: list[str]  # Session token of each member, same order
+
+
+def _phone(team_no: int, member: int) -> str:
+    # Leading zeros keep the seeded numbers clear of real ones in a shared database
+    return f'000{team_no:07d}{member:02d}'
+
+
+def seed(*, teams: int, members: int, responses: int, rounds: int, submit_rounds: int) -> Seeded:
+    """Create the benchmark's teams, members, sessions, rounds and responses."""
+    from django.db.models import Max
+
+    from hackathon.auth import create_session_token, get_session_times, hash_session_token
+    from hackathon.hashers import get_hasher
+    from hackathon.management.commands.recount_rounds import COUNTER_FIELDS, compute_round_counters
+    from hackathon.models import AppUser, AppUserMember, AuthSession, GameRound, PlayerScore, Response
+    from hackathon.wordnorm import normalize_word
+
+    rng = random.Random(0)
+    first_team = (AppUser.objects.aggregate(last=Max('team_no'))['last'] or 0) + 1
+    # One hash for every team keeps seeding fast; each login still pays the full cost
+    password = get_hasher().encode(PASSWORD).as_fields()
+    AppUser.objects.bulk_create(
+        [AppUser(team_no=first_team + n, username=f'{PREFIX}{first_team + n}', **password) for n in range(teams)],
+        batch_size=BATCH_SIZE,
+    )
+    # MySQL does not return ids from bulk_create: read the rows back
+    users = list(AppUser.objects.filter(team_no__gte=first_team, username__startswith=PREFIX).order_by('team_no'))
+    AppUserMember.objects.bulk_create(
+        [
+            AppUserMember(
+                user=user,
+                name=f'Member {m + 1} of {user.username}',
+                email=f'{user.username}-{m + 1}@bench.invalid',
+                email_normalized=f'{user.username}-{m + 1}@bench.invalid',
+                phone=_phone(user.team_no, m + 1),
+            )
+            for user in users
+            for m in range(members)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    all_members = list(AppUserMember.objects.filter(user__in=users).select_related('user').order_by('user__team_no', 'id'))
+
+    times = get_session_times()
+    tokens = [create_session_token() for _ in all_members]
+    AuthSession.objects.bulk_create(
+        [
+            AuthSession(
+                user=member.user,
+                member=member,
+                token_hash=hash_session_token(token),
+                created_at=times.created_at,
+                expires_at=times.expires_at,
+            )
+            for member, token in zip(all_members, tokens)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    host = users[0]
+    GameRound.objects.bulk_create(
+        [
+            GameRound(creator=user, question=f'Benchmark round {r + 1} of {user.username}')
+            for user in users
+            for r in range(rounds)
+        ]
+        + [GameRound(creator=host, question='Benchmark read round')]
+        + [GameRound(creator=host, question=f'Benchmark submit round {r + 1}') for r in range(submit_rounds)],
+        batch_size=BATCH_SIZE,
+    )
+    round_ids = list(
+        GameRound.objects.filter(creator=host, question__startswith='Benchmark ').exclude(
+            question__startswith='Benchmark round '
+        ).order_by('id').values_list('id', flat=True)
+    )
+    read_round_id, submit_round_ids = round_ids[0], round_ids[1:]
+
+    # A few words take most answers, as in a real round
+    checked = {word: normalize_word(word) for word in WORDS}
+    answers = []
+    for i in range(responses):
+        word = checked[WORDS[int(len(WORDS) * rng.random() ** 2)]]
+        member = all_members[i] if i < len(all_members) else None  # The rest answer anonymously
+        answers.append(Response(round_id=read_round_id, member=member, word=word.word, word_normalized=word.normalized))
+    Response.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+    PlayerScore.objects.bulk_create(
+        [
+            PlayerScore(round_id=read_round_id, member=answer.member, response_points=1, total_points=1)
+            for answer in answers
+            if answer.member is not None
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    read_round = GameRound.objects.get(id=read_round_id)
+    for name, value in compute_round_counters([read_round_id])[read_round_id].items():
+        setattr(read_round, name, value)
+    read_round.version = read_round.response_count
+    read_round.save(update_fields=[*COUNTER_FIELDS, 'version'])
+
+    return Seeded(
+        read_round_id=read_round_id,
+        submit_round_ids=submit_round_ids,
+        phones=[member.phone for member in all_members],
+        tokens=tokens,
+    )
+
+
+def delete_seed() -> None:
+    from hackathon.models import AppUser
+
+    # Cascades to members, sessions, rounds, responses and scores
+    AppUser.objects.filter(username__startswith=PREFIX).delete()
+
+
+def _requests_for(scenario: str, seeded: Seeded) -> Callable[[int], tuple]:
+    """``i -> (method, path, body, token)`` for request ``i`` of ``scenario``."""
+    members = len(seeded.tokens)
+    read = seeded.read_round_id
+    if scenario == 'wordcloud':
+        return lambda i: ('GET', f'/api/rounds/{read}/wordcloud', None, None)
+    if scenario == 'leaderboard':
+        return lambda i: ('GET', f'/api/rounds/{read}/leaderboard', None, None)
+    if scenario == 'my_rounds':
+        return lambda i: ('GET', '/api/rounds/my', None, seeded.tokens[i % members])
+    if scenario == 'submit':
+        return lambda i: (
+            'POST',
+            f'/api/rounds/{seeded.submit_round_ids[i // members]}/respond',
+            {'word': WORDS[i % len(WORDS)]},
+            seeded.tokens[i % members],
+        )
+    if scenario == 'login':
+        return lambda i: ('POST', '/api/login', {'username': seeded.phones[i % members], 'password': PASSWORD}, None)
+    raise ValueError(f'Unknown scenario {scenario!r}')
+
+
+def run_scenario(scenario: str, seeded: Seeded, requests: int, concurrency: int) -> dict:
+    from django.db import close_old_connections
+    from django.test import Client
+
+    build = _requests_for(scenario, seeded)
+    local = threading.local()
+    statuses: Counter[int] = Counter()
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(raise_request_exception=False, HTTP_HOST='localhost')
+        method, path, body, token = build(i)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        started = time.perf_counter()
+        if method == 'GET':
+            response = client.get(path, headers=headers)
+        else:
+            response = client.post(path, data=json.dumps(body), content_type='application/json', headers=headers)
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[response.status_code] += 1
+            if response.status_code in OK_STATUSES:
+                latencies.append(elapsed)
+
+    def close(_: int) -> None:
+        close_old_connections()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - started
+        # Each client thread holds its own connection; release them before the next scenario
+        list(pool.map(close, range(concurrency)))
+
+    # Throughput and latency count answered requests only: fast 429s/503s are not a speed-up
+    latencies.sort()
+    return {
+        'requests': requests,
+        'seconds': wall,
+        'throughput': len(latencies) / wall,
+        'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'errors': requests - len(latencies),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def _configure(engine: str, workdir: str) -> None:
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ['READ_CACHE_TTL_SECONDS'] = '0'
+
+    from django.conf import settings
+
+    settings.RATE_LIMITS = {}
+    if engine == 'sqlite':
+        # IMMEDIATE transactions queue concurrent writers on the busy timeout instead of failing
+        options = {'timeout': 30, 'transaction_mode': 'IMMEDIATE'}
+        settings.DATABASES = {
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(workdir, f'{alias}.sqlite3'), 'OPTIONS': options}
+            for alias in ('default', 'student')
+        }
+        settings.WORDCLOUD_RENDER_CACHE_DIR = os.path.join(workdir, 'render_cache')
+
+    import django
+
+    django.setup()
+
+
+def _worker(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory(prefix='wordcloud-bench-') as workdir:
+        try:
+            _configure(args.engine, workdir)
+            from django.db import connections
+
+            for alias in connections:
+                connections[alias].ensure_connection()
+        except Exception as exc:  # noqa: BLE001 - a missing driver or unreachable server means "not available"
+            print(json.dumps({'skipped': f'{type(exc).__name__}: {exc}'.splitlines()[0]}))
+            return
+        from django.core.management import call_command
+
+        for alias in connections:
+            call_command('migrate', database=alias, verbosity=0)
+
+        members = args.teams * args.members
+        if args.engine == 'mysql':
+            delete_seed()  # Left over from an interrupted run
+        started = time.perf_counter()
+        seeded = seed(
+            teams=args.teams,
+            members=args.members,
+            responses=args.responses,
+            rounds=args.rounds,
+            submit_rounds=-(-args.requests // members),
+        )
+        seed_seconds = time.perf_counter() - started
+
+        results = {}
+        try:
+            for scenario in args.scenarios:
+                requests = args.logins if scenario == 'login' else args.requests
+                if scenario in WARMED_UP:
+                    run_scenario(scenario, seeded, min(requests, args.concurrency), args.concurrency)
+                results[scenario] = run_scenario(scenario, seeded, requests, args.concurrency)
+        finally:
+            if args.engine == 'mysql':
+                delete_seed()
+            connections.close_all()
+
+        print(json.dumps({
+            'vendor': connections['default'].vendor,
+            'seed_seconds': seed_seconds,
+            'scenarios': results,
+        }))
+
+
+def compare(
+    current: dict, baseline: dict, *, max_throughput_drop: float, max_p99_increase: float, max_error_increase: float
+) -> list[str]:
+    """Scenarios that regressed against ``baseline``, as printable lines."""
+    regressions = []
+    for engine, result in current['engines'].items():
+        before = baseline.get('engines', {}).get(engine, {}).get('scenarios', {})
+        for scenario, now in result.get('scenarios', {}).items():
+            then = before.get(scenario)
+            if not then:
+                continue
+            throughput_change = now['throughput'] / then['throughput'] - 1 if then['throughput'] else 0.0
+            p99_change = now['p99_ms'] / then['p99_ms'] - 1 if then['p99_ms'] else 0.0
+            error_rates = now['errors'] / now['requests'], then['errors'] / then['requests']
+            line = (
+                f'{engine:<7} {scenario:<12} throughput {throughput_change:+7.1%}  p99 {p99_change:+7.1%}  '
+                f'errors {error_rates[1]:.1%} -> {error_rates[0]:.1%}'
+            )
+            print(line)
+            if (
+                -throughput_change > max_throughput_drop
+                or p99_change > max_p99_increase
+                or error_rates[0] > error_rates[1] + max_error_increase
+            ):
+                regressions.append(line)
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', default='sqlite,mysql', help='Comma-separated, from: ' + ', '.join(ENGINES))
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--teams', type=int, default=500)
+    parser.add_argument('--members', type=int, default=4, help='Members per team')
+    parser.add_argument('--responses', type=int, default=2000, help='Responses in the read round')
+    parser.add_argument('--rounds', type=int, default=3, help='Rounds created by each team')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario, except login')
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--output', type=Path, help='Write the results to this JSON file')
+    parser.add_argument('--baseline', type=Path, help='Earlier --output to compare against')
+    parser.add_argument('--max-throughput-drop', type=float, default=0.15, help='Allowed fraction (default 0.15)')
+    parser.add_argument('--max-p99-increase', type=float, default=0.25, help='Allowed fraction (default 0.25)')
+    parser.add_argument(
+        '--max-error-increase', type=float, default=0.01, help='Allowed rise in the failed-request fraction (default 0.01)'
+    )
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--engine', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    if args.worker:
+        _worker(args)
+        return
+
+    document = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            name: getattr(args, name)
+            for name in ('teams', 'members', 'responses', 'rounds', 'requests', 'logins', 'concurrency')
+        },
+        'env': {
+            name: os.environ.get(name, '')
+            for name in ('ASYNC_VIEWS', 'RESPONSE_INGEST_MODE', 'PASSWORD_HASHER', 'PASSWORD_PBKDF2_ITERATIONS', 'PASSWORD_POOL_WORKERS')
+        },
+        'engines': {},
+    }
+    for engine in (name for name in args.engines.split(',') if name):
+        if engine not in ENGINES:
+            parser.error(f'unknown engine {engine!r}')
+        command = [
+            sys.executable, __file__, '--worker', '--engine', engine, '--scenarios', ','.join(args.scenarios),
+            *(f'--{name}={getattr(args, name)}' for name in document['config']),
+        ]
+        out = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        document['engines'][engine] = result
+        if 'skipped' in result:
+            print(f'{engine}: skipped ({result["skipped"]})')
+            continue
+        print(f'{engine} ({result["vendor"]}): seeded in {result["seed_seconds"]:.1f}s')
+        for scenario, r in result['scenarios'].items():
+            print(
+                f'  {scenario:<12} {r["throughput"]:>8,.0f} req/s  '
+                f'latency ms: mean {r["mean_ms"]:.1f}, p50 {r["p50_ms"]:.1f}, p99 {r["p99_ms"]:.1f}  '
+                'status codes: ' + ', '.join(f'{code}: {count}' for code, count in r['statuses'].items())
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2) + '\n')
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        for key in ('config', 'env'):
+            if baseline.get(key) != document[key]:
+                print(f'Note: {key} differs from the baseline ({baseline.get(key)} vs {document[key]})')
+        regressions = compare(
+            document,
+            baseline,
+            max_throughput_drop=args.max_throughput_drop,
+            max_p99_increase=args.max_p99_increase,
+            max_error_increase=args.max_error_increase,
+        )
+        if regressions:
+            print(f'{len(regressions)} regression(s) against {args.baseline}:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
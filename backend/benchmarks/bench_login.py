@@ -0,0 +1,91 @@
+"""Login password-check throughput versus password pool size.
+
+Usage:
+    python benchmarks/bench_login.py [--logins 200] [--concurrency 32] [--pools 0,1,2,4,8] [--max-pending 16]
+
+Runs ``PasswordVerifier.verify`` from ``--concurrency`` threads (standing in for
+request threads) at the production PBKDF2 iteration count, once per pool size
+(0 = on the calling thread, unbounded by processes). Logins refused by admission
+control are counted as 503s; they are what keeps the accepted ones' latency flat.
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from django.conf import settings  # noqa: E402
+
+settings.configure()
+
+from hackathon.auth import PBKDF2_ITERATIONS  # noqa: E402
+from hackathon.hashers import PBKDF2Hasher  # noqa: E402
+from hackathon.password_pool import LoginOverloaded, PasswordVerifier  # noqa: E402
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(workers: int, logins: int, concurrency: int, max_pending: int, candidates: list) -> None:
+    verifier = PasswordVerifier(workers=workers, max_pending=max_pending)
+    verifier.verify('warm-up', candidates[:1])  # start the pool outside the timing
+    latencies: list[float] = []
+    rejected = 0
+    lock = threading.Lock()
+
+    def one(_: int) -> None:
+        nonlocal rejected
+        started = time.perf_counter()
+        try:
+            verifier.verify('Team@001', candidates)
+        except LoginOverloaded:
+            with lock:
+                rejected += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(logins)))
+    wall = time.perf_counter() - started
+    verifier.shutdown()
+
+    latencies.sort()
+    mean = statistics.mean(latencies) if latencies else 0.0
+    print(
+        f'pool {workers:>2}: {len(latencies) / wall:7.1f} logins/sec  '
+        f'latency ms: mean {mean * 1000:7.1f}, p50 {_percentile(latencies, 50) * 1000:7.1f}, '
+        f'p99 {_percentile(latencies, 99) * 1000:7.1f}  503s: {rejected}'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--pools', default='0,1,2,4,8')
+    parser.add_argument('--max-pending', type=int, default=16)
+    parser.add_argument('--candidates', type=int, default=1, help='Accounts sharing the login (one PBKDF2 run each)')
+    parser.add_argument('--iterations', type=int, default=PBKDF2_ITERATIONS)
+    args = parser.parse_args()
+
+    # The matching account is checked last, as when a phone is on several teams.
+    hasher = PBKDF2Hasher(args.iterations)
+    candidates = [hasher.encode(f'other{i}') for i in range(args.candidates - 1)]
+    candidates.append(hasher.encode('Team@001'))
+    print(f'{args.logins} logins, {args.concurrency} concurrent, {len(candidates)} hash(es) each at {args.iterations} iterations')
+    for workers in (int(value) for value in args.pools.split(',')):
+        run(workers, args.logins, args.concurrency, args.max_pending, candidates)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Micro-benchmark of word normalization.
+
+Usage:
+    python benchmarks/bench_normalize.py [--words 200000] [--vocabulary 2000]
+
+Compares the old inline ``re.sub`` + ``lower()`` against the ``WordNormalizer``
+pipeline, cold (cache cleared before every word) and warm (a realistic round
+where most answers repeat).
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from django.conf import settings  # noqa: E402
+
+settings.configure()
+
+from hackathon.wordnorm import WordNormalizer  # noqa: E402
+
+SAMPLES = ['Café', 'cafe', 'CAFE!', 'cafés', 'Python', 'pythons', 'Straße', 'naïve', 'Cities', 'cloud-native', 'AI']
+
+
+def legacy(word: str) -> str:
+    word_clean = re.sub(r'[^\w\s-]', '', word.strip())
+    return word_clean.lower()
+
+
+def timed(label: str, fn, words: list[str]) -> None:
+    started = time.perf_counter()
+    for word in words:
+        fn(word)
+    elapsed = time.perf_counter() - started
+    print(f'{label:<28} {len(words) / elapsed:>12,.0f} words/sec  {elapsed * 1e6 / len(words):7.2f} us/word')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, default=200000)
+    parser.add_argument('--vocabulary', type=int, default=2000, help='Distinct submissions in the warm run')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f'{rng.choice(SAMPLES)}{i}' if i >= len(SAMPLES) else SAMPLES[i] for i in range(args.vocabulary)]
+    words = [rng.choice(vocabulary) for _ in range(args.words)]
+
+    normalizer = WordNormalizer()
+
+    def cold(word: str) -> None:
+        normalizer.cache_clear()
+        normalizer.normalize(word)
+
+    timed('legacy re.sub + lower', legacy, words)
+    timed('pipeline, cold cache', cold, words[: args.words // 10])
+    normalizer.cache_clear()
+    timed('pipeline, warm cache', normalizer.normalize, words)
+    print(normalizer.cache_info())
+
+    normalizer.cache_clear()
+    started = time.perf_counter()
+    normalizer.normalize_many(words)
+    elapsed = time.perf_counter() - started
+    print(f'{"normalize_many, one batch":<28} {len(words) / elapsed:>12,.0f} words/sec')
+
+
+if __name__ == '__main__':
+    main()
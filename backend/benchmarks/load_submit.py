@@ -0,0 +1,92 @@
+"""Burst load against POST /api/rounds/<id>/respond on a running server.
+
+Usage:
+    python benchmarks/load_submit.py --round 12 --requests 5000 --concurrency 64
+    python benchmarks/load_submit.py --round 12 --tokens tokens.txt
+
+Each line of the tokens file is a session token; every token submits once (members
+can only answer a round once), and requests beyond the token count are anonymous.
+Compare RESPONSE_INGEST_MODE=sync against RESPONSE_INGEST_MODE=batched.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+WORDS = ['python', 'django', 'react', 'cloud', 'mysql', 'cache', 'queue', 'async', 'index', 'speed']
+
+
+def _post(url: str, word: str, token: str | None) -> tuple[int, float]:
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    request = urllib.request.Request(url, data=json.dumps({'word': word}).encode(), headers=headers, method='POST')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--round', dest='round_id', type=int, required=True)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--tokens', type=Path, help='File with one session token per line')
+    args = parser.parse_args()
+
+    tokens = []
+    if args.tokens:
+        tokens = [line.strip() for line in args.tokens.read_text().splitlines() if line.strip()]
+    url = f'{args.base_url.rstrip("/")}/api/rounds/{args.round_id}/respond'
+
+    statuses: Counter[int] = Counter()
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def one(i: int) -> None:
+        token = tokens[i] if i < len(tokens) else None
+        status, elapsed = _post(url, WORDS[i % len(WORDS)], token)
+        with lock:
+            statuses[status] += 1
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    print(f'{args.requests} submits in {wall:.2f}s -> {args.requests / wall:.0f} submits/sec')
+    print(
+        'latency ms: '
+        f'mean {statistics.mean(latencies) * 1000:.1f}, '
+        f'p50 {_percentile(latencies, 50) * 1000:.1f}, '
+        f'p95 {_percentile(latencies, 95) * 1000:.1f}, '
+        f'p99 {_percentile(latencies, 99) * 1000:.1f}'
+    )
+    print('status codes: ' + ', '.join(f'{code}: {count}' for code, count in sorted(statuses.items())))
+
+
+if __name__ == '__main__':
+    main()
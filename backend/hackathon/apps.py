@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HackathonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hackathon'
+
+    def ready(self):
+        # Counts queries per request from the first DB connection on
+        from . import metrics  # noqa: F401
@@ -0,0 +1,256 @@
+"""Native async versions of the hot round endpoints and the OTP endpoints, for ASGI deployments.
+
+``urls.py`` routes to these instead of the classes of the same name in ``views.py``
+when ``ASYNC_VIEWS`` is on; URLs, payloads, ETags and errors are identical. Reads
+go through the async ORM, so a poll answered with a 304 costs one query and holds
+no worker thread. Writes that need a transaction (storing a response, recording a
+share) run in a thread via ``sync_to_async``: the async ORM has no transactions.
+The OTP gateway calls get threads of their own (``adispatch_otp``), so a slow
+gateway does not hold up the thread those writes share.
+
+Under WSGI keep ``ASYNC_VIEWS`` off; Django would run each of these in its own
+event loop.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+from .auth import OtpDispatchError, OtpVerifyError, adispatch_otp, averify_otp_via_gateway
+from .finalize import RoundClosed, round_leaderboard_async, round_words_async, round_words_since_async
+from .ingest import DUPLICATE, QUEUED, batched_ingest_enabled, response_ingestor, store_response
+from .metrics import JsonResponse as TimedJsonResponse
+from .models import GameRound, Response
+from .ratelimit import client_ip
+from .views import (
+    _consume_otp_challenge,
+    _gateway_failure,
+    _get_session_async,
+    _issue_otp_challenge,
+    _json_body,
+    _my_rank,
+    _not_modified,
+    _otp_challenge,
+    _otp_request_target,
+    _record_share,
+    _round_detail,
+    _round_etag,
+    _throttled,
+    _with_etag,
+)
+from .wordnorm import normalize_word
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _get_round(round_id: int):
+    return await GameRound.objects.filter(id=round_id).defer('snapshot').afirst()
+
+
+class ApiRoundDetailView(View):
+    """Get details of a specific round"""
+    async def get(self, request: HttpRequest, round_id: int) -> JsonResponse:
+        round_obj = await _get_round(round_id)
+        if not round_obj:
+            return JsonResponse({'error': 'Round not found'}, status=404)
+
+        etag = _round_etag(round_obj)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        return _with_etag(TimedJsonResponse(_round_detail(round_obj)), etag, final=round_obj.status == 'closed')
+
+
+class ApiSubmitResponseView(View):
+    """Submit a single-word response to a round; see ``views.ApiSubmitResponseView`` for what a 202 means."""
+    async def post(self, request: HttpRequest, round_id: int) -> JsonResponse:
+        try:
+            # Get session but don't require it (allow anonymous responses)
+            session = await _get_session_async(request)
+            member = session.member if session else None
+            # Members are limited one by one; the address limit is for anonymous requests
+            if member is not None:
+                throttled = _throttled('respond', member=str(member.id))
+            else:
+                throttled = _throttled('respond', ip=client_ip(request))
+            if throttled is not None:
+                return throttled
+
+            round_obj = await _get_round(round_id)
+            if not round_obj:
+                return JsonResponse({'error': 'Round not found'}, status=404)
+
+            if round_obj.status != 'active':
+                return JsonResponse({'error': 'This round is closed'}, status=400)
+
+            payload = _json_body(request)
+            checked = normalize_word(str(payload.get('word') or ''))
+            if checked.error:
+                return JsonResponse({'error': checked.error}, status=400)
+            word_clean, word_normalized = checked.word, checked.normalized
+
+            if batched_ingest_enabled():
+                result = await response_ingestor.asubmit(
+                    round_obj.id, member.id if member else None, word_clean, word_normalized
+                )
+                if result == DUPLICATE:
+                    return JsonResponse({'error': 'You have already responded to this round'}, status=400)
+                if result == QUEUED:
+                    return JsonResponse({
+                        'success': True,
+                        'word': word_clean,
+                        'message': 'Response submitted successfully'
+                    }, status=202)
+                # Queue full: fall through to the synchronous write
+
+            if member and await Response.objects.filter(round=round_obj, member=member).aexists():
+                return JsonResponse({'error': 'You have already responded to this round'}, status=400)
+
+            if await sync_to_async(store_response)(round_obj, member, word_clean, word_normalized) is None:
+                return JsonResponse({'error': 'This round is closed'}, status=400)
+
+            return JsonResponse({
+                'success': True,
+                'word': word_clean,
+                'message': 'Response submitted successfully'
+            }, status=201)
+        except Exception:
+            logger.exception('Storing a response failed')
+            return JsonResponse({'error': 'Internal server error'}, status=500)
+
+
+class ApiWordCloudDataView(View):
+    """Get word cloud data (word frequencies) for a round; see ``views.ApiWordCloudDataView``."""
+    async def get(self, request: HttpRequest, round_id: int) -> HttpResponse:
+        round_obj = await _get_round(round_id)
+        if not round_obj:
+            return JsonResponse({'error': 'Round not found'}, status=404)
+
+        etag = _round_etag(round_obj)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        since_raw = request.GET.get('since')
+        since = None
+        if since_raw is not None:
+            try:
+                since = int(since_raw)
+            except ValueError:
+                return JsonResponse({'error': 'Invalid since version'}, status=400)
+
+        final = round_obj.status == 'closed'
+        if final:
+            since = None
+        if since is None:
+            ranked, total = await round_words_async(round_obj)
+        else:
+            ranked, total = await round_words_since_async(round_obj, since)
+
+        data = {
+            'version': round_obj.version,
+            'words': [{'text': text, 'count': count} for text, count in ranked],
+            'total_responses': total
+        }
+        if since is not None:
+            data['since'] = since
+        return _with_etag(TimedJsonResponse(data), etag, final=final)
+
+
+class ApiRecordShareView(View):
+    """Record a share event and update player score"""
+    async def post(self, request: HttpRequest, round_id: int) -> JsonResponse:
+        session = await _get_session_async(request)
+        if session is None or session.member is None:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+        round_obj = await _get_round(round_id)
+        if not round_obj:
+            return JsonResponse({'error': 'Round not found'}, status=404)
+
+        # Points of a closed round are frozen in its snapshot
+        if round_obj.status != 'active':
+            return JsonResponse({'error': 'This round is closed'}, status=400)
+
+        try:
+            score = await sync_to_async(_record_share)(round_obj, session.member)
+        except RoundClosed:
+            return JsonResponse({'error': 'This round is closed'}, status=400)
+
+        return JsonResponse({
+            'success': True,
+            'total_shares': score.share_points,
+            'total_points': score.total_points
+        })
+
+
+class ApiLeaderboardView(View):
+    """Get leaderboard for a round; see ``views.ApiLeaderboardView``."""
+    AROUND_SIZE = 2
+
+    async def get(self, request: HttpRequest, round_id: int) -> HttpResponse:
+        member = None
+        if request.GET.get('me') == '1':
+            session = await _get_session_async(request)
+            if session is None or session.member is None:
+                return JsonResponse({'error': 'Unauthorized'}, status=401)
+            member = session.member
+
+        round_obj = await _get_round(round_id)
+        if not round_obj:
+            return JsonResponse({'error': 'Round not found'}, status=404)
+
+        etag = _round_etag(round_obj)
+        if member is not None:
+            etag = f'"{round_obj.id}-{round_obj.version}-m{member.id}"'
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        data = {'version': round_obj.version, 'leaderboard': await round_leaderboard_async(round_obj)}
+        if member is not None:
+            data['me'], data['around'] = await sync_to_async(_my_rank)(round_obj, member.id, self.AROUND_SIZE)
+
+        response = _with_etag(
+            TimedJsonResponse(data), etag, final=round_obj.status == 'closed', private=member is not None
+        )
+        if member is not None:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class ApiOtpRequestView(View):
+    async def post(self, request: HttpRequest) -> JsonResponse:
+        target = await sync_to_async(_otp_request_target)(request)
+        if isinstance(target, HttpResponse):
+            return target
+        member, channel, identifier = target
+
+        try:
+            await adispatch_otp(channel=channel, identifier=identifier, display_name=member.name)
+        except OtpDispatchError as exc:
+            return _gateway_failure(exc)
+
+        return await sync_to_async(_issue_otp_challenge)(member, identifier)
+
+
+class ApiOtpVerifyView(View):
+    async def post(self, request: HttpRequest) -> JsonResponse:
+        checked = await sync_to_async(_otp_challenge)(request)
+        if isinstance(checked, HttpResponse):
+            return checked
+        challenge, otp = checked
+
+        try:
+            ok = await averify_otp_via_gateway(identifier=challenge.identifier, otp=otp)
+        except OtpVerifyError as exc:
+            return _gateway_failure(exc)
+
+        if not ok:
+            return JsonResponse({'error': 'Invalid or expired OTP.'}, status=401)
+
+        return await sync_to_async(_consume_otp_challenge)(challenge)
@@ -1,18 +1,17 @@
 import base64
 import hashlib
 import hmac
-import json
 import os
 import secrets
-import urllib.error
-import urllib.parse
-import urllib.request
 from dataclasses import dataclass
 from datetime import timedelta
 from typing import Optional
 
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 
+from .otp_gateway import GatewayError, get_gateway
+
 
 SESSION_COOKIE_NAME = 'app_session'
 PBKDF2_ITERATIONS = 260000
@@ -79,102 +78,78 @@ def verify_otp_code(code: str, *, salt_b64: str, otp_hash_b64: str, iterations:
 
 
 class OtpDispatchError(RuntimeError):
-    pass
+    # Set when the gateway is known to be down: seconds until it is worth trying again
+    retry_after: Optional[float] = None
 
 
-def dispatch_otp(*, channel: str, identifier: str, otp: Optional[str] = None, display_name: Optional[str] = None) -> None:
+class OtpVerifyError(RuntimeError):
+    retry_after: Optional[float] = None
+
+
+def _gateway_config(error_cls: type[RuntimeError]) -> tuple[str, str]:
     url = (os.getenv('OTP_GATEWAY_URL') or '').strip()
     auth_header = (os.getenv('OTP_GATEWAY_AUTH_HEADER') or '').strip()
-
     if not url:
-        raise OtpDispatchError('Missing OTP_GATEWAY_URL environment variable')
+        raise error_cls('Missing OTP_GATEWAY_URL environment variable')
+    return url, auth_header
+
+
+def _gateway_error(error_cls: type[RuntimeError], exc: GatewayError) -> RuntimeError:
+    error = error_cls(str(exc))
+    error.retry_after = getattr(exc, 'retry_after', None)
+    return error
+
+
+def _succeeded(payload) -> bool:
+    return isinstance(payload, dict) and (payload.get('status') or '').strip().lower() == 'success'
+
+
+def dispatch_otp(*, channel: str, identifier: str, otp: Optional[str] = None, display_name: Optional[str] = None) -> None:
+    url, auth_header = _gateway_config(OtpDispatchError)
     if channel not in {'whatsapp', 'email'}:
         raise OtpDispatchError('Invalid OTP channel')
     if not identifier:
         raise OtpDispatchError('Missing OTP identifier')
 
-    payload = {
+    form = {
         'GenerateOTP': 'yes',
         'type': channel,
         'email_mobile': identifier,
     }
-
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Accept': 'application/json',
-    }
-    if auth_header:
-        headers['Authorization'] = auth_header
-
-    raw = urllib.parse.urlencode(payload).encode('utf-8')
-    req = urllib.request.Request(url, data=raw, method='POST', headers=headers)
-
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            status = getattr(resp, 'status', None) or resp.getcode()
-            if status < 200 or status >= 300:
-                raise OtpDispatchError(f'OTP gateway returned HTTP {status}')
-
-            body = resp.read().decode('utf-8')
-            try:
-                payload = json.loads(body)
-            except json.JSONDecodeError as exc:
-                raise OtpDispatchError('OTP gateway returned invalid JSON') from exc
-
-            if (payload.get('status') or '').strip().lower() != 'success':
-                raise OtpDispatchError('OTP gateway did not return success')
-    except urllib.error.HTTPError as exc:
-        raise OtpDispatchError(f'OTP gateway returned HTTP {exc.code}') from exc
-    except urllib.error.URLError as exc:
-        raise OtpDispatchError('Unable to reach OTP gateway') from exc
-
-
-class OtpVerifyError(RuntimeError):
-    pass
+        payload = get_gateway(url, auth_header).post(form)
+    except GatewayError as exc:
+        raise _gateway_error(OtpDispatchError, exc) from exc
+    if not _succeeded(payload):
+        raise OtpDispatchError('OTP gateway did not return success')
 
 
 def verify_otp_via_gateway(*, identifier: str, otp: str) -> bool:
-    url = (os.getenv('OTP_GATEWAY_URL') or '').strip()
-    auth_header = (os.getenv('OTP_GATEWAY_AUTH_HEADER') or '').strip()
-
-    if not url:
-        raise OtpVerifyError('Missing OTP_GATEWAY_URL environment variable')
+    url, auth_header = _gateway_config(OtpVerifyError)
     if not identifier:
         raise OtpVerifyError('Missing OTP identifier')
     if not otp:
         raise OtpVerifyError('Missing OTP value')
 
-    payload = {
+    form = {
         'login_verfication': 'yes',
         'email_mobile': identifier,
         'otp': otp,
         'password': '',
     }
+    try:
+        return _succeeded(get_gateway(url, auth_header).post(form))
+    except GatewayError as exc:
+        raise _gateway_error(OtpVerifyError, exc) from exc
 
-    headers = {
-        'Content-Type': 'application/x-www-form-urlencoded',
-        'Accept': 'application/json',
-    }
-    if auth_header:
-        headers['Authorization'] = auth_header
 
-    raw = urllib.parse.urlencode(payload).encode('utf-8')
-    req = urllib.request.Request(url, data=raw, method='POST', headers=headers)
+async def adispatch_otp(*, channel: str, identifier: str, otp: Optional[str] = None, display_name: Optional[str] = None) -> None:
+    # The gateway call can block for its whole read timeout: it gets a thread of its
+    # own instead of the single thread that thread-sensitive sync calls share.
+    await sync_to_async(dispatch_otp, thread_sensitive=False)(
+        channel=channel, identifier=identifier, otp=otp, display_name=display_name
+    )
 
-    try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            status = getattr(resp, 'status', None) or resp.getcode()
-            if status < 200 or status >= 300:
-                raise OtpVerifyError(f'OTP gateway returned HTTP {status}')
-
-            body = resp.read().decode('utf-8')
-            try:
-                payload = json.loads(body)
-            except json.JSONDecodeError as exc:
-                raise OtpVerifyError('OTP gateway returned invalid JSON') from exc
-
-            return (payload.get('status') or '').strip().lower() == 'success'
-    except urllib.error.HTTPError as exc:
-        raise OtpVerifyError(f'OTP gateway returned HTTP {exc.code}') from exc
-    except urllib.error.URLError as exc:
-        raise OtpVerifyError('Unable to reach OTP gateway') from exc
+
+async def averify_otp_via_gateway(*, identifier: str, otp: str) -> bool:
+    return await sync_to_async(verify_otp_via_gateway, thread_sensitive=False)(identifier=identifier, otp=otp)
@@ -0,0 +1,251 @@
+"""Closing a round and serving it from its frozen snapshot.
+
+``close_round`` marks the round closed and, in the same transaction, stores the
+final word frequencies, the full leaderboard and the counters in
+``GameRound.snapshot``. A closed round is never written again, so readers take
+everything from the snapshot (decoded once per process) instead of aggregating
+``Response`` and ``PlayerScore``. The one exception is a write that was accepted
+while the round was open and lands after the close (the batched ingest queue of
+another worker): ``refresh_snapshot`` then rebuilds the snapshot under a new version.
+
+Snapshot layout (kept compact, positional)::
+
+    {"v": 1,
+     "words": [[text, count], ...],                     # count desc, text asc
+     "leaderboard": [[member_id, name, response_points, share_points, total_points], ...],
+     "counters": {"response_count": ..., ...}}
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .leaderboard import LEADERBOARD_SIZE, leaderboards
+from .models import GameRound, PlayerScore, Response, ShareEvent
+from .singleflight import SingleFlightTimeout, aggregate_reads
+from .wordfreq import word_frequencies
+
+
+SNAPSHOT_FORMAT = 1
+MAX_CACHED_SNAPSHOTS = 256
+
+
+class RoundClosed(Exception):
+    """A write lost the race against the round being closed."""
+
+
+def build_snapshot(round_id: int) -> dict:
+    words = list(
+        Response.objects.filter(round_id=round_id)
+        .values('word_normalized')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'word_normalized')
+        .values_list('word_normalized', 'count')
+    )
+    # Same order as the live leaderboard: points, then most recent update, then member id
+    scores = list(
+        PlayerScore.objects.filter(round_id=round_id)
+        .order_by('-total_points', '-updated_at', 'member_id')
+        .values_list('member_id', 'member__name', 'response_points', 'share_points', 'total_points')
+    )
+    response_count = sum(count for _, count in words)
+    return {
+        'v': SNAPSHOT_FORMAT,
+        'words': [list(row) for row in words],
+        'leaderboard': [list(row) for row in scores],
+        'counters': {
+            'response_count': response_count,
+            'distinct_word_count': len(words),
+            'share_count': ShareEvent.objects.filter(round_id=round_id).count(),
+            'participant_count': len(scores),
+        },
+    }
+
+
+def close_round(round_id: int) -> Optional[GameRound]:
+    """Close and finalize a round; a no-op for a round that is already closed.
+
+    Returns the round (without its snapshot loaded), or ``None`` if it does not exist.
+    """
+    with transaction.atomic():
+        # The lock waits out in-flight writes; the ones after it see status='closed'.
+        round_obj = GameRound.objects.select_for_update().filter(id=round_id).defer('snapshot').first()
+        if round_obj is None or round_obj.status == 'closed':
+            return round_obj
+        snapshot = build_snapshot(round_id)
+        closed_at = timezone.now()
+        GameRound.objects.filter(id=round_id).update(
+            status='closed',
+            closed_at=closed_at,
+            snapshot=snapshot,
+            version=F('version') + 1,
+            **snapshot['counters'],
+        )
+    round_obj.refresh_from_db(fields=['status', 'closed_at', 'version', *snapshot['counters']])
+    # The live structures are no longer consulted for this round.
+    word_frequencies.discard(round_id)
+    leaderboards.discard(round_id)
+    snapshots.remember(round_id, round_obj.version, snapshot)
+    return round_obj
+
+
+def refresh_snapshot(round_id: int) -> None:
+    """Rebuild the snapshot of a closed round whose responses changed after it was closed.
+
+    Bumps the version, so every process reloads the snapshot and clients see new ETags.
+    """
+    with transaction.atomic():
+        closed = GameRound.objects.select_for_update().filter(id=round_id, status='closed').exists()
+        if not closed:
+            return
+        snapshot = build_snapshot(round_id)
+        GameRound.objects.filter(id=round_id).update(snapshot=snapshot, version=F('version') + 1, **snapshot['counters'])
+
+
+class _Snapshot:
+    def __init__(self, version: int, data: dict):
+        self.version = version
+        self.words: list[tuple[str, int]] = [(text, count) for text, count in data['words']]
+        self.total_responses = data['counters']['response_count']
+        self.counters: dict[str, int] = data['counters']
+        self.leaderboard: list[list] = data['leaderboard']
+        self._ranks = {row[0]: rank for rank, row in enumerate(self.leaderboard, start=1)}
+
+    def entries(self, start: int, stop: int) -> list[dict]:
+        start = max(start, 0)
+        return [self._entry(rank, row) for rank, row in enumerate(self.leaderboard[start:stop], start=start + 1)]
+
+    def rank_of(self, member_id: int) -> Optional[dict]:
+        rank = self._ranks.get(member_id)
+        return None if rank is None else self._entry(rank, self.leaderboard[rank - 1])
+
+    def around(self, member_id: int, k: int) -> list[dict]:
+        rank = self._ranks.get(member_id)
+        return [] if rank is None else self.entries(rank - 1 - k, rank + k)
+
+    @staticmethod
+    def _entry(rank: int, row: list) -> dict:
+        _, name, response_points, share_points, total_points = row
+        return {
+            'rank': rank,
+            'member_name': name,
+            'response_points': response_points,
+            'share_points': share_points,
+            'total_points': total_points,
+        }
+
+
+class SnapshotStore:
+    """Decoded snapshots of closed rounds, reloaded only when the round's version moves on."""
+
+    def __init__(self, *, max_rounds: int = MAX_CACHED_SNAPSHOTS):
+        self.max_rounds = max_rounds
+        self._lock = threading.Lock()
+        self._snapshots: OrderedDict[int, _Snapshot] = OrderedDict()
+
+    def get(self, round_obj: GameRound) -> Optional[_Snapshot]:
+        """The snapshot of a closed round, or ``None`` while it is still active."""
+        if round_obj.status != 'closed':
+            return None
+        with self._lock:
+            snapshot = self._snapshots.get(round_obj.id)
+            if snapshot is not None and snapshot.version >= round_obj.version:
+                self._snapshots.move_to_end(round_obj.id)
+                return snapshot
+        row = GameRound.objects.filter(id=round_obj.id).values_list('version', 'snapshot').first()
+        if row is None or not row[1]:
+            # Closed before snapshots existed; served live like an active round.
+            return None
+        return self.remember(round_obj.id, *row)
+
+    def remember(self, round_id: int, version: int, data: dict) -> _Snapshot:
+        snapshot = _Snapshot(version, data)
+        with self._lock:
+            current = self._snapshots.get(round_id)
+            if current is not None and current.version > version:
+                return current
+            self._snapshots[round_id] = snapshot
+            self._snapshots.move_to_end(round_id)
+            while len(self._snapshots) > self.max_rounds:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+snapshots = SnapshotStore()
+
+
+def _coalesced(key: tuple, fn):
+    # Identical concurrent reads of an active round share one aggregation.
+    try:
+        return aggregate_reads.do(key, fn)
+    except SingleFlightTimeout:
+        return fn()
+
+
+async def _acoalesced(key: tuple, fn):
+    try:
+        return await aggregate_reads.ado(key, fn)
+    except SingleFlightTimeout:
+        return await fn()
+
+
+def round_words(round_obj: GameRound, limit: Optional[int] = None) -> tuple[list[tuple[str, int]], int]:
+    """``(words, total_responses)`` from the snapshot of a closed round, else from the live counts."""
+    snapshot = snapshots.get(round_obj)
+    if snapshot is None:
+        round_id, version = round_obj.id, round_obj.version
+        return _coalesced(('words', round_id, version, limit), lambda: word_frequencies.top(round_id, version, limit))
+    words = snapshot.words if limit is None else snapshot.words[:limit]
+    return words, snapshot.total_responses
+
+
+def round_words_since(round_obj: GameRound, since: int) -> tuple[list[tuple[str, int]], int]:
+    """Words of an active round whose counts changed after version ``since``."""
+    round_id, version = round_obj.id, round_obj.version
+    return _coalesced(
+        ('words-since', round_id, version, since),
+        lambda: word_frequencies.changed_since(round_id, version, since),
+    )
+
+
+def round_leaderboard(round_obj: GameRound, limit: int = LEADERBOARD_SIZE) -> list[dict]:
+    snapshot = snapshots.get(round_obj)
+    if snapshot is None:
+        return _coalesced(('leaderboard', round_obj.id, round_obj.version, limit), lambda: leaderboards.top(round_obj, limit))
+    return snapshot.entries(0, limit)
+
+
+# Async variants for the ASGI views. Requests waiting on the same aggregation wait
+# on the event loop, not in a thread; only the leader's work runs in one.
+
+async def round_words_async(round_obj: GameRound, limit: Optional[int] = None) -> tuple[list[tuple[str, int]], int]:
+    if round_obj.status != 'active':
+        return await sync_to_async(round_words)(round_obj, limit)
+    round_id, version = round_obj.id, round_obj.version
+    return await _acoalesced(
+        ('words', round_id, version, limit), sync_to_async(lambda: word_frequencies.top(round_id, version, limit))
+    )
+
+
+async def round_words_since_async(round_obj: GameRound, since: int) -> tuple[list[tuple[str, int]], int]:
+    round_id, version = round_obj.id, round_obj.version
+    return await _acoalesced(
+        ('words-since', round_id, version, since),
+        sync_to_async(lambda: word_frequencies.changed_since(round_id, version, since)),
+    )
+
+
+async def round_leaderboard_async(round_obj: GameRound, limit: int = LEADERBOARD_SIZE) -> list[dict]:
+    if round_obj.status != 'active':
+        return await sync_to_async(round_leaderboard)(round_obj, limit)
+    return await _acoalesced(
+        ('leaderboard', round_obj.id, round_obj.version, limit), sync_to_async(lambda: leaderboards.top(round_obj, limit))
+    )
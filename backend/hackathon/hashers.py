@@ -0,0 +1,117 @@
+"""Password hashing schemes, and the one new passwords are hashed with.
+
+A stored password is its algorithm, salt, hash and work factor, kept in the
+``AppUser.password_*`` columns. The work factor is the PBKDF2 iteration count, or
+the scrypt cost N (scrypt's r and p are fixed). ``get_hasher`` builds the scheme
+new hashes use from ``PASSWORD_HASHER`` and ``PASSWORD_PBKDF2_ITERATIONS`` /
+``PASSWORD_SCRYPT_N``. Hashes made under other settings still verify, and a
+successful login re-hashes them with the current scheme.
+"""
+import abc
+import hashlib
+import hmac
+import secrets
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+from .auth import PBKDF2_ITERATIONS, _b64decode, _b64encode
+
+
+SCRYPT_N = 2 ** 15
+DEFAULT_HASHER = 'pbkdf2_sha256'
+
+
+@dataclass(frozen=True)
+class StoredPassword:
+    algorithm: str
+    salt_b64: str
+    hash_b64: str
+    work: int
+
+    @classmethod
+    def of(cls, user) -> 'StoredPassword':
+        return cls(user.password_algorithm, user.password_salt_b64, user.password_hash_b64, user.password_iterations)
+
+    def as_fields(self) -> dict:
+        """``AppUser`` column values, for ``create`` / ``update``."""
+        return {
+            'password_algorithm': self.algorithm,
+            'password_salt_b64': self.salt_b64,
+            'password_hash_b64': self.hash_b64,
+            'password_iterations': self.work,
+        }
+
+
+class Hasher(abc.ABC):
+    algorithm = ''
+
+    def __init__(self, work: int):
+        self.work = work
+
+    @abc.abstractmethod
+    def derive(self, password: str, salt: bytes, work: int) -> bytes:
+        """The raw digest of ``password`` at work factor ``work``."""
+
+    def encode(self, password: str, *, salt_b64: Optional[str] = None) -> StoredPassword:
+        salt_b64 = salt_b64 or _b64encode(secrets.token_bytes(16))
+        digest = self.derive(password, _b64decode(salt_b64), self.work)
+        return StoredPassword(self.algorithm, salt_b64, _b64encode(digest), self.work)
+
+    def verify(self, password: str, stored: StoredPassword) -> bool:
+        """Check ``password`` against a hash of this algorithm, at the hash's own work factor."""
+        digest = self.derive(password, _b64decode(stored.salt_b64), stored.work)
+        return hmac.compare_digest(_b64encode(digest), stored.hash_b64)
+
+    def needs_rehash(self, stored: StoredPassword) -> bool:
+        return stored.algorithm != self.algorithm or stored.work != self.work
+
+
+class PBKDF2Hasher(Hasher):
+    algorithm = 'pbkdf2_sha256'
+
+    def __init__(self, work: int = PBKDF2_ITERATIONS):
+        super().__init__(work)
+
+    def derive(self, password: str, salt: bytes, work: int) -> bytes:
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, work)
+
+
+class ScryptHasher(Hasher):
+    algorithm = 'scrypt'
+    R = 8
+    P = 1
+
+    def __init__(self, work: int = SCRYPT_N):
+        super().__init__(work)
+
+    def derive(self, password: str, salt: bytes, work: int) -> bytes:
+        # OpenSSL's default memory cap (32 MiB) is below what N = 2**15 needs.
+        maxmem = 2 * 128 * self.R * work * self.P
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=work, r=self.R, p=self.P, maxmem=maxmem, dklen=32)
+
+
+HASHERS: dict[str, type[Hasher]] = {cls.algorithm: cls for cls in (PBKDF2Hasher, ScryptHasher)}
+
+
+def verify_stored(password: str, stored: StoredPassword) -> bool:
+    """Whether ``password`` matches ``stored``, whatever scheme it was hashed with."""
+    hasher_cls = HASHERS.get(stored.algorithm)
+    if hasher_cls is None:
+        return False
+    return hasher_cls(stored.work).verify(password, stored)
+
+
+def get_hasher() -> Hasher:
+    """The scheme new and upgraded password hashes are made with."""
+    algorithm = getattr(settings, 'PASSWORD_HASHER', DEFAULT_HASHER)
+    if algorithm == ScryptHasher.algorithm:
+        n = getattr(settings, 'PASSWORD_SCRYPT_N', SCRYPT_N)
+        # Anything else would only fail at the first hash, in a worker process
+        if n < 2 or n & (n - 1):
+            raise ValueError(f'PASSWORD_SCRYPT_N must be a power of two greater than 1; got {n!r}')
+        return ScryptHasher(n)
+    if algorithm == PBKDF2Hasher.algorithm:
+        return PBKDF2Hasher(getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2_ITERATIONS))
+    raise ValueError(f'Unknown PASSWORD_HASHER {algorithm!r}; expected one of {sorted(HASHERS)}')
@@ -0,0 +1,110 @@
+"""Resolving a login phone number or email to the active team accounts it belongs to.
+
+A lookup is one equality probe on an indexed ``AppUserMember`` column (``phone``,
+or ``email_normalized``) joined to its ``AppUser``. It returns every team the
+identity is registered on, in team order, with the list the views offer when
+asked to pick a team already built.
+
+Resolved identities are kept for ``IDENTITY_CACHE_TTL_SECONDS`` (0 turns the cache
+off), like sessions in ``session_cache``. Invalidation is immediate in this
+process, and ``import_teams`` clears the cache. Other processes clear theirs when
+``session_cache``'s revocation poll, run before each lookup, finds teams changed
+(``AppUser.updated_at``). A new or moved member can extend an identity that no
+changed team is cached under, so any team change drops every entry. Unknown
+identities are not cached, so a newly imported member can log in straight away
+and random probes cannot fill the cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterable
+
+from django.conf import settings
+
+from .models import AppUserMember
+from .session_cache import session_cache
+
+
+PHONE = 'phone'
+EMAIL = 'email'
+
+IDENTITY_CACHE_TTL_SECONDS = 30.0
+IDENTITY_CACHE_MAX_ENTRIES = 10000
+
+
+@dataclass(frozen=True)
+class Identity:
+    # Members of active teams (``user`` loaded), ordered by team number
+    members: tuple[AppUserMember, ...]
+
+    @cached_property
+    def teams(self) -> list[dict]:
+        return [{'team_no': m.user.team_no, 'username': m.user.username} for m in self.members]
+
+    def for_team(self, team_no: int) -> 'Identity':
+        return Identity(tuple(m for m in self.members if m.user.team_no == team_no))
+
+
+def _team_order(member: AppUserMember) -> tuple:
+    return (member.user.team_no is None, member.user.team_no or 0)
+
+
+class IdentityCache:
+    def __init__(self, *, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Identity]] = OrderedDict()
+        self._teams_generation = session_cache.teams_generation
+
+    def resolve(self, kind: str, value: str) -> Identity:
+        """Active accounts of a normalized phone (``PHONE``) or email (``EMAIL``)."""
+        key = (kind, value)
+        ttl = getattr(settings, 'IDENTITY_CACHE_TTL_SECONDS', IDENTITY_CACHE_TTL_SECONDS)
+        if ttl > 0:
+            session_cache.poll()
+            with self._lock:
+                if self._teams_generation != session_cache.teams_generation:
+                    self._teams_generation = session_cache.teams_generation
+                    self._entries.clear()
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if time.monotonic() < entry[0]:
+                        self._entries.move_to_end(key)
+                        return entry[1]
+                    del self._entries[key]
+
+        members_qs = AppUserMember.objects.select_related('user').filter(user__is_active=True)
+        if kind == PHONE:
+            members_qs = members_qs.filter(phone=value)
+        else:
+            members_qs = members_qs.filter(email_normalized=value)
+        identity = Identity(tuple(sorted(members_qs, key=_team_order)))
+
+        if ttl > 0 and identity.members:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, identity)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return identity
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> None:
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            stale = [
+                key for key, (_, identity) in self._entries.items()
+                if any(m.user_id in user_ids for m in identity.members)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
@@ -0,0 +1,331 @@
+"""Response writes: the synchronous path and the optional write-behind batch pipeline.
+
+With ``RESPONSE_INGEST_MODE = 'batched'`` validated submissions are queued and a
+background thread writes them every ``flush_interval`` seconds or ``max_batch``
+items: one ``bulk_create`` for the responses, one score upsert and one counter
+UPDATE per round. A full queue falls back to the synchronous path, and the queue
+is drained on interpreter shutdown. The client was told its response is accepted,
+so items for a round that closed while they were queued are still written, and the
+round's snapshot is rebuilt. Duplicates are caught per process only: a member whose
+response another server process has already stored has the queued one dropped at
+write time, logged and counted in ``duplicates_dropped``.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .finalize import refresh_snapshot
+from .live import live_updates
+from .models import AppUserMember, GameRound, Response
+from .scores import add_points, add_points_many, increment_round
+from .wordfreq import word_frequencies
+
+
+logger = logging.getLogger(__name__)
+
+MAX_QUEUE_SIZE = 20000
+MAX_BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 0.05
+MAX_TRACKED_ROUNDS = 256
+
+QUEUED = 'queued'
+DUPLICATE = 'duplicate'
+FULL = 'full'
+
+
+def store_response(
+    round_obj: GameRound, member: Optional[AppUserMember], word: str, word_normalized: str, *, late: bool = False
+) -> Optional[Response]:
+    """Write one response, its score and the round counters in a single transaction.
+
+    Returns ``None`` without writing if the round has been closed meanwhile, unless
+    the response is ``late``: accepted while the round was open (it is written anyway).
+    """
+    with transaction.atomic():
+        if not increment_round(round_obj.id, active_only=not late, version=1, response_count=1):
+            return None
+        counters = {}
+        if not Response.objects.filter(round=round_obj, word_normalized=word_normalized).exists():
+            counters['distinct_word_count'] = 1
+
+        # Create response (member can be None for anonymous)
+        response = Response.objects.create(
+            round=round_obj,
+            member=member,
+            word=word,
+            word_normalized=word_normalized
+        )
+        transaction.on_commit(lambda: word_frequencies.record(round_obj.id, response.id, word_normalized))
+        transaction.on_commit(lambda: live_updates.publish(round_obj.id))
+
+        # Update or create player score (only for authenticated users)
+        if member:
+            score = add_points(round_id=round_obj.id, member_id=member.id, response_points=1)
+            if score.created:
+                counters['participant_count'] = 1
+
+        increment_round(round_obj.id, **counters)
+    return response
+
+
+@dataclass(frozen=True)
+class _Submission:
+    round_id: int
+    member_id: Optional[int]
+    word: str
+    word_normalized: str
+
+
+class ResponseIngestor:
+    def __init__(
+        self,
+        *,
+        max_queue: int = MAX_QUEUE_SIZE,
+        max_batch: int = MAX_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[_Submission] = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._responded: OrderedDict[int, set[int]] = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._atexit_registered = False
+        self.duplicates_dropped = 0
+
+    def submit(self, round_id: int, member_id: Optional[int], word: str, word_normalized: str) -> str:
+        """Queue a validated response; returns ``QUEUED``, ``DUPLICATE`` or ``FULL``."""
+        responded = None
+        if member_id is not None:
+            responded = self._cached_responders(round_id)
+            if responded is None:
+                responded = self._remember_responders(round_id, self._load_responders(round_id))
+        return self._enqueue(_Submission(round_id, member_id, word, word_normalized), responded)
+
+    async def asubmit(self, round_id: int, member_id: Optional[int], word: str, word_normalized: str) -> str:
+        """``submit`` for async views; a round's responders are loaded with the async ORM."""
+        responded = None
+        if member_id is not None:
+            responded = self._cached_responders(round_id)
+            if responded is None:
+                existing = {
+                    responder
+                    async for responder in Response.objects.filter(round_id=round_id, member_id__isnull=False)
+                    .values_list('member_id', flat=True)
+                }
+                responded = self._remember_responders(round_id, existing)
+        return self._enqueue(_Submission(round_id, member_id, word, word_normalized), responded)
+
+    def flush(self) -> int:
+        """Write everything queued so far on the calling thread; returns the number of items."""
+        written = 0
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return written
+            self._write(batch)
+            written += len(batch)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+        self._stopping.clear()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='response-ingestor', daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.stop)
+                    self._atexit_registered = True
+
+    def _enqueue(self, submission: _Submission, responded: Optional[set[int]]) -> str:
+        self._ensure_started()
+        with self._lock:
+            if responded is not None and submission.member_id in responded:
+                return DUPLICATE
+            try:
+                self._queue.put_nowait(submission)
+            except queue.Full:
+                # The caller writes synchronously instead; remember the member either way.
+                result = FULL
+            else:
+                result = QUEUED
+            if responded is not None:
+                responded.add(submission.member_id)
+            return result
+
+    def _cached_responders(self, round_id: int) -> Optional[set[int]]:
+        with self._lock:
+            responded = self._responded.get(round_id)
+            if responded is not None:
+                self._responded.move_to_end(round_id)
+            return responded
+
+    @staticmethod
+    def _load_responders(round_id: int) -> set[int]:
+        return set(
+            Response.objects.filter(round_id=round_id, member_id__isnull=False).values_list('member_id', flat=True)
+        )
+
+    def _remember_responders(self, round_id: int, existing: set[int]) -> set[int]:
+        with self._lock:
+            responded = self._responded.setdefault(round_id, set())
+            responded |= existing
+            while len(self._responded) > MAX_TRACKED_ROUNDS:
+                self._responded.popitem(last=False)
+            return responded
+
+    def _run(self) -> None:
+        try:
+            while not self._stopping.is_set():
+                batch = self._take(block=True)
+                if batch:
+                    self._write(batch)
+        finally:
+            connection.close()
+
+    def _take(self, *, block: bool) -> list[_Submission]:
+        batch: list[_Submission] = []
+        deadline = None
+        while len(batch) < self.max_batch:
+            try:
+                if not block:
+                    item = self._queue.get_nowait()
+                elif deadline is None:
+                    item = self._queue.get(timeout=self.flush_interval)
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _write(self, batch: list[_Submission]) -> None:
+        close_old_connections()
+        try:
+            self._write_batch(batch)
+        except Exception:
+            logger.exception('Batched response write failed; retrying %d items one by one', len(batch))
+            self._write_one_by_one(batch)
+
+    def _write_batch(self, batch: list[_Submission]) -> None:
+        by_round: dict[int, list[_Submission]] = defaultdict(list)
+        for item in batch:
+            by_round[item.round_id].append(item)
+
+        dropped: dict[int, int] = {}
+        with transaction.atomic():
+            # Lock the rounds in id order so concurrent writers cannot deadlock on them.
+            statuses = dict(
+                GameRound.objects.select_for_update()
+                .filter(id__in=by_round)
+                .order_by('id')
+                .values_list('id', 'status')
+            )
+            for round_id, items in by_round.items():
+                if round_id not in statuses:
+                    logger.warning('Dropping %d queued responses for deleted round %s', len(items), round_id)
+                    continue
+                dropped[round_id] = self._write_round(round_id, items)
+                if statuses[round_id] == 'closed':
+                    # Accepted before the close: the final results must include them
+                    refresh_snapshot(round_id)
+        for round_id, count in dropped.items():
+            self._drop_duplicates(round_id, count)
+
+    def _write_round(self, round_id: int, items: list[_Submission]) -> int:
+        """Write a round's items; returns how many were dropped as duplicates."""
+        member_ids = {item.member_id for item in items if item.member_id is not None}
+        already = set(
+            Response.objects.filter(round_id=round_id, member_id__in=member_ids).values_list('member_id', flat=True)
+        )
+        fresh = []
+        for item in items:
+            if item.member_id is not None:
+                if item.member_id in already:
+                    continue
+                already.add(item.member_id)
+            fresh.append(item)
+        if not fresh:
+            return len(items)
+
+        words = {item.word_normalized for item in fresh}
+        known_words = set(
+            Response.objects.filter(round_id=round_id, word_normalized__in=words).values_list('word_normalized', flat=True)
+        )
+        Response.objects.bulk_create(
+            [
+                Response(round_id=round_id, member_id=item.member_id, word=item.word, word_normalized=item.word_normalized)
+                for item in fresh
+            ]
+        )
+        created_scores = add_points_many(
+            round_id=round_id,
+            member_ids=[item.member_id for item in fresh if item.member_id is not None],
+            response_points=1,
+        )
+        increment_round(
+            round_id,
+            version=1,
+            response_count=len(fresh),
+            distinct_word_count=len(words - known_words),
+            participant_count=created_scores,
+        )
+        transaction.on_commit(lambda: live_updates.publish(round_id))
+        return len(items) - len(fresh)
+
+    def _drop_duplicates(self, round_id: int, count: int) -> None:
+        if not count:
+            return
+        # The clients were answered 202; their responses are lost, not just late
+        logger.warning('Dropped %d queued responses to round %s from members who had already responded', count, round_id)
+        with self._lock:
+            self.duplicates_dropped += count
+
+    def _write_one_by_one(self, batch: list[_Submission]) -> None:
+        for item in batch:
+            try:
+                round_obj = GameRound.objects.filter(id=item.round_id).defer('snapshot').first()
+                if round_obj is None:
+                    continue
+                member = None
+                if item.member_id is not None:
+                    if Response.objects.filter(round_id=item.round_id, member_id=item.member_id).exists():
+                        self._drop_duplicates(item.round_id, 1)
+                        continue
+                    member = AppUserMember.objects.filter(id=item.member_id).first()
+                with transaction.atomic():
+                    store_response(round_obj, member, item.word, item.word_normalized, late=True)
+                    if round_obj.status == 'closed':
+                        refresh_snapshot(item.round_id)
+            except Exception:
+                logger.exception('Dropping queued response for round %s', item.round_id)
+
+
+response_ingestor = ResponseIngestor()
+
+
+def batched_ingest_enabled() -> bool:
+    return getattr(settings, 'RESPONSE_INGEST_MODE', 'sync') == 'batched'
@@ -0,0 +1,286 @@
+"""Word cloud placements computed on the server.
+
+Free space is tracked in an occupancy bitmap of ``cell``-pixel squares. To place a
+word, one summed-area table (integral image) of the bitmap gives the occupied-cell
+count of every candidate window at once, and the free window nearest the target
+point wins; there is no spiral walk and no pairwise collision test.
+
+Layouts are kept per (round, viewport bucket) and updated incrementally: when the
+round's version moves on, words that kept or lost size stay where they are, and
+only new and grown words are placed.
+"""
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+import numpy as np
+
+
+MAX_LAYOUT_WORDS = 300
+MAX_TRACKED_LAYOUTS = 512
+
+BUCKET_WIDTH = 160
+BUCKET_HEIGHT = 120
+MIN_VIEWPORT = (320, 240)
+MAX_VIEWPORT = (3840, 2160)
+# The bitmap is capped at about this many cells across, so big screens stay cheap.
+MAX_GRID_WIDTH = 256
+MIN_CELL = 4
+
+MIN_FONT_SIZE = 16
+MAX_FONT_SIZE = 80
+PADDING = 5  # px kept free around each word
+LINE_HEIGHT = 1.15
+
+
+def viewport_bucket(width: int, height: int) -> tuple[int, int]:
+    """Round a client viewport to the layout size it is served (and scales) from."""
+    width = min(max(width, MIN_VIEWPORT[0]), MAX_VIEWPORT[0])
+    height = min(max(height, MIN_VIEWPORT[1]), MAX_VIEWPORT[1])
+    return (
+        max(BUCKET_WIDTH, round(width / BUCKET_WIDTH) * BUCKET_WIDTH),
+        max(BUCKET_HEIGHT, round(height / BUCKET_HEIGHT) * BUCKET_HEIGHT),
+    )
+
+
+def _char_width(char: str) -> float:
+    # Rough advance widths (in em) of a bold sans-serif; the client shrinks the
+    # font if the real text comes out wider than its box.
+    if char in 'fijlrtI.,:;!|\'':
+        return 0.34
+    if char in 'mwMW':
+        return 0.95
+    if char.isupper():
+        return 0.74
+    if char.isdigit():
+        return 0.62
+    if ord(char) < 128:
+        return 0.6
+    if unicodedata.east_asian_width(char) in 'WF':
+        return 1.0
+    return 0.68
+
+
+def text_width(text: str, font_size: float) -> float:
+    return sum(_char_width(char) for char in text) * font_size
+
+
+def _prefers_vertical(text: str) -> bool:
+    # Same rule the canvas used, so about a third of the words stand upright.
+    return sum(ord(char) for char in text) % 3 == 0
+
+
+@dataclass(frozen=True)
+class Placement:
+    text: str
+    count: int
+    font_size: int
+    rotate: int  # 0 or 90
+    x: int  # top-left of the (rotated) box, px
+    y: int
+    width: int
+    height: int
+
+    @property
+    def center(self) -> tuple[float, float]:
+        return self.x + self.width / 2, self.y + self.height / 2
+
+    def as_dict(self) -> dict:
+        return {
+            'text': self.text,
+            'count': self.count,
+            'font_size': self.font_size,
+            'rotate': self.rotate,
+            'x': self.x,
+            'y': self.y,
+            'width': self.width,
+            'height': self.height,
+        }
+
+
+@dataclass
+class _LayoutState:
+    width: int
+    height: int
+    version: int = -1
+    placements: dict[str, Placement] = field(default_factory=dict)
+    # Words that did not fit last time, with the font size they were tried at.
+    unplaced: dict[str, int] = field(default_factory=dict)
+    payload: Optional[dict] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class _Grid:
+    def __init__(self, width: int, height: int):
+        self.cell = max(MIN_CELL, -(-width // MAX_GRID_WIDTH))
+        self.cols = width // self.cell
+        self.rows = height // self.cell
+        self.occupied = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        self._integral: Optional[np.ndarray] = None
+
+    def mark(self, placement: Placement) -> None:
+        c0, r0, c1, r1 = self._cells(placement.x, placement.y, placement.width, placement.height)
+        self.occupied[max(r0, 0):r1, max(c0, 0):c1] = 1
+        self._integral = None
+
+    def find(self, box_w: int, box_h: int, target: tuple[float, float]) -> Optional[tuple[int, int]]:
+        """Top-left pixel of the free ``box_w`` x ``box_h`` window whose centre is nearest ``target``."""
+        wc = -(-(box_w + 2 * PADDING) // self.cell)
+        hc = -(-(box_h + 2 * PADDING) // self.cell)
+        if wc > self.cols or hc > self.rows:
+            return None
+        if self._integral is None:
+            integral = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+            np.cumsum(np.cumsum(self.occupied, axis=0, dtype=np.int32), axis=1, out=integral[1:, 1:])
+            self._integral = integral
+        s = self._integral
+        taken = s[hc:, wc:] - s[:-hc, wc:] - s[hc:, :-wc] + s[:-hc, :-wc]
+        free = taken == 0
+        if not free.any():
+            return None
+
+        # Elliptical distance, so the cloud grows in the shape of the viewport.
+        tx, ty = target[0] / self.cell, target[1] / self.cell
+        dy = (np.arange(free.shape[0], dtype=np.float32) + (hc / 2 - ty)) / self.rows
+        dx = (np.arange(free.shape[1], dtype=np.float32) + (wc / 2 - tx)) / self.cols
+        distance = np.where(free, dy[:, None] ** 2 + dx[None, :] ** 2, np.float32(np.inf))
+        row, col = np.unravel_index(int(np.argmin(distance)), distance.shape)
+        # Centre the box inside the padded window.
+        x = int(col * self.cell + (wc * self.cell - box_w) / 2)
+        y = int(row * self.cell + (hc * self.cell - box_h) / 2)
+        return x, y
+
+    def fits(self, x: int, y: int, box_w: int, box_h: int) -> bool:
+        c0, r0, c1, r1 = self._cells(x, y, box_w, box_h)
+        if c0 < 0 or r0 < 0 or c1 > self.cols or r1 > self.rows:
+            return False
+        return not self.occupied[r0:r1, c0:c1].any()
+
+    def _cells(self, x: int, y: int, box_w: int, box_h: int) -> tuple[int, int, int, int]:
+        return (
+            (x - PADDING) // self.cell,
+            (y - PADDING) // self.cell,
+            -(-(x + box_w + PADDING) // self.cell),
+            -(-(y + box_h + PADDING) // self.cell),
+        )
+
+
+def _box(text: str, font_size: int, rotate: int) -> tuple[int, int]:
+    w = int(text_width(text, font_size)) + 1
+    h = int(font_size * LINE_HEIGHT) + 1
+    return (h, w) if rotate else (w, h)
+
+
+def _update(state: _LayoutState, words: list[tuple[str, int]]) -> None:
+    width, height = state.width, state.height
+    words = words[:MAX_LAYOUT_WORDS]
+    max_count = max((count for _, count in words), default=1)
+    max_font = min(MAX_FONT_SIZE, width // 8)
+
+    kept: dict[str, Placement] = {}
+    pending: list[tuple[str, int, int, Optional[Placement]]] = []
+    freed = False
+    for text, count in words:
+        font_size = int(MIN_FONT_SIZE + count / max_count * (max_font - MIN_FONT_SIZE))
+        old = state.placements.get(text)
+        if old is not None:
+            box_w, box_h = _box(text, font_size, old.rotate)
+            if box_w <= old.width and box_h <= old.height:
+                # Same size or smaller: stays centred where it was.
+                cx, cy = old.center
+                freed = freed or (box_w, box_h) != (old.width, old.height)
+                kept[text] = replace(
+                    old, count=count, font_size=font_size,
+                    x=int(cx - box_w / 2), y=int(cy - box_h / 2), width=box_w, height=box_h,
+                )
+                continue
+        pending.append((text, count, font_size, old))
+
+    dropped = set(state.placements) - set(kept) - {text for text, *_ in pending}
+    freed = freed or bool(dropped)
+
+    grid = _Grid(width, height)
+    for placement in kept.values():
+        grid.mark(placement)
+
+    placements = dict(kept)
+    unplaced: dict[str, int] = {}
+    center = (width / 2, height / 2)
+    for text, count, font_size, old in pending:
+        if old is None and not freed and state.unplaced.get(text) == font_size:
+            # Did not fit at this size before and nothing has been freed since.
+            unplaced[text] = font_size
+            continue
+        preferred = old.rotate if old is not None else (90 if _prefers_vertical(text) else 0)
+        target = old.center if old is not None else center
+        placement = None
+        for rotate in (preferred, 90 - preferred):
+            box_w, box_h = _box(text, font_size, rotate)
+            if old is not None and rotate == old.rotate:
+                x, y = int(target[0] - box_w / 2), int(target[1] - box_h / 2)
+                if grid.fits(x, y, box_w, box_h):
+                    placement = Placement(text, count, font_size, rotate, x, y, box_w, box_h)
+                    break
+            spot = grid.find(box_w, box_h, target)
+            if spot is not None:
+                placement = Placement(text, count, font_size, rotate, spot[0], spot[1], box_w, box_h)
+                break
+        if placement is None:
+            unplaced[text] = font_size
+            continue
+        grid.mark(placement)
+        placements[text] = placement
+
+    state.placements = placements
+    state.unplaced = unplaced
+
+
+class LayoutStore:
+    """Latest layout per (round, viewport bucket), advanced incrementally as versions change."""
+
+    def __init__(self, *, max_layouts: int = MAX_TRACKED_LAYOUTS):
+        self.max_layouts = max_layouts
+        self._lock = threading.Lock()
+        self._layouts: OrderedDict[tuple[int, int, int], _LayoutState] = OrderedDict()
+
+    def layout(self, round_id: int, version: int, words: list[tuple[str, int]], width: int, height: int) -> dict:
+        """Placements for ``words`` (ordered by count descending) at round ``version``."""
+        bucket_w, bucket_h = viewport_bucket(width, height)
+        key = (round_id, bucket_w, bucket_h)
+        with self._lock:
+            state = self._layouts.get(key)
+            if state is None:
+                state = self._layouts[key] = _LayoutState(bucket_w, bucket_h)
+            self._layouts.move_to_end(key)
+            while len(self._layouts) > self.max_layouts:
+                self._layouts.popitem(last=False)
+
+        with state.lock:
+            if state.payload is None or state.version != version:
+                _update(state, words)
+                state.version = version
+                state.payload = {
+                    'version': version,
+                    'width': bucket_w,
+                    'height': bucket_h,
+                    'words': [
+                        placement.as_dict()
+                        for placement in sorted(state.placements.values(), key=lambda p: (-p.count, p.text))
+                    ],
+                    'unplaced': len(state.unplaced),
+                }
+            return state.payload
+
+    def discard(self, round_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._layouts if key[0] == round_id]:
+                del self._layouts[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._layouts.clear()
+
+
+layouts = LayoutStore()
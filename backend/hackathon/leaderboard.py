@@ -0,0 +1,291 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from .models import GameRound, PlayerScore
+
+
+LEADERBOARD_SIZE = 10
+REBUILD_INTERVAL_SECONDS = 30.0
+# PlayerScore.updated_at comes from the app server clock and commits can land out of
+# order, so incremental syncs re-read this much history before the high-water mark.
+SYNC_SLACK = timedelta(seconds=5)
+MAX_TRACKED_ROUNDS = 256
+
+_MAX_LEVEL = 32
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next: list[Optional[_Node]] = [None] * level
+        self.width: list[int] = [1] * level
+
+
+class IndexableSkiplist:
+    """Sorted collection of unique keys with O(log n) insert, remove, rank and positional access.
+
+    ``width[level]`` of a node is the number of positions its ``next[level]`` link
+    skips, which is what lets rank and index lookups stay logarithmic.
+    """
+
+    def __init__(self):
+        self._head = _Node(None, _MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key) -> None:
+        update, steps_at = self._predecessors(key)
+        steps = steps_at[0]
+        level = self._random_level()
+        node = _Node(key, level)
+        for lvl in range(_MAX_LEVEL):
+            prev = update[lvl]
+            if lvl < level:
+                node.next[lvl] = prev.next[lvl]
+                prev.next[lvl] = node
+                node.width[lvl] = prev.width[lvl] - (steps - steps_at[lvl])
+                prev.width[lvl] = steps - steps_at[lvl] + 1
+            else:
+                prev.width[lvl] += 1
+        self._size += 1
+
+    def remove(self, key) -> None:
+        update, _ = self._predecessors(key)
+        target = update[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for lvl in range(_MAX_LEVEL):
+            prev = update[lvl]
+            if prev.next[lvl] is target:
+                prev.width[lvl] += target.width[lvl] - 1
+                prev.next[lvl] = target.next[lvl]
+            else:
+                prev.width[lvl] -= 1
+        self._size -= 1
+
+    def index(self, key) -> int:
+        update, steps_at = self._predecessors(key)
+        target = update[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        return steps_at[0]
+
+    def islice(self, start: int, stop: int) -> Iterator:
+        start = max(start, 0)
+        node = self._node_at(start)
+        for _ in range(start, min(stop, self._size)):
+            if node is None:
+                return
+            yield node.key
+            node = node.next[0]
+
+    def _predecessors(self, key) -> tuple[list[_Node], list[int]]:
+        update: list[_Node] = [self._head] * _MAX_LEVEL
+        steps_at = [0] * _MAX_LEVEL
+        node = self._head
+        steps = 0
+        for lvl in reversed(range(_MAX_LEVEL)):
+            while node.next[lvl] is not None and node.next[lvl].key < key:
+                steps += node.width[lvl]
+                node = node.next[lvl]
+            update[lvl] = node
+            steps_at[lvl] = steps
+        return update, steps_at
+
+    def _node_at(self, index: int) -> Optional[_Node]:
+        """Node at 0-based ``index``, or ``None`` past the end."""
+        if index >= self._size:
+            return None
+        target = index + 1
+        node = self._head
+        position = 0
+        for lvl in reversed(range(_MAX_LEVEL)):
+            while node.next[lvl] is not None and position + node.width[lvl] <= target:
+                position += node.width[lvl]
+                node = node.next[lvl]
+        return node
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    member_id: int
+    member_name: str
+    response_points: int
+    share_points: int
+    total_points: int
+    updated_at: datetime
+
+    @property
+    def sort_key(self) -> tuple:
+        # Same order as ORDER BY total_points DESC, updated_at DESC (member id breaks ties).
+        return (-self.total_points, -self.updated_at.timestamp(), self.member_id)
+
+    def as_dict(self, rank: int) -> dict:
+        return {
+            'rank': rank,
+            'member_name': self.member_name,
+            'response_points': self.response_points,
+            'share_points': self.share_points,
+            'total_points': self.total_points,
+        }
+
+
+class RoundLeaderboard:
+    """All player scores of one round, kept in leaderboard order."""
+
+    def __init__(self):
+        self._entries: dict[int, LeaderboardEntry] = {}
+        self._order = IndexableSkiplist()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def upsert(self, entry: LeaderboardEntry) -> None:
+        old = self._entries.get(entry.member_id)
+        if old is not None and (old == entry or old.updated_at > entry.updated_at):
+            # Unchanged, or a sync that read the row before a newer one was applied.
+            return
+        if old is not None:
+            self._order.remove(old.sort_key)
+        self._entries[entry.member_id] = entry
+        self._order.insert(entry.sort_key)
+
+    def get(self, member_id: int) -> Optional[LeaderboardEntry]:
+        return self._entries.get(member_id)
+
+    def top(self, n: int) -> list[tuple[int, LeaderboardEntry]]:
+        return self._ranked(0, n)
+
+    def rank_of(self, member_id: int) -> Optional[int]:
+        entry = self._entries.get(member_id)
+        if entry is None:
+            return None
+        return self._order.index(entry.sort_key) + 1
+
+    def around(self, member_id: int, k: int) -> list[tuple[int, LeaderboardEntry]]:
+        """The member's entry with up to ``k`` neighbours on each side."""
+        rank = self.rank_of(member_id)
+        if rank is None:
+            return []
+        return self._ranked(rank - 1 - k, rank + k)
+
+    def _ranked(self, start: int, stop: int) -> list[tuple[int, LeaderboardEntry]]:
+        start = max(start, 0)
+        return [
+            (rank, self._entries[key[-1]])
+            for rank, key in enumerate(self._order.islice(start, stop), start=start + 1)
+        ]
+
+
+@dataclass
+class _RoundState:
+    board: RoundLeaderboard
+    version: int
+    high_water: Optional[datetime]
+    rebuilt_at: float
+
+
+class LeaderboardStore:
+    """Per-round in-process leaderboards synced from ``PlayerScore``.
+
+    A round is rebuilt on first use and every ``rebuild_interval`` seconds; in between,
+    a version change only re-reads the scores updated since the last sync.
+    """
+
+    def __init__(self, *, rebuild_interval: float = REBUILD_INTERVAL_SECONDS, max_rounds: int = MAX_TRACKED_ROUNDS):
+        self.rebuild_interval = rebuild_interval
+        self.max_rounds = max_rounds
+        self._lock = threading.Lock()
+        self._rounds: OrderedDict[int, _RoundState] = OrderedDict()
+
+    def top(self, round_obj: GameRound, n: int = LEADERBOARD_SIZE) -> list[dict]:
+        state = self._sync(round_obj)
+        with self._lock:
+            return [entry.as_dict(rank) for rank, entry in state.board.top(n)]
+
+    def rank_of(self, round_obj: GameRound, member_id: int) -> Optional[dict]:
+        state = self._sync(round_obj)
+        with self._lock:
+            rank = state.board.rank_of(member_id)
+            if rank is None:
+                return None
+            return state.board.get(member_id).as_dict(rank)
+
+    def around(self, round_obj: GameRound, member_id: int, k: int) -> list[dict]:
+        state = self._sync(round_obj)
+        with self._lock:
+            return [entry.as_dict(rank) for rank, entry in state.board.around(member_id, k)]
+
+    def rebuild(self, round_obj: GameRound) -> _RoundState:
+        board = RoundLeaderboard()
+        high_water = None
+        for entry in self._load(round_obj.id):
+            board.upsert(entry)
+            if high_water is None or entry.updated_at > high_water:
+                high_water = entry.updated_at
+        state = _RoundState(board=board, version=round_obj.version, high_water=high_water, rebuilt_at=time.monotonic())
+        with self._lock:
+            self._rounds[round_obj.id] = state
+            self._rounds.move_to_end(round_obj.id)
+            while len(self._rounds) > self.max_rounds:
+                self._rounds.popitem(last=False)
+        return state
+
+    def discard(self, round_id: int) -> None:
+        with self._lock:
+            self._rounds.pop(round_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rounds.clear()
+
+    def _sync(self, round_obj: GameRound) -> _RoundState:
+        with self._lock:
+            state = self._rounds.get(round_obj.id)
+            if state is not None:
+                self._rounds.move_to_end(round_obj.id)
+                if time.monotonic() - state.rebuilt_at >= self.rebuild_interval:
+                    state = None
+                elif state.version >= round_obj.version:
+                    return state
+        if state is None:
+            return self.rebuild(round_obj)
+
+        since = state.high_water - SYNC_SLACK if state.high_water is not None else None
+        entries = self._load(round_obj.id, since)
+        with self._lock:
+            for entry in entries:
+                state.board.upsert(entry)
+                if state.high_water is None or entry.updated_at > state.high_water:
+                    state.high_water = entry.updated_at
+            state.version = max(state.version, round_obj.version)
+        return state
+
+    @staticmethod
+    def _load(round_id: int, since: Optional[datetime] = None) -> list[LeaderboardEntry]:
+        scores = PlayerScore.objects.filter(round_id=round_id)
+        if since is not None:
+            scores = scores.filter(updated_at__gte=since)
+        rows = scores.values_list(
+            'member_id', 'member__name', 'response_points', 'share_points', 'total_points', 'updated_at'
+        )
+        return [LeaderboardEntry(*row) for row in rows]
+
+
+leaderboards = LeaderboardStore()
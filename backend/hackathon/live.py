@@ -0,0 +1,231 @@
+"""Per-round push updates (Server-Sent Events and WebSocket) for ASGI deployments.
+
+Writes call ``live_updates.publish(round_id)`` once they commit. The hub hands the
+notification to its backend (in-memory by default; set ``LIVE_UPDATES_BACKEND`` to
+a dotted path to share notifications between worker processes), and every process
+with subscribers for that round builds one coalesced frame at most every
+``COALESCE_SECONDS`` and fans it out to all of them.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import re
+import threading
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .finalize import round_leaderboard, round_words, round_words_since
+from .models import GameRound
+
+
+COALESCE_SECONDS = 0.25
+KEEPALIVE_SECONDS = 15.0
+MAX_PENDING_FRAMES = 8
+
+_WS_PATH_RE = re.compile(r'^/ws/rounds/(\d+)/?$')
+
+
+class InMemoryBackend:
+    """Delivers notifications to listeners in this process only."""
+
+    def __init__(self):
+        self._listeners: list[Callable[[int], None]] = []
+        self._lock = threading.Lock()
+
+    def publish(self, round_id: int) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(round_id)
+
+    def listen(self, callback: Callable[[int], None]) -> None:
+        with self._lock:
+            self._listeners.append(callback)
+
+
+def build_frame(round_id: int, since: Optional[int] = None) -> Optional[dict]:
+    round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
+    if round_obj is None:
+        return None
+
+    if round_obj.status == 'closed':
+        since = None
+    if since is None:
+        ranked, total = round_words(round_obj)
+    else:
+        ranked, total = round_words_since(round_obj, since)
+
+    frame = {
+        'type': 'snapshot' if since is None else 'delta',
+        'version': round_obj.version,
+        'status': round_obj.status,
+        'words': [{'text': text, 'count': count} for text, count in ranked],
+        'total_responses': total,
+        'leaderboard': round_leaderboard(round_obj),
+    }
+    if since is not None:
+        frame['since'] = since
+    return frame
+
+
+class _Subscription:
+    def __init__(self, round_id: int):
+        self.round_id = round_id
+        self.frames: deque[dict] = deque()
+        self.resync = False
+        self.wake = asyncio.Event()
+
+    def push(self, frame: dict) -> None:
+        if len(self.frames) >= MAX_PENDING_FRAMES:
+            # Too slow to keep up: drop the backlog and send a fresh snapshot instead.
+            self.frames.clear()
+            self.resync = True
+        else:
+            self.frames.append(frame)
+        self.wake.set()
+
+
+class LiveHub:
+    def __init__(self, backend=None, *, interval: float = COALESCE_SECONDS):
+        self.interval = interval
+        self._backend = backend
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscriptions: dict[int, set[_Subscription]] = {}
+        self._flushers: dict[int, asyncio.Task] = {}
+        self._dirty: set[int] = set()
+        self._versions: dict[int, int] = {}
+        self._backend_lock = threading.Lock()
+        if backend is not None:
+            backend.listen(self._on_change)
+
+    def get_backend(self):
+        with self._backend_lock:
+            if self._backend is None:
+                backend_path = getattr(settings, 'LIVE_UPDATES_BACKEND', 'hackathon.live.InMemoryBackend')
+                self._backend = import_string(backend_path)()
+                self._backend.listen(self._on_change)
+            return self._backend
+
+    def publish(self, round_id: int) -> None:
+        """Announce that a round changed; safe to call from any thread."""
+        self.get_backend().publish(round_id)
+
+    async def frames(self, round_id: int) -> AsyncIterator[Optional[dict]]:
+        """Yield a snapshot, then coalesced deltas; ``None`` marks a keep-alive tick."""
+        self.get_backend()
+        self._loop = asyncio.get_running_loop()
+        sub = _Subscription(round_id)
+        self._subscriptions.setdefault(round_id, set()).add(sub)
+        try:
+            frame = await sync_to_async(build_frame)(round_id)
+            if frame is None:
+                return
+            yield frame
+            while True:
+                try:
+                    await asyncio.wait_for(sub.wake.wait(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                sub.wake.clear()
+                if sub.resync:
+                    sub.resync = False
+                    sub.frames.clear()
+                    frame = await sync_to_async(build_frame)(round_id)
+                    if frame is not None:
+                        yield frame
+                    continue
+                while sub.frames:
+                    yield sub.frames.popleft()
+        finally:
+            subs = self._subscriptions.get(round_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscriptions[round_id]
+                    self._versions.pop(round_id, None)
+
+    def _on_change(self, round_id: int) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        # A fresh context keeps the flusher from inheriting the publisher's
+        # sync_to_async executor state when publish() runs inside a sync view.
+        loop.call_soon_threadsafe(self._mark_dirty, round_id, context=contextvars.Context())
+
+    def _mark_dirty(self, round_id: int) -> None:
+        if round_id not in self._subscriptions:
+            return
+        self._dirty.add(round_id)
+        if round_id not in self._flushers:
+            self._flushers[round_id] = asyncio.get_running_loop().create_task(self._flush(round_id))
+
+    async def _flush(self, round_id: int) -> None:
+        try:
+            while round_id in self._dirty and round_id in self._subscriptions:
+                self._dirty.discard(round_id)
+                frame = await sync_to_async(build_frame)(round_id, self._versions.get(round_id))
+                if frame is not None:
+                    self._versions[round_id] = frame['version']
+                    for sub in list(self._subscriptions.get(round_id, ())):
+                        sub.push(frame)
+                # Changes arriving during the pause are folded into the next frame.
+                await asyncio.sleep(self.interval)
+        finally:
+            self._flushers.pop(round_id, None)
+
+
+live_updates = LiveHub()
+
+
+async def sse_stream(round_id: int) -> AsyncIterator[str]:
+    yield 'retry: 3000\n\n'
+    async with aclosing(live_updates.frames(round_id)) as frames:
+        async for frame in frames:
+            if frame is None:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"id: {frame['version']}\nevent: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
+
+
+async def websocket_application(scope, receive, send) -> None:
+    """Minimal ASGI WebSocket endpoint at ``/ws/rounds/<id>`` sending the same frames as SSE."""
+    match = _WS_PATH_RE.match(scope.get('path') or '')
+
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if match is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    round_id = int(match.group(1))
+    if not await GameRound.objects.filter(id=round_id).aexists():
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def pump() -> None:
+        async with aclosing(live_updates.frames(round_id)) as frames:
+            async for frame in frames:
+                if frame is not None:
+                    await send({'type': 'websocket.send', 'text': json.dumps(frame)})
+
+    pump_task = asyncio.ensure_future(pump())
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+    finally:
+        pump_task.cancel()
+        try:
+            await pump_task
+        except asyncio.CancelledError:
+            pass
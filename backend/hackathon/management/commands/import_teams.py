@@ -1,11 +1,22 @@
 import csv
+import multiprocessing
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
-from hackathon.auth import PBKDF2_ITERATIONS, hash_password
-from hackathon.models import AppUser, AppUserMember
+from hackathon.hashers import StoredPassword, get_hasher, verify_stored
+from hackathon.identity import identity_cache
+from hackathon.models import AppUser, AppUserMember, normalize_email
+from hackathon.session_cache import session_cache
 
 
 _TEAM_NO_RE = re.compile(r'^\s*Team\s*(\d+)\s*$', flags=re.IGNORECASE)
@@ -29,6 +40,22 @@ def _normalize_phone(raw: str) -> str:
     return phone
 
 
+_MEMBER_FIELDS = ('name', 'email', 'email_normalized', 'phone')
+
+
+@dataclass
+class _Plan:
+    """Changes an import makes, worked out from one read of the existing rows."""
+    users: dict[int, AppUser]  # existing accounts of the CSV's teams, by team_no
+    new_teams: list[int] = field(default_factory=list)
+    renamed_users: list[AppUser] = field(default_factory=list)  # username / is_active change
+    stale_password_users: list[AppUser] = field(default_factory=list)  # hash no longer matches
+    new_members: list[tuple[int, dict]] = field(default_factory=list)  # (team_no, CSV member)
+    updated_members: list[tuple[int, AppUserMember]] = field(default_factory=list)  # (team_no, member)
+    deleted_members: list[AppUserMember] = field(default_factory=list)
+    touched_user_ids: set[int] = field(default_factory=set)
+
+
 class Command(BaseCommand):
     help = 'Import team accounts and members from hackathon_users.csv'
 
@@ -42,18 +69,34 @@ class Command(BaseCommand):
         parser.add_argument(
             '--dry-run',
             action='store_true',
-            help='Validate and show counts without writing to DB',
+            help='Validate and show the planned changes without writing to DB',
         )
         parser.add_argument(
             '--append-only',
             action='store_true',
             help='Only create new teams/members found in CSV; do not update passwords or delete existing members',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processes hashing and checking passwords (default: one per CPU; 0 hashes in this process)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows per bulk insert/update/delete statement (default: 500)',
+        )
 
     def handle(self, *args, **options):
         csv_path = options['csv_path']
         dry_run = options['dry_run']
         append_only = options['append_only']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        started = time.monotonic()
 
         try:
             with open(csv_path, newline='', encoding='utf-8') as f:
@@ -99,7 +142,9 @@ class Command(BaseCommand):
 
             seen_member_ids.add(member_id)
 
-            teams.setdefault(team_no, []).append({'member_id': member_id, 'name': name, 'email': email, 'phone': phone})
+            teams.setdefault(team_no, []).append(
+                {'member_id': member_id, 'name': name, 'email': email, 'email_normalized': normalize_email(email), 'phone': phone}
+            )
 
         if not teams:
             raise CommandError('No valid team rows found in CSV.')
@@ -121,76 +166,226 @@ class Command(BaseCommand):
                     )
                 phones[m['phone']] = m['member_id']
 
-        if append_only:
-            for team_no, members in teams.items():
-                existing_user = AppUser.objects.filter(team_no=team_no).first()
-                if existing_user is None:
-                    continue
-
-                existing_member_ids = set(
-                    AppUserMember.objects.filter(user=existing_user).values_list('member_id', flat=True)
-                )
-                incoming_member_ids = {m['member_id'] for m in members}
-                new_member_ids = incoming_member_ids - existing_member_ids
-                total_after = len(existing_member_ids) + len(new_member_ids)
-                if total_after > 5:
-                    raise CommandError(
-                        f'Team {team_no} would have {total_after} members (> 5) after append-only import.'
-                    )
-
-        if dry_run:
-            self.stdout.write(self.style.WARNING('Dry-run enabled: no DB changes.'))
-            return
-
-        with transaction.atomic():
-            for team_no, members in teams.items():
-                unique_by_member_id: dict[str, dict] = {}
-                for m in members:
-                    unique_by_member_id[m['member_id']] = m
-                members = list(unique_by_member_id.values())
-
-                password = _format_password(team_no)
-                salt_b64, password_hash_b64, iterations = hash_password(password, iterations=PBKDF2_ITERATIONS)
-
-                user, created = AppUser.objects.get_or_create(
-                    team_no=team_no,
-                    defaults={
-                        'username': f'Team {team_no}',
-                        'email': None,
-                        'phone': None,
-                        'password_salt_b64': salt_b64,
-                        'password_hash_b64': password_hash_b64,
-                        'password_iterations': iterations,
-                        'is_active': True,
-                    },
-                )
-
-                if not append_only and not created:
-                    AppUser.objects.filter(id=user.id).update(
-                        username=f'Team {team_no}',
-                        password_salt_b64=salt_b64,
-                        password_hash_b64=password_hash_b64,
-                        password_iterations=iterations,
-                        is_active=True,
-                    )
+        self.stdout.write(f'Validated CSV in {time.monotonic() - started:.2f}s')
 
-                if not append_only:
-                    AppUserMember.objects.filter(user=user).exclude(member_id__in=[m['member_id'] for m in members]).delete()
+        hasher = get_hasher()
+        self.workers = options['workers']
+        pool = None
+        if self.workers > 0 and not dry_run:
+            # spawn: the parent holds a DB connection that must not be forked
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            with self._phase('Read existing teams and members'):
+                plan = self._read(teams, append_only)
+            if not dry_run:
+                # A full hash per existing team: as slow as hashing them all, so not on a dry run
+                with self._phase('Checked stored passwords'):
+                    self._check_passwords(plan, append_only, pool)
+
+            self._report(plan, dry_run, passwords_checked=not (dry_run or append_only))
+            if dry_run:
+                self.stdout.write(self.style.WARNING('Dry-run enabled: no DB changes.'))
+                return
+
+            with self._phase('Hashed passwords'):
+                to_hash = plan.new_teams + [user.team_no for user in plan.stale_password_users]
+                hashes = dict(zip(to_hash, self._map('Hashing', hasher.encode, [_format_password(t) for t in to_hash], pool=pool)))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        with self._phase('Wrote changes'):
+            with transaction.atomic():
+                self._write(plan, teams, hashes, batch_size)
+
+        # Sessions and cached logins of updated teams (and of deleted or moved members) must
+        # not outlive the import; servers see the bumped AppUser.updated_at on their next
+        # session_cache poll.
+        session_cache.invalidate_users(plan.touched_user_ids)
+        identity_cache.clear()
+
+        kept = 'not checked' if append_only else 'verified and kept'
+        self.stdout.write(f'Passwords hashed: {len(hashes)}; stored hashes {kept}: {len(teams) - len(hashes)}')
+        self.stdout.write(self.style.SUCCESS(f'Import completed in {time.monotonic() - started:.2f}s.'))
+
+    @contextmanager
+    def _phase(self, label: str):
+        phase_started = time.monotonic()
+        yield
+        self.stdout.write(f'{label} in {time.monotonic() - phase_started:.2f}s')
+
+    def _map(self, label: str, fn, *iterables, pool: Optional[ProcessPoolExecutor]) -> list:
+        args = list(zip(*iterables))
+        if not args:
+            return []
+        if pool is None:
+            results = (fn(*a) for a in args)
+        else:
+            results = pool.map(fn, *zip(*args), chunksize=max(1, len(args) // (self.workers * 4)))
+        out = []
+        step = max(1, len(args) // 10)
+        for result in results:
+            out.append(result)
+            if len(out) % step == 0 or len(out) == len(args):
+                self.stdout.write(f'  {label}: {len(out)}/{len(args)}')
+        return out
+
+    def _read(self, teams: dict[int, list[dict]], append_only: bool) -> _Plan:
+        users = AppUser.objects.filter(team_no__in=list(teams)).in_bulk(field_name='team_no')
+        incoming_ids = {m['member_id'] for members in teams.values() for m in members}
+        existing_members = list(
+            AppUserMember.objects.select_related('user').filter(
+                Q(user__in=list(users.values())) | Q(member_id__in=incoming_ids)
+            )
+        )
+        by_member_id = {m.member_id: m for m in existing_members}
+        by_user: dict[int, list[AppUserMember]] = {}
+        for m in existing_members:
+            by_user.setdefault(m.user_id, []).append(m)
 
+        plan = _Plan(users=users)
+        for team_no, members in sorted(teams.items()):
+            user = users.get(team_no)
+            if user is None:
+                plan.new_teams.append(team_no)
+            elif not append_only and (user.username != f'Team {team_no}' or not user.is_active):
+                plan.renamed_users.append(user)
+                plan.touched_user_ids.add(user.id)
+
+            if append_only:
+                new_ids = set()
                 for m in members:
-                    if append_only:
-                        member, created_member = AppUserMember.objects.get_or_create(
-                            member_id=m['member_id'],
-                            defaults={'user': user, 'phone': m['phone'], 'name': m['name'], 'email': m['email']},
+                    member = by_member_id.get(m['member_id'])
+                    if member is None:
+                        new_ids.add(m['member_id'])
+                        plan.new_members.append((team_no, m))
+                        if user is not None:
+                            plan.touched_user_ids.add(user.id)
+                    elif user is None or member.user_id != user.id:
+                        raise CommandError(
+                            f"Member ID {m['member_id']!r} already exists under Team {member.user.team_no}; cannot append into Team {team_no}."
                         )
-                        if not created_member and member.user_id != user.id:
-                            raise CommandError(
-                                f"Member ID {m['member_id']!r} already exists under Team {member.user.team_no}; cannot append into Team {team_no}."
-                            )
-                    else:
-                        AppUserMember.objects.update_or_create(
-                            member_id=m['member_id'],
-                            defaults={'user': user, 'phone': m['phone'], 'name': m['name'], 'email': m['email']},
+                if user is not None:
+                    total_after = len(by_user.get(user.id, [])) + len(new_ids)
+                    if total_after > 5:
+                        raise CommandError(
+                            f'Team {team_no} would have {total_after} members (> 5) after append-only import.'
                         )
+                continue
+
+            for m in members:
+                member = by_member_id.get(m['member_id'])
+                if member is None:
+                    plan.new_members.append((team_no, m))
+                    if user is not None:
+                        # Servers' cached logins of this phone / email must pick up the new team
+                        plan.touched_user_ids.add(user.id)
+                elif user is None or member.user_id != user.id or any(getattr(member, f) != m[f] for f in _MEMBER_FIELDS):
+                    plan.updated_members.append((team_no, member))
+                    plan.touched_user_ids.add(member.user_id)
+            if user is not None:
+                # Members listed under another team are moved there, not deleted
+                for member in by_user.get(user.id, []):
+                    if member.member_id not in incoming_ids:
+                        plan.deleted_members.append(member)
+                        plan.touched_user_ids.add(user.id)
+        return plan
+
+    def _check_passwords(self, plan: _Plan, append_only: bool, pool: Optional[ProcessPoolExecutor]) -> None:
+        """Find the existing teams whose stored hash no longer verifies their password.
+
+        A hash that matches is kept even if its parameters are outdated: the
+        team's next login upgrades it. Keeping a hash is not free: checking it
+        derives the key once, which costs as much as hashing the password anew.
+        """
+        if append_only:
+            return
+        users = sorted(plan.users.values(), key=lambda user: user.team_no)
+        matches = self._map(
+            'Checking',
+            verify_stored,
+            [_format_password(user.team_no) for user in users],
+            [StoredPassword.of(user) for user in users],
+            pool=pool,
+        )
+        for user, matched in zip(users, matches):
+            if not matched:
+                plan.stale_password_users.append(user)
+                plan.touched_user_ids.add(user.id)
+
+    def _report(self, plan: _Plan, dry_run: bool, passwords_checked: bool) -> None:
+        rehash = f'{len(plan.stale_password_users)} to re-hash' if passwords_checked else 'stored passwords not checked'
+        self.stdout.write(
+            f'Teams: {len(plan.new_teams)} to create, {len(plan.renamed_users)} to rename/reactivate, {rehash}'
+        )
+        self.stdout.write(
+            f'Members: {len(plan.new_members)} to create, {len(plan.updated_members)} to update, '
+            f'{len(plan.deleted_members)} to delete'
+        )
+        if not dry_run:
+            return
+        for team_no in plan.new_teams:
+            self.stdout.write(f'  create Team {team_no}')
+        for user in plan.renamed_users:
+            self.stdout.write(f'  update {user.username!r} -> Team {user.team_no} (active)')
+        for team_no, m in plan.new_members:
+            self.stdout.write(f"  create member {m['member_id']} in Team {team_no}")
+        for team_no, member in plan.updated_members:
+            self.stdout.write(f'  update member {member.member_id} (Team {member.user.team_no} -> Team {team_no})')
+        for member in plan.deleted_members:
+            self.stdout.write(f'  delete member {member.member_id} from Team {member.user.team_no}')
+
+    def _write(self, plan: _Plan, teams: dict[int, list[dict]], hashes: dict[int, StoredPassword], batch_size: int) -> None:
+        AppUser.objects.bulk_create(
+            [
+                AppUser(
+                    team_no=team_no, username=f'Team {team_no}', email=None, phone=None, is_active=True,
+                    **hashes[team_no].as_fields(),
+                )
+                for team_no in plan.new_teams
+            ],
+            batch_size=batch_size,
+        )
+        # MySQL does not return the new ids from a bulk insert: read them back.
+        users = dict(plan.users)
+        users.update(AppUser.objects.filter(team_no__in=plan.new_teams).in_bulk(field_name='team_no'))
+
+        for user in plan.renamed_users:
+            user.username, user.is_active = f'Team {user.team_no}', True
+        AppUser.objects.bulk_update(plan.renamed_users, ['username', 'is_active'], batch_size=batch_size)
+        for user in plan.stale_password_users:
+            for name, value in hashes[user.team_no].as_fields().items():
+                setattr(user, name, value)
+        AppUser.objects.bulk_update(
+            plan.stale_password_users,
+            ['password_algorithm', 'password_salt_b64', 'password_hash_b64', 'password_iterations'],
+            batch_size=batch_size,
+        )
+
+        deleted_ids = [member.id for member in plan.deleted_members]
+        for offset in range(0, len(deleted_ids), batch_size):
+            AppUserMember.objects.filter(id__in=deleted_ids[offset : offset + batch_size]).delete()
+
+        rows = {m['member_id']: m for members in teams.values() for m in members}
+        now = timezone.now()
+        for team_no, member in plan.updated_members:
+            member.user = users[team_no]
+            for name in _MEMBER_FIELDS:
+                setattr(member, name, rows[member.member_id][name])
+            member.updated_at = now
+        AppUserMember.objects.bulk_update(
+            [member for _, member in plan.updated_members], ['user', *_MEMBER_FIELDS, 'updated_at'], batch_size=batch_size
+        )
+        AppUserMember.objects.bulk_create(
+            [
+                AppUserMember(user=users[team_no], member_id=m['member_id'], **{name: m[name] for name in _MEMBER_FIELDS})
+                for team_no, m in plan.new_members
+            ],
+            batch_size=batch_size,
+        )
 
-        self.stdout.write(self.style.SUCCESS('Import completed.'))
+        # Last, so the stamp is close to the commit that servers' session caches poll for
+        touched_ids = sorted(plan.touched_user_ids)
+        now = timezone.now()
+        for offset in range(0, len(touched_ids), batch_size):
+            AppUser.objects.filter(id__in=touched_ids[offset : offset + batch_size]).update(updated_at=now)
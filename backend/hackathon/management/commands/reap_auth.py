@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from hackathon.reaper import BATCH_PAUSE_SECONDS, BATCH_SIZE, RETENTION_HOURS, reap
+
+
+class Command(BaseCommand):
+    help = 'Delete expired/revoked sessions and expired/consumed OTP challenges in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-hours',
+            type=float,
+            default=getattr(settings, 'REAPER_RETENTION_HOURS', RETENTION_HOURS),
+            help='Keep dead rows this long after they expired, were revoked or were consumed (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'REAPER_BATCH_SIZE', BATCH_SIZE),
+            help='Rows deleted per transaction (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=getattr(settings, 'REAPER_BATCH_PAUSE_SECONDS', BATCH_PAUSE_SECONDS),
+            help='Seconds to sleep between batches (default: %(default)s)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the rows that would be deleted without writing to DB',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['retention_hours'] < 0:
+            raise CommandError('--retention-hours cannot be negative')
+
+        results = reap(
+            retention=timedelta(hours=options['retention_hours']),
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'would be deleted' if options['dry_run'] else 'deleted'
+        for result in results:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{result.model}: {result.deleted} rows {verb} in {result.batches} batches, '
+                    f'{result.seconds:.2f}s ({result.rows_per_second:.0f} rows/s)'
+                )
+            )
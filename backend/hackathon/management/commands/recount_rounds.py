@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F
+
+from hackathon.models import GameRound, PlayerScore, Response, ShareEvent
+
+
+COUNTER_FIELDS = ['response_count', 'distinct_word_count', 'share_count', 'participant_count']
+
+
+def compute_round_counters(round_ids: list[int]) -> dict[int, dict[str, int]]:
+    counters = {round_id: dict.fromkeys(COUNTER_FIELDS, 0) for round_id in round_ids}
+
+    response_rows = (
+        Response.objects.filter(round_id__in=round_ids)
+        .values('round_id')
+        .annotate(responses=Count('id'), words=Count('word_normalized', distinct=True))
+    )
+    for row in response_rows:
+        counters[row['round_id']]['response_count'] = row['responses']
+        counters[row['round_id']]['distinct_word_count'] = row['words']
+
+    share_rows = ShareEvent.objects.filter(round_id__in=round_ids).values('round_id').annotate(shares=Count('id'))
+    for row in share_rows:
+        counters[row['round_id']]['share_count'] = row['shares']
+
+    score_rows = PlayerScore.objects.filter(round_id__in=round_ids).values('round_id').annotate(players=Count('id'))
+    for row in score_rows:
+        counters[row['round_id']]['participant_count'] = row['players']
+
+    return counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized GameRound counters from Response, ShareEvent and PlayerScore'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--round',
+            dest='round_ids',
+            type=int,
+            action='append',
+            help='Only recount this round id (repeatable; default: all rounds)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rounds locked and recounted per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report rounds whose counters are wrong without writing to DB',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        rounds_qs = GameRound.objects.order_by('id')
+        if options['round_ids']:
+            rounds_qs = rounds_qs.filter(id__in=options['round_ids'])
+        all_ids = list(rounds_qs.values_list('id', flat=True))
+
+        started = time.monotonic()
+        repaired = 0
+        for offset in range(0, len(all_ids), batch_size):
+            batch_ids = all_ids[offset : offset + batch_size]
+            with transaction.atomic():
+                # Locking the rounds holds off concurrent writers while their rows are counted.
+                rounds = list(GameRound.objects.select_for_update().filter(id__in=batch_ids).order_by('id'))
+                counters = compute_round_counters(batch_ids)
+
+                stale = []
+                for round_obj in rounds:
+                    expected = counters[round_obj.id]
+                    if all(getattr(round_obj, name) == value for name, value in expected.items()):
+                        continue
+                    self.stdout.write(
+                        f'Round {round_obj.id}: '
+                        + ', '.join(f'{name} {getattr(round_obj, name)} -> {expected[name]}' for name in COUNTER_FIELDS)
+                    )
+                    for name, value in expected.items():
+                        setattr(round_obj, name, value)
+                    stale.append(round_obj)
+
+                if stale and not dry_run:
+                    GameRound.objects.bulk_update(stale, COUNTER_FIELDS)
+                    # New version: ETags, render keys and cached reads of the old numbers go stale
+                    GameRound.objects.filter(id__in=[round_obj.id for round_obj in stale]).update(version=F('version') + 1)
+                repaired += len(stale)
+
+        elapsed = time.monotonic() - started
+        verb = 'would be repaired' if dry_run else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {len(all_ids)} rounds in {elapsed:.2f}s; {repaired} {verb}.'))
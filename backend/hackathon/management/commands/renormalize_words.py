@@ -0,0 +1,99 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from hackathon.finalize import refresh_snapshot
+from hackathon.models import GameRound, Response
+from hackathon.wordnorm import normalize_many
+
+from .recount_rounds import compute_round_counters
+
+
+class Command(BaseCommand):
+    help = 'Re-run the current word normalization over stored responses and fix Response.word_normalized'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--round',
+            dest='round_ids',
+            type=int,
+            action='append',
+            help='Only re-normalize this round id (repeatable; default: all rounds)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Responses read and updated per transaction (default: 2000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many responses would change without writing to DB',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        responses_qs = Response.objects.order_by('id')
+        if options['round_ids']:
+            responses_qs = responses_qs.filter(round_id__in=options['round_ids'])
+
+        started = time.monotonic()
+        checked = changed = rejected = 0
+        touched_rounds = set()
+        last_id = 0
+        while True:
+            rows = list(responses_qs.filter(id__gt=last_id).values_list('id', 'round_id', 'word', 'word_normalized')[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            checked += len(rows)
+
+            stale = []
+            for (response_id, round_id, _, old), result in zip(rows, normalize_many(row[2] for row in rows)):
+                if result.error:
+                    # Stored before the current rules; keep its old key rather than dropping the answer.
+                    rejected += 1
+                    continue
+                if result.normalized != old:
+                    stale.append(Response(id=response_id, word_normalized=result.normalized))
+                    touched_rounds.add(round_id)
+            changed += len(stale)
+            if stale and not dry_run:
+                with transaction.atomic():
+                    Response.objects.bulk_update(stale, ['word_normalized'])
+
+        if touched_rounds and not dry_run:
+            self._refresh_rounds(sorted(touched_rounds))
+
+        elapsed = time.monotonic() - started
+        verb = 'would change' if dry_run else 'changed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Checked {checked} responses in {elapsed:.2f}s; {changed} {verb} in {len(touched_rounds)} rounds, '
+                f'{rejected} no longer pass validation and were left as they are.'
+            )
+        )
+
+    def _refresh_rounds(self, round_ids):
+        with transaction.atomic():
+            statuses = dict(
+                GameRound.objects.select_for_update().filter(id__in=round_ids).order_by('id').values_list('id', 'status')
+            )
+            counters = compute_round_counters(round_ids)
+            for round_id, status in statuses.items():
+                # The new version makes cached clouds and ETags go stale; the new words
+                # revision makes every server rebuild its word counts for the round.
+                GameRound.objects.filter(id=round_id).update(
+                    distinct_word_count=counters[round_id]['distinct_word_count'],
+                    version=F('version') + 1,
+                    words_revision=F('words_revision') + 1,
+                )
+                if status == 'closed':
+                    refresh_snapshot(round_id)
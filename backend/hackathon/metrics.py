@@ -0,0 +1,255 @@
+"""Per-endpoint request metrics, served in Prometheus text format at ``/api/_metrics``.
+
+``MetricsMiddleware`` times every request and files it under its URL name. It
+records the status, a latency histogram, response bytes, and the time the view
+spent in the database and in JSON serialization. Queries are counted by a wrapper
+installed on every DB connection as it opens (``connection_created``). The
+wrapper adds to the current request's ``RequestStats``, which lives in a context
+variable. Queries that async views run through ``sync_to_async`` are counted
+too. JSON time comes from the responses views build with this module's
+``JsonResponse`` (imported as ``TimedJsonResponse`` for their data payloads).
+
+A request slower than ``METRICS_SLOW_REQUEST_SECONDS`` is logged with its slowest
+statements and its most repeated one (an N+1 shows up as one statement run
+many times).
+"""
+import hmac
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse, JsonResponse as DjangoJsonResponse
+from django.urls import Resolver404, resolve
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SLOW_REQUEST_SECONDS = 1.0
+SLOW_SQL_LOGGED = 5
+UNMATCHED = '(unmatched)'
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds', 'json_seconds', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.json_seconds = 0.0
+        self.statements: list[tuple[float, str]] = []
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar('request_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        stats.statements.append((elapsed, sql))
+
+
+def _instrument_connection(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_instrument_connection, dispatch_uid='hackathon.metrics')
+
+
+class JsonResponse(DjangoJsonResponse):
+    """``django.http.JsonResponse`` that adds its serialization time to the request's metrics."""
+
+    def __init__(self, *args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            super().__init__(*args, **kwargs)
+            return
+        started = time.perf_counter()
+        super().__init__(*args, **kwargs)
+        stats.json_seconds += time.perf_counter() - started
+
+
+def _histogram_index(buckets: tuple, value: float) -> int:
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return len(buckets)
+
+
+class _ViewMetrics:
+    __slots__ = ('statuses', 'latency', 'latency_sum', 'queries', 'query_counts', 'db_seconds', 'json_seconds', 'bytes')
+
+    def __init__(self):
+        self.statuses: Counter[int] = Counter()
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.query_counts = [0] * (len(QUERY_BUCKETS) + 1)
+        self.db_seconds = 0.0
+        self.json_seconds = 0.0
+        self.bytes = 0
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: dict[str, _ViewMetrics] = {}
+
+    def begin(self) -> tuple[RequestStats, object]:
+        stats = RequestStats()
+        return stats, _current.set(stats)
+
+    def discard(self, token) -> None:
+        _current.reset(token)
+
+    def end(self, token, request: HttpRequest, response: HttpResponse, stats: RequestStats, seconds: float) -> None:
+        _current.reset(token)
+        view = _view_name(request)
+        size = 0 if response.streaming else len(response.content)
+        with self._lock:
+            metrics = self._views.get(view)
+            if metrics is None:
+                metrics = self._views[view] = _ViewMetrics()
+            metrics.statuses[response.status_code] += 1
+            metrics.latency[_histogram_index(LATENCY_BUCKETS, seconds)] += 1
+            metrics.latency_sum += seconds
+            metrics.queries += stats.queries
+            metrics.query_counts[_histogram_index(QUERY_BUCKETS, stats.queries)] += 1
+            metrics.db_seconds += stats.db_seconds
+            metrics.json_seconds += stats.json_seconds
+            metrics.bytes += size
+        if seconds >= getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS', SLOW_REQUEST_SECONDS):
+            _log_slow(request, view, response, stats, seconds)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            views = {name: _copy(metrics) for name, metrics in sorted(self._views.items())}
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        family('wordcloud_requests_total', 'counter', 'Requests by URL name and status.')
+        for view, m in views.items():
+            for status, count in sorted(m.statuses.items()):
+                lines.append(f'wordcloud_requests_total{{view="{view}",status="{status}"}} {count}')
+        family('wordcloud_request_duration_seconds', 'histogram', 'Time from the metrics middleware to the response.')
+        for view, m in views.items():
+            _histogram(lines, 'wordcloud_request_duration_seconds', view, LATENCY_BUCKETS, m.latency, m.latency_sum)
+        family('wordcloud_db_queries_per_request', 'histogram', 'Database queries per request.')
+        for view, m in views.items():
+            _histogram(lines, 'wordcloud_db_queries_per_request', view, QUERY_BUCKETS, m.query_counts, m.queries)
+        for name, attr, help_text in (
+            ('wordcloud_db_seconds_total', 'db_seconds', 'Time spent executing database queries.'),
+            ('wordcloud_json_seconds_total', 'json_seconds', 'Time spent serializing JSON responses.'),
+            ('wordcloud_response_bytes_total', 'bytes', 'Response body bytes (streamed responses excluded).'),
+        ):
+            family(name, 'counter', help_text)
+            for view, m in views.items():
+                lines.append(f'{name}{{view="{view}"}} {getattr(m, attr)}')
+        lines.extend(_process_metrics())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+def _copy(metrics: _ViewMetrics) -> _ViewMetrics:
+    copy = _ViewMetrics()
+    for name in _ViewMetrics.__slots__:
+        value = getattr(metrics, name)
+        setattr(copy, name, value.copy() if isinstance(value, (list, Counter)) else value)
+    return copy
+
+
+def _histogram(lines: list[str], name: str, view: str, buckets: tuple, counts: list[int], total: float) -> None:
+    cumulative = 0
+    for bound, count in zip(buckets, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {cumulative}')
+    lines.append(f'{name}_sum{{view="{view}"}} {total}')
+    lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+
+
+def _process_metrics() -> list[str]:
+    """Gauges of this process's coalescing, OTP gateway breaker, password pool and response ingest."""
+    from . import otp_gateway, password_pool
+    from .ingest import response_ingestor
+    from .singleflight import singleflight_stats
+
+    lines = ['# HELP wordcloud_singleflight_total Reads per coalescing group, by outcome.',
+             '# TYPE wordcloud_singleflight_total counter']
+    for group, stats in sorted(singleflight_stats().items()):
+        for outcome in ('requests', 'executions', 'coalesced', 'errors', 'timeouts'):
+            lines.append(f'wordcloud_singleflight_total{{group="{group}",outcome="{outcome}"}} {stats[outcome]}')
+    gateway = otp_gateway._gateway
+    if gateway is not None:
+        lines.append('# HELP wordcloud_otp_gateway_open Whether the OTP gateway circuit breaker is rejecting calls.')
+        lines.append('# TYPE wordcloud_otp_gateway_open gauge')
+        lines.append(f'wordcloud_otp_gateway_open {int(gateway.breaker.state == "open")}')
+    verifier = password_pool._verifier
+    if verifier is not None:
+        lines.append('# HELP wordcloud_password_checks_pending Logins being verified or queued for the password pool.')
+        lines.append('# TYPE wordcloud_password_checks_pending gauge')
+        lines.append(f'wordcloud_password_checks_pending {verifier.pending}')
+    lines.append('# HELP wordcloud_ingest_duplicates_dropped_total Queued responses dropped at write time: '
+                 'the member had already responded through another process.')
+    lines.append('# TYPE wordcloud_ingest_duplicates_dropped_total counter')
+    lines.append(f'wordcloud_ingest_duplicates_dropped_total {response_ingestor.duplicates_dropped}')
+    return lines
+
+
+def _view_name(request: HttpRequest) -> str:
+    match = request.resolver_match
+    if match is None:
+        # Answered before URL resolution (the read micro-cache) or not found
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return UNMATCHED
+    return match.url_name or match.route or UNMATCHED
+
+
+def _log_slow(request: HttpRequest, view: str, response: HttpResponse, stats: RequestStats, seconds: float) -> None:
+    slowest = sorted(stats.statements, reverse=True)[:SLOW_SQL_LOGGED]
+    repeated = Counter(sql for _, sql in stats.statements).most_common(1)
+    details = [f'  {elapsed * 1000:.1f} ms: {sql}' for elapsed, sql in slowest]
+    if repeated and repeated[0][1] > 1:
+        details.append(f'  most repeated ({repeated[0][1]}x): {repeated[0][0]}')
+    logger.warning(
+        'Slow request %s %s (%s) -> %s in %.0f ms: %d queries in %.0f ms, JSON %.1f ms\n%s',
+        request.method, request.path, view, response.status_code, seconds * 1000,
+        stats.queries, stats.db_seconds * 1000, stats.json_seconds * 1000, '\n'.join(details),
+    )
+
+
+def metrics_authorized(request: HttpRequest) -> Optional[bool]:
+    """``None`` when ``METRICS_TOKEN`` is unset (endpoint off), else whether the bearer token matches."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return None
+    header = request.headers.get('Authorization', '')
+    return header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):].strip(), token)
+
+
+metrics = Metrics()
@@ -1,24 +1,326 @@
 from __future__ import annotations
 
+import gzip
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .metrics import metrics
+from .singleflight import SingleFlight, SingleFlightTimeout
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzipped
+    brotli = None
+
+
+READ_CACHE_TTL_SECONDS = 0.5
+READ_CACHE_MAX_ENTRIES = 2048
+READ_CACHE_WAIT_SECONDS = 5.0
+COMPRESS_MIN_BYTES = 1024
+
+# Public (not per-user) read endpoints served through the micro-cache
+READ_CACHE_PATHS = re.compile(r'^/api/rounds/\d+(/wordcloud(/layout)?|/leaderboard)?$')
+_COMPRESSIBLE_TYPES = ('application/json', 'image/svg+xml', 'text/')
+_UNCACHEABLE_VARY = {'authorization', 'cookie'}
+
+
+class _HybridMiddleware:
+    """Runs natively in both handler modes: sync under WSGI, coroutine under ASGI.
 
+    Subclasses implement ``__call__`` for the sync chain and ``__acall__`` for the
+    async one; Django would otherwise hop threads around every async view.
+    """
+    sync_capable = True
+    async_capable = True
 
-class CorsMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
+
+class CorsMiddleware(_HybridMiddleware):
+    """CORS headers; preflights are answered here, before any other middleware or DB access.
+
+    Keep this first in ``MIDDLEWARE``.
+    """
     def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
         if request.method == 'OPTIONS':
             response = HttpResponse(status=204)
         else:
             response = self.get_response(request)
+        return self._add_headers(request, response)
 
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if request.method == 'OPTIONS':
+            response = HttpResponse(status=204)
+        else:
+            response = await self.get_response(request)
+        return self._add_headers(request, response)
+
+    @staticmethod
+    def _add_headers(request: HttpRequest, response: HttpResponse) -> HttpResponse:
         origin = request.headers.get('Origin')
         if origin:
             response['Access-Control-Allow-Origin'] = origin
-            response['Vary'] = 'Origin'
+            patch_vary_headers(response, ('Origin',))
             response['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            response['Access-Control-Allow-Headers'] = 'Authorization, Content-Type'
+            response['Access-Control-Allow-Headers'] = 'Authorization, Content-Type, If-None-Match'
+            response['Access-Control-Expose-Headers'] = 'ETag'
             response['Access-Control-Max-Age'] = '86400'
+        return response
+
+
+class MetricsMiddleware(_HybridMiddleware):
+    """Per-URL-name request metrics (hackathon/metrics.py); keep it right after ``CorsMiddleware``."""
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token = metrics.begin()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            metrics.discard(token)
+            raise
+        metrics.end(token, request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        stats, token = metrics.begin()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            metrics.discard(token)
+            raise
+        metrics.end(token, request, response, stats, time.perf_counter() - started)
+        return response
+
+
+def _accepted_encoding(request: HttpRequest) -> Optional[str]:
+    accepted = {part.split(';')[0].strip().lower() for part in request.headers.get('Accept-Encoding', '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def _weak_etag(etag: str) -> str:
+    # The compressed bytes differ from the identity ones, so the validator becomes weak.
+    return etag if etag.startswith('W/') else f'W/{etag}'
+
+
+def _compressible(response: HttpResponse, min_bytes: int) -> bool:
+    return (
+        not response.streaming
+        and response.status_code == 200
+        and not response.has_header('Content-Encoding')
+        and len(response.content) >= min_bytes
+        and response.get('Content-Type', '').startswith(_COMPRESSIBLE_TYPES)
+    )
+
+
+class CompressionMiddleware(_HybridMiddleware):
+    """gzip (or brotli, when installed and accepted) for responses of at least ``COMPRESS_MIN_BYTES``."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_bytes = getattr(settings, 'COMPRESS_MIN_BYTES', COMPRESS_MIN_BYTES)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        return self._compress_response(request, await self.get_response(request))
+
+    def _compress_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if response.streaming:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = _accepted_encoding(request)
+        if encoding is None or not _compressible(response, self.min_bytes):
+            return response
+
+        compressed = _compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response['ETag'] = _weak_etag(response['ETag'])
+        return response
+
+
+@dataclass
+class _CachedResponse:
+    expires_at: float
+    status: int
+    headers: list[tuple[str, str]]
+    body: bytes
+    etag: Optional[str]
+    compressible: bool
+    # Compressed bodies, made once per entry on first request for each encoding
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+
+class ReadCacheMiddleware(_HybridMiddleware):
+    """Per-URL micro-cache for the public read endpoints.
+
+    Identical GETs within ``READ_CACHE_TTL_SECONDS`` are answered from one stored
+    response, and identical requests arriving while it is being computed wait for
+    it instead of each running the view. Compression is handled here from the
+    stored bytes. Conditional requests (``If-None-Match``) go to the view, which
+    checks them against the current round version. Responses that vary on
+    ``Authorization``/``Cookie`` or are marked private are never stored.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.ttl = getattr(settings, 'READ_CACHE_TTL_SECONDS', READ_CACHE_TTL_SECONDS)
+        self.min_bytes = getattr(settings, 'COMPRESS_MIN_BYTES', COMPRESS_MIN_BYTES)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _CachedResponse] = OrderedDict()
+        self._flights = SingleFlight('read_cache', timeout=READ_CACHE_WAIT_SECONDS)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.async_mode:
+            return self.__acall__(request)
+        key = self._cache_key(request)
+        if key is None:
+            return self.get_response(request)
+        entry = self._fresh(key)
+        if entry is not None:
+            return self._serve(request, entry)
+
+        # Requests for a URL that is already being computed wait for that response.
+        led = []
+
+        def compute():
+            led.append(True)
+            response = self.get_response(request)
+            return response, self._store(key, response)
+
+        try:
+            response, entry = self._flights.do(key, compute)
+        except SingleFlightTimeout:
+            response, entry = None, None
+        except Exception:
+            if led:
+                raise
+            response, entry = None, None
+        if entry is None and not led:
+            # Not cacheable, failed or too slow; compute our own.
+            return self.get_response(request)
+        return response if entry is None else self._serve(request, entry)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        key = self._cache_key(request)
+        if key is None:
+            return await self.get_response(request)
+        entry = self._fresh(key)
+        if entry is not None:
+            return self._serve(request, entry)
+
+        led = []
+
+        async def compute():
+            led.append(True)
+            response = await self.get_response(request)
+            return response, self._store(key, response)
+
+        try:
+            response, entry = await self._flights.ado(key, compute)
+        except SingleFlightTimeout:
+            response, entry = None, None
+        except Exception:
+            if led:
+                raise
+            response, entry = None, None
+        if entry is None and not led:
+            return await self.get_response(request)
+        return response if entry is None else self._serve(request, entry)
+
+    def _cache_key(self, request: HttpRequest) -> Optional[str]:
+        if self.ttl <= 0 or request.method != 'GET' or not READ_CACHE_PATHS.match(request.path_info):
+            return None
+        if 'HTTP_IF_NONE_MATCH' in request.META:
+            # The view answers these from the current round version; a stored
+            # entry's ETag can be up to a TTL behind it.
+            return None
+        return request.get_full_path()
+
+    def _fresh(self, key: str) -> Optional[_CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry if entry is not None and entry.expires_at > time.monotonic() else None
+
+    def _store(self, key: str, response: HttpResponse) -> Optional[_CachedResponse]:
+        vary = {value.strip().lower() for value in response.get('Vary', '').split(',')}
+        cache_control = response.get('Cache-Control', '')
+        if (
+            response.streaming
+            or response.status_code != 200
+            or vary & _UNCACHEABLE_VARY
+            or 'private' in cache_control
+            or 'no-store' in cache_control
+            or response.cookies
+        ):
+            return None
+        entry = _CachedResponse(
+            expires_at=time.monotonic() + self.ttl,
+            status=response.status_code,
+            headers=list(response.items()),
+            body=response.content,
+            etag=response.get('ETag'),
+            compressible=_compressible(response, self.min_bytes),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > READ_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return entry
 
+    def _serve(self, request: HttpRequest, entry: _CachedResponse) -> HttpResponse:
+        response = HttpResponse(status=entry.status)
+        for header, value in entry.headers:
+            response[header] = value
+        body = entry.body
+        encoding = _accepted_encoding(request) if entry.compressible else None
+        if encoding is not None:
+            encoded = entry.encoded.get(encoding)
+            if encoded is None:
+                # Racing threads may both compress once; the result is identical.
+                encoded = entry.encoded[encoding] = _compress(body, encoding)
+            if len(encoded) < len(body):
+                body = encoded
+                response['Content-Encoding'] = encoding
+                if entry.etag is not None:
+                    response['ETag'] = _weak_etag(entry.etag)
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        patch_vary_headers(response, ('Accept-Encoding',))
         return response
@@ -0,0 +1,127 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameRound',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.TextField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('closed', 'Closed')], default='active', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlayerScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response_points', models.IntegerField(default=0)),
+                ('share_points', models.IntegerField(default=0)),
+                ('total_points', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Response',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=100)),
+                ('word_normalized', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ShareEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RenameIndex(
+            model_name='otpchallenge',
+            new_name='hackathon_o_identif_991a6d_idx',
+            old_name='hackathon_o_identif_9df67f_idx',
+        ),
+        migrations.AddField(
+            model_name='gameround',
+            name='creator',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_rounds', to='hackathon.appuser'),
+        ),
+        migrations.AddField(
+            model_name='playerscore',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_scores', to='hackathon.appusermember'),
+        ),
+        migrations.AddField(
+            model_name='playerscore',
+            name='round',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_scores', to='hackathon.gameround'),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='member',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='hackathon.appusermember'),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='round',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='hackathon.gameround'),
+        ),
+        migrations.AddField(
+            model_name='shareevent',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='share_events', to='hackathon.appusermember'),
+        ),
+        migrations.AddField(
+            model_name='shareevent',
+            name='round',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='share_events', to='hackathon.gameround'),
+        ),
+        migrations.AddIndex(
+            model_name='gameround',
+            index=models.Index(fields=['creator', '-created_at'], name='hackathon_g_creator_36a044_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameround',
+            index=models.Index(fields=['status', '-created_at'], name='hackathon_g_status_c6fd82_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerscore',
+            index=models.Index(fields=['round', '-total_points'], name='hackathon_p_round_i_5c1ec7_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='playerscore',
+            constraint=models.UniqueConstraint(fields=('round', 'member'), name='one_score_per_member_per_round'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['round', 'word_normalized'], name='hackathon_r_round_i_2252fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['round', '-created_at'], name='hackathon_r_round_i_69dd74_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='response',
+            constraint=models.UniqueConstraint(fields=('round', 'member'), name='one_response_per_member_per_round'),
+        ),
+        migrations.AddIndex(
+            model_name='shareevent',
+            index=models.Index(fields=['round', 'member'], name='hackathon_s_round_i_43e621_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shareevent',
+            index=models.Index(fields=['-created_at'], name='hackathon_s_created_40d454_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0002_game_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameround',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
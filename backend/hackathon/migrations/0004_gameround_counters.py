@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0003_gameround_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameround',
+            name='distinct_word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameround',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameround',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameround',
+            name='share_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
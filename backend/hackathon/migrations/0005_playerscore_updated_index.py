@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0004_gameround_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playerscore',
+            index=models.Index(fields=['round', 'updated_at'], name='hackathon_p_round_i_0d3d30_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0005_playerscore_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameround',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gameround',
+            name='snapshot',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
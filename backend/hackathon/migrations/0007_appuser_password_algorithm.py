@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0006_gameround_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appuser',
+            name='password_algorithm',
+            field=models.CharField(default='pbkdf2_sha256', max_length=32),
+        ),
+    ]
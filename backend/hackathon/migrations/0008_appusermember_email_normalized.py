@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:29
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def fill_email_normalized(apps, schema_editor):
+    AppUserMember = apps.get_model('hackathon', 'AppUserMember')
+    AppUserMember.objects.using(schema_editor.connection.alias).exclude(email=None).exclude(email='').update(
+        email_normalized=Lower(Trim('email'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0007_appuser_password_algorithm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appusermember',
+            name='email_normalized',
+            field=models.CharField(blank=True, max_length=254, null=True),
+        ),
+        migrations.RunPython(fill_email_normalized, migrations.RunPython.noop, hints={'model_name': 'appusermember'}),
+        migrations.AddIndex(
+            model_name='appusermember',
+            index=models.Index(fields=['phone'], name='hackathon_a_phone_3a9ee2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appusermember',
+            index=models.Index(fields=['email_normalized'], name='hackathon_a_email_n_f14b25_idx'),
+        ),
+    ]
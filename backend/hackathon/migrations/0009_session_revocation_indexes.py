@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0008_appusermember_email_normalized'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appuser',
+            index=models.Index(fields=['updated_at'], name='hackathon_a_updated_7823e6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='authsession',
+            index=models.Index(fields=['revoked_at'], name='hackathon_a_revoked_7c418b_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hackathon', '0009_session_revocation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameround',
+            name='words_revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
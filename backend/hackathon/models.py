@@ -1,3 +1,5 @@
+from typing import Optional
+
 from django.db import models
 from django.utils import timezone
 
@@ -8,14 +10,22 @@ class AppUser(models.Model):
     email = models.EmailField(max_length=254, unique=True, null=True, blank=True)
     phone = models.CharField(max_length=32, unique=True, null=True, blank=True)
 
+    password_algorithm = models.CharField(max_length=32, default='pbkdf2_sha256')
     password_salt_b64 = models.CharField(max_length=64)
     password_hash_b64 = models.CharField(max_length=128)
+    # Work factor of password_algorithm: PBKDF2 iterations, or scrypt's N
     password_iterations = models.PositiveIntegerField()
 
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # Bumped by import_teams too (bulk writes skip auto_now): servers poll it to drop cached sessions
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
     def __str__(self) -> str:
         return self.username
 
@@ -25,6 +35,8 @@ class AppUserMember(models.Model):
     member_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=255)
     email = models.EmailField(max_length=254, null=True, blank=True)
+    # Trimmed, lowercased email: login and OTP lookups are plain equality probes on it
+    email_normalized = models.CharField(max_length=254, null=True, blank=True)
     phone = models.CharField(max_length=32)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -35,12 +47,23 @@ class AppUserMember(models.Model):
         ]
         indexes = [
             models.Index(fields=['user', 'phone']),
+            models.Index(fields=['phone']),
+            models.Index(fields=['email_normalized']),
         ]
 
+    def save(self, *args, **kwargs):
+        # bulk_create / bulk_update skip this: set email_normalized there too (see import_teams)
+        self.email_normalized = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f'{self.user.username}:{self.phone}'
 
 
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    return (email or '').strip().lower() or None
+
+
 class AuthSession(models.Model):
     user = models.ForeignKey(AppUser, on_delete=models.CASCADE, related_name='sessions')
     member = models.ForeignKey(AppUserMember, on_delete=models.CASCADE, related_name='sessions', null=True, blank=True)
@@ -54,6 +77,7 @@ class AuthSession(models.Model):
         indexes = [
             models.Index(fields=['user', 'expires_at']),
             models.Index(fields=['member', 'expires_at']),
+            models.Index(fields=['revoked_at']),
         ]
 
     def is_valid(self) -> bool:
@@ -93,6 +117,17 @@ class GameRound(models.Model):
     creator = models.ForeignKey(AppUser, on_delete=models.CASCADE, related_name='created_rounds')
     question = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    version = models.PositiveBigIntegerField(default=0)  # Bumped on every Response/ShareEvent write
+    # Bumped when renormalize_words rewrites Response.word_normalized; in-process word counts rebuild
+    words_revision = models.PositiveIntegerField(default=0)
+    # Denormalized counters, maintained by the write views (repair with `manage.py recount_rounds`)
+    response_count = models.PositiveIntegerField(default=0)
+    distinct_word_count = models.PositiveIntegerField(default=0)
+    share_count = models.PositiveIntegerField(default=0)
+    participant_count = models.PositiveIntegerField(default=0)  # Members with a PlayerScore
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # Final words, leaderboard and counters, frozen when the round is closed (see hackathon/finalize.py)
+    snapshot = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -158,6 +193,7 @@ class PlayerScore(models.Model):
         ]
         indexes = [
             models.Index(fields=['round', '-total_points']),
+            models.Index(fields=['round', 'updated_at']),
         ]
     
     def __str__(self) -> str:
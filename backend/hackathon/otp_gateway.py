@@ -0,0 +1,205 @@
+"""HTTP client for the external OTP gateway.
+
+One client per process (``get_gateway``) keeps keep-alive connections in a
+bounded pool, with separate connect and read timeouts. Failures where the OTP
+cannot have been sent (connect errors, 502/503) are retried a bounded number of
+times with jittered backoff. A read timeout or a 504 is not retried, because the
+gateway may already have sent the OTP and a retry would send a second one. A
+circuit breaker counts consecutive failures; once it opens, calls fail immediately
+until a single probe succeeds, so a slow gateway costs a login a fast 503 instead
+of a worker thread.
+"""
+import json
+import threading
+import time
+from typing import Optional
+
+import urllib3
+from django.conf import settings
+from urllib3.exceptions import EmptyPoolError, HTTPError, ReadTimeoutError
+from urllib3.util import Retry, Timeout
+
+
+CONNECT_TIMEOUT_SECONDS = 2.0
+READ_TIMEOUT_SECONDS = 8.0
+MAX_RETRIES = 2
+BACKOFF_SECONDS = 0.2
+BACKOFF_JITTER_SECONDS = 0.2
+MAX_CONNECTIONS = 10
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# 504: a proxy gave up waiting, but the gateway behind it may still send the OTP
+_RETRY_STATUSES = frozenset({502, 503})
+
+
+class GatewayError(RuntimeError):
+    pass
+
+
+class GatewayUnavailable(GatewayError):
+    """The breaker is open (or the pool is exhausted); retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> (after ``reset_timeout``) one probe -> closed."""
+
+    def __init__(self, *, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'open' if self._rejection() is not None else 'half-open'
+
+    def rejection(self) -> Optional[GatewayUnavailable]:
+        """The error to fail fast with while open, else ``None``."""
+        with self._lock:
+            return self._rejection()
+
+    def before_call(self) -> bool:
+        """Raise ``GatewayUnavailable`` unless a call may go through now; ``True`` if it is the probe."""
+        with self._lock:
+            rejection = self._rejection()
+            if rejection is not None:
+                raise rejection
+            if self._opened_at is None:
+                return False
+            # Open long enough: let this one call through as the probe.
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        # The probe ended without telling us anything about the gateway's health.
+        with self._lock:
+            self._probing = False
+
+    def _rejection(self) -> Optional[GatewayUnavailable]:
+        if self._opened_at is None:
+            return None
+        retry_after = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+        if retry_after > 0 or self._probing:
+            return GatewayUnavailable('OTP gateway is temporarily unavailable', max(retry_after, 1.0))
+        return None
+
+
+class GatewayClient:
+    def __init__(
+        self,
+        url: str,
+        *,
+        auth_header: str = '',
+        connect_timeout: float = CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = READ_TIMEOUT_SECONDS,
+        max_retries: int = MAX_RETRIES,
+        max_connections: int = MAX_CONNECTIONS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.url = url
+        self.auth_header = auth_header
+        self.breaker = breaker or CircuitBreaker()
+        self._pool_timeout = connect_timeout
+        self._http = urllib3.PoolManager(
+            maxsize=max_connections,
+            block=True,  # at most max_connections sockets; extra callers wait up to the pool timeout
+            timeout=Timeout(connect=connect_timeout, read=read_timeout),
+            retries=Retry(
+                total=max_retries,
+                connect=max_retries,
+                read=False,  # re-raised as is: the request may have been processed
+                status=max_retries,
+                other=0,
+                status_forcelist=_RETRY_STATUSES,
+                allowed_methods=None,  # POST too: only failures where no OTP went out are retried
+                backoff_factor=BACKOFF_SECONDS,
+                backoff_jitter=BACKOFF_JITTER_SECONDS,
+                respect_retry_after_header=False,
+                raise_on_status=False,
+                raise_on_redirect=False,
+            ),
+        )
+
+    def post(self, form: dict) -> dict:
+        """POST ``form`` and return the decoded JSON body; raises ``GatewayError``."""
+        probe = self.breaker.before_call()
+        headers = {'Accept': 'application/json'}
+        if self.auth_header:
+            headers['Authorization'] = self.auth_header
+        try:
+            response = self._http.request(
+                'POST', self.url, fields=form, encode_multipart=False, headers=headers, pool_timeout=self._pool_timeout
+            )
+        except EmptyPoolError as exc:
+            if probe:
+                self.breaker.release_probe()
+            raise GatewayUnavailable('OTP gateway is busy', 1.0) from exc
+        except ReadTimeoutError as exc:
+            self.breaker.record_failure()
+            raise GatewayError('OTP gateway timed out') from exc
+        except HTTPError as exc:
+            self.breaker.record_failure()
+            raise GatewayError('Unable to reach OTP gateway') from exc
+        except BaseException:
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+        if response.status >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if response.status < 200 or response.status >= 300:
+            raise GatewayError(f'OTP gateway returned HTTP {response.status}')
+        try:
+            return json.loads(response.data.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise GatewayError('OTP gateway returned invalid JSON') from exc
+
+    def close(self) -> None:
+        self._http.clear()
+
+
+_gateway: Optional[GatewayClient] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway(url: str, auth_header: str = '') -> GatewayClient:
+    """The process's client for ``url``, configured from ``OTP_GATEWAY_*`` settings."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None or (_gateway.url, _gateway.auth_header) != (url, auth_header):
+            if _gateway is not None:
+                _gateway.close()
+            _gateway = GatewayClient(
+                url,
+                auth_header=auth_header,
+                connect_timeout=getattr(settings, 'OTP_GATEWAY_CONNECT_TIMEOUT', CONNECT_TIMEOUT_SECONDS),
+                read_timeout=getattr(settings, 'OTP_GATEWAY_READ_TIMEOUT', READ_TIMEOUT_SECONDS),
+                max_retries=getattr(settings, 'OTP_GATEWAY_MAX_RETRIES', MAX_RETRIES),
+                max_connections=getattr(settings, 'OTP_GATEWAY_MAX_CONNECTIONS', MAX_CONNECTIONS),
+            )
+        return _gateway
@@ -0,0 +1,179 @@
+"""Password verification off the request threads, with a hard cap on concurrent work.
+
+PBKDF2 at login strength takes a noticeable fraction of a second of CPU. Logins
+hand their checks to a small process pool (``PASSWORD_POOL_WORKERS`` per server
+process), so hashing never competes with request threads for the GIL, and at most
+that many run at once. At most ``PASSWORD_MAX_PENDING`` logins may be running or
+queued per process. Past that, ``verify`` raises ``LoginOverloaded`` straight
+away, and the view answers 503 instead of queueing work the client will have
+given up on. A check that times out still holds its place until the worker
+finishes it, since a running check cannot be cancelled.
+
+``PASSWORD_POOL_WORKERS = 0`` verifies on the calling thread (still admission-limited).
+
+Given ``upgrade_to``, a matched hash made with other parameters is re-hashed in
+the same task, so the upgrade costs the request no extra round trip.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple, Optional, Sequence
+
+from django.conf import settings
+
+from .hashers import Hasher, StoredPassword, verify_stored
+
+
+logger = logging.getLogger(__name__)
+
+POOL_WORKERS = 2
+MAX_PENDING = 16
+VERIFY_TIMEOUT_SECONDS = 10.0
+RETRY_AFTER_SECONDS = 1
+
+
+class LoginOverloaded(RuntimeError):
+    """Too many logins are already being verified; retry after ``RETRY_AFTER_SECONDS``."""
+
+    retry_after = RETRY_AFTER_SECONDS
+
+
+class PasswordMatch(NamedTuple):
+    index: int
+    # The password re-hashed with ``upgrade_to``, when the matched hash was outdated
+    rehashed: Optional[StoredPassword] = None
+
+
+def first_match(
+    password: str, candidates: Sequence[StoredPassword], upgrade_to: Optional[Hasher] = None
+) -> Optional[PasswordMatch]:
+    """The first stored hash ``password`` matches. Runs in the worker processes."""
+    for index, stored in enumerate(candidates):
+        if verify_stored(password, stored):
+            if upgrade_to is not None and upgrade_to.needs_rehash(stored):
+                return PasswordMatch(index, upgrade_to.encode(password))
+            return PasswordMatch(index)
+    return None
+
+
+class PasswordVerifier:
+    def __init__(self, *, workers: int = POOL_WORKERS, max_pending: int = MAX_PENDING, timeout: float = VERIFY_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def verify(
+        self, password: str, candidates: Sequence[StoredPassword], *, upgrade_to: Optional[Hasher] = None
+    ) -> Optional[PasswordMatch]:
+        """The candidate ``password`` matches, or ``None``; raises ``LoginOverloaded``."""
+        self._admit()
+        if self.workers <= 0:
+            try:
+                return first_match(password, candidates, upgrade_to)
+            finally:
+                self._release()
+        pool, future = self._start(password, candidates, upgrade_to)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise LoginOverloaded('Password check timed out') from None
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise LoginOverloaded('Password check failed') from None
+
+    async def averify(
+        self, password: str, candidates: Sequence[StoredPassword], *, upgrade_to: Optional[Hasher] = None
+    ) -> Optional[PasswordMatch]:
+        self._admit()
+        if self.workers <= 0:
+            try:
+                return await asyncio.to_thread(first_match, password, candidates, upgrade_to)
+            finally:
+                self._release()
+        pool, future = self._start(password, candidates, upgrade_to)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise LoginOverloaded('Password check timed out') from None
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise LoginOverloaded('Password check failed') from None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _admit(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise LoginOverloaded('Too many logins in progress')
+        with self._lock:
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _start(
+        self, password: str, candidates: Sequence[StoredPassword], upgrade_to: Optional[Hasher]
+    ) -> tuple[ProcessPoolExecutor, Future]:
+        # The slot is held until the worker is done with the check, not until the caller
+        # stops waiting: cancel() cannot stop a check that is already running, and a
+        # timed-out one must keep counting against the cap while it burns CPU.
+        try:
+            pool, future = self._submit(password, candidates, upgrade_to)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return pool, future
+
+    def _submit(
+        self, password: str, candidates: Sequence[StoredPassword], upgrade_to: Optional[Hasher]
+    ) -> tuple[ProcessPoolExecutor, Future]:
+        with self._lock:
+            if self._pool is None:
+                # spawn: the parent has threads (and DB connections) that must not be forked
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            pool = self._pool
+        try:
+            return pool, pool.submit(first_match, password, candidates, upgrade_to)
+        except BrokenProcessPool:
+            self._discard(pool)
+            return self._submit(password, candidates, upgrade_to)
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        logger.warning('Password pool broke (a worker died); starting a new one')
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+_verifier: Optional[PasswordVerifier] = None
+_verifier_lock = threading.Lock()
+
+
+def get_password_verifier() -> PasswordVerifier:
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = PasswordVerifier(
+                workers=getattr(settings, 'PASSWORD_POOL_WORKERS', POOL_WORKERS),
+                max_pending=getattr(settings, 'PASSWORD_MAX_PENDING', MAX_PENDING),
+            )
+        return _verifier
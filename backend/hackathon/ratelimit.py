@@ -0,0 +1,148 @@
+"""Per-client request throttling for the login, OTP and respond endpoints.
+
+``RATE_LIMITS`` maps a scope (one endpoint) to the keys it is limited by (client
+``ip``, the ``identifier`` being logged into, a ``challenge``, a ``member``), each
+with one or more rates such as ``'5/m'`` (per second, minute, hour or day). Views
+call ``rate_limiter.check`` with the keys they know before touching the database
+or the OTP gateway. When any rate is exceeded, they answer 429 with the
+``Retry-After`` that ``check`` returns.
+
+Counters live in ``RATE_LIMIT_BACKEND``. The default ``InMemoryBackend`` keeps a
+token bucket per key in this process, so a client gets the limit once per server
+process. ``CacheBackend`` keeps a sliding-window counter in the Django cache, which
+is shared by every process when the cache is (memcached, Redis). Its calls block,
+including from the async respond view; under ``ASYNC_VIEWS`` keep the cache close.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest
+from django.utils.module_loading import import_string
+
+
+MAX_KEYS = 100_000
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> tuple[int, float]:
+    """``'5/m'`` -> ``(5, 60.0)``; the period may carry a count, as in ``'10/15m'``."""
+    limit, _, period = rate.partition('/')
+    unit = period[-1:]
+    if unit not in _PERIODS:
+        raise ValueError(f'Invalid rate {rate!r}; expected e.g. "5/m"')
+    return int(limit), float(period[:-1] or 1) * _PERIODS[unit]
+
+
+class InMemoryBackend:
+    """Token buckets in this process: ``limit`` tokens, refilled evenly over ``period``."""
+
+    def __init__(self, max_keys: int = MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: float) -> float:
+        """Take a token for ``key``; seconds until one is available if there is none, else 0."""
+        refill = limit / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * refill)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / refill
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class CacheBackend:
+    """Sliding-window counters in the Django cache (``RATE_LIMIT_CACHE``), shared between processes.
+
+    The count over the last ``period`` is estimated from the current and previous
+    fixed windows, weighted by how much of the previous one still overlaps it.
+    """
+
+    def __init__(self):
+        self._cache = caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+
+    def hit(self, key: str, limit: int, period: float) -> float:
+        now = time.time()
+        window = int(now // period)
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        current_key, previous_key = f'rl:{digest}:{window}', f'rl:{digest}:{window - 1}'
+        self._cache.add(current_key, 0, timeout=math.ceil(2 * period))
+        try:
+            current = self._cache.incr(current_key)
+        except ValueError:  # expired between add and incr
+            self._cache.add(current_key, 1, timeout=math.ceil(2 * period))
+            current = 1
+        previous = self._cache.get(previous_key, 0)
+        elapsed = (now % period) / period
+        if previous * (1 - elapsed) + current <= limit:
+            return 0.0
+        if current > limit or not previous:
+            return period - now % period
+        # Wait until enough of the previous window has slid out
+        return max(0.0, (1 - (limit - current) / previous - elapsed) * period)
+
+
+class RateLimiter:
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    def get_backend(self):
+        with self._lock:
+            if self._backend is None:
+                backend_path = getattr(settings, 'RATE_LIMIT_BACKEND', 'hackathon.ratelimit.InMemoryBackend')
+                self._backend = import_string(backend_path)()
+            return self._backend
+
+    def check(self, scope: str, **keys: Optional[str]) -> Optional[float]:
+        """Count one request to ``scope``; ``None`` if allowed, else seconds to wait.
+
+        Keys that are ``None`` or empty, or have no rate in ``RATE_LIMITS``, are not limited.
+        """
+        rules = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+        if not rules:
+            return None
+        backend = self.get_backend()
+        for kind, rates in rules.items():
+            value = keys.get(kind)
+            if not value:
+                continue
+            for rate in (rates,) if isinstance(rates, str) else rates:
+                limit, period = parse_rate(rate)
+                retry_after = backend.hit(f'{scope}:{kind}:{rate}:{value}', limit, period)
+                if retry_after > 0:
+                    # Stop at the first exceeded limit: a throttled client spends no more tokens
+                    return retry_after
+        return None
+
+
+def client_ip(request: HttpRequest) -> str:
+    """The client address; from ``RATE_LIMIT_CLIENT_IP_HEADER`` behind a reverse proxy.
+
+    The rightmost entry of that header is the one the trusted proxy added; the
+    ones before it are whatever the client sent.
+    """
+    header = getattr(settings, 'RATE_LIMIT_CLIENT_IP_HEADER', '')
+    if header:
+        forwarded = [part.strip() for part in request.headers.get(header, '').split(',') if part.strip()]
+        if forwarded:
+            return forwarded[-1]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+rate_limiter = RateLimiter()
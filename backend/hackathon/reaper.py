@@ -0,0 +1,167 @@
+"""Deleting dead ``AuthSession`` and ``OtpChallenge`` rows.
+
+Sessions are dead once expired or revoked, challenges once expired or consumed;
+rows are kept for ``REAPER_RETENTION_HOURS`` past that. Deletes walk the primary
+key in batches of ``REAPER_BATCH_SIZE`` rows, one short transaction each, with a
+pause between batches so login and session lookups never queue behind a long
+lock on these tables.
+
+Run ``manage.py reap_auth`` from cron, or set ``REAPER_INTERVAL_SECONDS`` to reap
+from a background thread of the app server (``start_reaper``, called by
+``backend/wsgi.py`` and ``backend/asgi.py``).
+"""
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Model, Q
+from django.utils import timezone
+
+from .models import AuthSession, OtpChallenge
+
+
+logger = logging.getLogger(__name__)
+
+RETENTION_HOURS = 24
+BATCH_SIZE = 1000
+BATCH_PAUSE_SECONDS = 0.05
+INTERVAL_SECONDS = 0  # background reaping off
+
+
+# Model and the condition its dead rows match, given the retention cutoff
+REAPED: tuple[tuple[type[Model], Callable[[datetime], Q]], ...] = (
+    (AuthSession, lambda cutoff: Q(expires_at__lt=cutoff) | Q(revoked_at__lt=cutoff)),
+    (OtpChallenge, lambda cutoff: Q(expires_at__lt=cutoff) | Q(consumed_at__lt=cutoff)),
+)
+
+
+@dataclass
+class ReapResult:
+    model: str
+    deleted: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.deleted / self.seconds if self.seconds > 0 else 0.0
+
+
+def reap_model(
+    model: type[Model],
+    dead: Q,
+    *,
+    batch_size: int = BATCH_SIZE,
+    pause: float = BATCH_PAUSE_SECONDS,
+    dry_run: bool = False,
+    stop: Optional[threading.Event] = None,
+) -> ReapResult:
+    """Delete ``model`` rows matching ``dead``, ``batch_size`` primary keys at a time."""
+    result = ReapResult(model.__name__)
+    started = time.monotonic()
+    last_id = 0
+    while stop is None or not stop.is_set():
+        ids = list(
+            model.objects.filter(dead, id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        if dry_run:
+            result.deleted += len(ids)
+        else:
+            with transaction.atomic():
+                # Bounded by the key range so the statement never walks past this batch
+                deleted, _ = model.objects.filter(dead, id__gt=last_id, id__lte=ids[-1]).delete()
+            result.deleted += deleted
+        result.batches += 1
+        last_id = ids[-1]
+        if len(ids) < batch_size:
+            break
+        if pause > 0 and not dry_run:
+            time.sleep(pause)
+    result.seconds = time.monotonic() - started
+    return result
+
+
+def reap(
+    *,
+    retention: Optional[timedelta] = None,
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+    dry_run: bool = False,
+    stop: Optional[threading.Event] = None,
+) -> list[ReapResult]:
+    """Reap every model in ``REAPED``; unset arguments come from the ``REAPER_*`` settings."""
+    if retention is None:
+        retention = timedelta(hours=getattr(settings, 'REAPER_RETENTION_HOURS', RETENTION_HOURS))
+    if batch_size is None:
+        batch_size = getattr(settings, 'REAPER_BATCH_SIZE', BATCH_SIZE)
+    if pause is None:
+        pause = getattr(settings, 'REAPER_BATCH_PAUSE_SECONDS', BATCH_PAUSE_SECONDS)
+    cutoff = timezone.now() - retention
+    return [
+        reap_model(model, dead(cutoff), batch_size=batch_size, pause=pause, dry_run=dry_run, stop=stop)
+        for model, dead in REAPED
+    ]
+
+
+class Reaper:
+    """Runs ``reap`` every ``interval`` seconds on a daemon thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='auth-reaper', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        self._stopping.clear()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                for result in reap(stop=self._stopping):
+                    if result.deleted:
+                        logger.info(
+                            'Reaped %d %s rows in %.2fs (%.0f rows/s)',
+                            result.deleted, result.model, result.seconds, result.rows_per_second,
+                        )
+            except Exception:
+                logger.exception('Reaping expired sessions and OTP challenges failed')
+            finally:
+                close_old_connections()
+
+
+_reaper: Optional[Reaper] = None
+_reaper_lock = threading.Lock()
+
+
+def start_reaper() -> Optional[Reaper]:
+    """Start this process's background reaper, if ``REAPER_INTERVAL_SECONDS`` is set."""
+    global _reaper
+    interval = getattr(settings, 'REAPER_INTERVAL_SECONDS', INTERVAL_SECONDS)
+    if interval <= 0:
+        return None
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = Reaper(interval)
+            _reaper.start()
+        return _reaper
@@ -0,0 +1,211 @@
+"""Server-side word cloud images (SVG and PNG) with a two-tier render cache.
+
+Images are drawn from the same placements as ``/wordcloud/layout``. A render is
+addressed by a hash of everything it depends on (round, version, size, theme,
+format) and kept in a byte-bounded in-memory LRU. Renders of closed rounds are
+also written to disk, so a closed round is rendered once per size/theme (and
+again only when its snapshot is refreshed) and then read back. Renders of active rounds stay in memory only: each
+response makes a new version, and writing those would grow the directory
+without bound during a live round.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+from .finalize import round_words
+from .layout import MAX_LAYOUT_WORDS, layouts, viewport_bucket
+from .models import GameRound
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the drawing code changes so old cached images are not served.
+RENDER_REVISION = 1
+MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+FORMATS = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+# Same palette as the canvas in WordCloud.jsx
+COLORS = [
+    '#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
+    '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B195', '#C06C84',
+    '#6C5B7B', '#F67280', '#355C7D', '#99B898', '#E84A5F',
+]
+THEMES = {
+    'light': {'background': '#FFFFFF'},
+    'dark': {'background': '#0F172A'},
+}
+FONT_FAMILY = 'Inter, Arial, sans-serif'
+PNG_FONT = 'DejaVuSans-Bold.ttf'
+
+
+def color_for(text: str) -> str:
+    # Same hash as colorFor() in WordCloud.jsx, so exports match the live cloud.
+    value = 7
+    for char in text:
+        value = (value * 31 + ord(char)) & 0xFFFFFFFF
+    return COLORS[value % len(COLORS)]
+
+
+def render_svg(layout: dict, theme: str) -> bytes:
+    width, height = layout['width'], layout['height']
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<rect width="100%" height="100%" fill="{THEMES[theme]["background"]}"/>',
+        f'<g font-family="{FONT_FAMILY}" font-weight="bold" text-anchor="middle" dominant-baseline="central">',
+    ]
+    for word in layout['words']:
+        cx = word['x'] + word['width'] / 2
+        cy = word['y'] + word['height'] / 2
+        length = word['height'] if word['rotate'] else word['width']
+        transform = f' transform="rotate(90 {cx:.1f} {cy:.1f})"' if word['rotate'] else ''
+        # textLength pins the text to its box whatever font the viewer falls back to.
+        parts.append(
+            f'<text x="{cx:.1f}" y="{cy:.1f}" font-size="{word["font_size"]}" fill="{color_for(word["text"])}" '
+            f'textLength="{length}" lengthAdjust="spacingAndGlyphs"{transform}>{escape(word["text"])}</text>'
+        )
+    parts.append('</g></svg>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+@lru_cache(maxsize=128)
+def _png_font(size: int) -> ImageFont.FreeTypeFont:
+    try:
+        return ImageFont.truetype(PNG_FONT, size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+
+def render_png(layout: dict, theme: str) -> bytes:
+    image = Image.new('RGB', (layout['width'], layout['height']), THEMES[theme]['background'])
+    for word in layout['words']:
+        length = word['height'] if word['rotate'] else word['width']
+        font = _png_font(word['font_size'])
+        measured = font.getlength(word['text'])
+        if measured > length:
+            font = _png_font(max(1, int(word['font_size'] * length / measured)))
+
+        # Draw horizontally on a transparent tile, then rotate it into its box.
+        tile_w, tile_h = (word['height'], word['width']) if word['rotate'] else (word['width'], word['height'])
+        tile = Image.new('RGBA', (tile_w, tile_h), (0, 0, 0, 0))
+        ImageDraw.Draw(tile).text(
+            (tile_w / 2, tile_h / 2), word['text'], font=font, fill=color_for(word['text']), anchor='mm'
+        )
+        if word['rotate']:
+            tile = tile.transpose(Image.Transpose.ROTATE_270)
+        image.paste(tile, (word['x'], word['y']), tile)
+
+    out = io.BytesIO()
+    image.save(out, format='PNG', optimize=True)
+    return out.getvalue()
+
+
+class RenderCache:
+    """Byte-bounded LRU of rendered images in front of a directory of files named by key."""
+
+    def __init__(self, *, max_bytes: int = MEMORY_CACHE_BYTES, directory: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            body = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            logger.warning('Could not read cached render %s', path, exc_info=True)
+            return None
+        self._remember(key, body)
+        return body
+
+    def set(self, key: str, body: bytes, *, persist: bool = True) -> None:
+        """Cache ``body`` in memory and, if ``persist``, in the directory."""
+        self._remember(key, body)
+        path = self._path(key)
+        if path is None or not persist:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename, so readers never see a partial image.
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(body)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning('Could not write cached render %s', path, exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remember(self, key: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _path(self, key: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / key[:2] / key
+
+
+_render_cache: Optional[RenderCache] = None
+
+
+def get_render_cache() -> RenderCache:
+    """The cache configured by ``WORDCLOUD_RENDER_CACHE_DIR`` (empty disables the disk tier)."""
+    global _render_cache
+    if _render_cache is None:
+        directory = getattr(settings, 'WORDCLOUD_RENDER_CACHE_DIR', None)
+        _render_cache = RenderCache(directory=Path(directory) if directory else None)
+    return _render_cache
+
+
+def render_key(round_obj: GameRound, fmt: str, width: int, height: int, theme: str) -> str:
+    # Closing and every later snapshot refresh (late writes, renormalize_words) bump the version.
+    raw = f'{RENDER_REVISION}:{round_obj.id}:{round_obj.version}:{width}x{height}:{theme}:{fmt}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def rendered_cloud(round_obj: GameRound, fmt: str, width: int, height: int, theme: str) -> tuple[str, bytes]:
+    """Return ``(key, image bytes)``, rendering only on a cache miss."""
+    width, height = viewport_bucket(width, height)
+    key = render_key(round_obj, fmt, width, height, theme)
+    cache = get_render_cache()
+    body = cache.get(key)
+    if body is None:
+        ranked, _ = round_words(round_obj, MAX_LAYOUT_WORDS)
+        layout = layouts.layout(round_obj.id, round_obj.version, ranked, width, height)
+        body = render_svg(layout, theme) if fmt == 'svg' else render_png(layout, theme)
+        cache.set(key, body, persist=round_obj.status != 'active')
+    return key, body
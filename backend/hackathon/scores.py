@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+
+from django.db import connections, router
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GameRound, PlayerScore
+
+
+@dataclass(frozen=True)
+class ScoreUpdate:
+    created: bool
+    response_points: int
+    share_points: int
+    total_points: int
+
+
+def add_points(*, round_id: int, member_id: int, response_points: int = 0, share_points: int = 0) -> ScoreUpdate:
+    """Add points to a member's PlayerScore for a round, creating the row if needed.
+
+    Uses one upsert statement (``ON DUPLICATE KEY UPDATE`` on MySQL, ``ON CONFLICT``
+    on PostgreSQL), so concurrent calls never lose an increment. SQLite inserts
+    with ``DO NOTHING`` and then increments the row it skipped. Other backends
+    fall back to ``get_or_create`` plus an ``F()`` update.
+    """
+    alias = router.db_for_write(PlayerScore)
+    connection = connections[alias]
+    total = response_points + share_points
+    now = timezone.now()
+
+    if connection.vendor == 'mysql':
+        return _add_points_mysql(connection, round_id, member_id, response_points, share_points, total, now)
+    if connection.vendor == 'postgresql':
+        return _add_points_on_conflict(connection, round_id, member_id, response_points, share_points, total, now)
+    if connection.vendor == 'sqlite':
+        return _add_points_sqlite(connection, round_id, member_id, response_points, share_points, total, now)
+
+    score, created = PlayerScore.objects.using(alias).get_or_create(
+        round_id=round_id,
+        member_id=member_id,
+        defaults={'response_points': response_points, 'share_points': share_points, 'total_points': total},
+    )
+    if not created:
+        PlayerScore.objects.using(alias).filter(id=score.id).update(
+            response_points=F('response_points') + response_points,
+            share_points=F('share_points') + share_points,
+            total_points=F('total_points') + total,
+            updated_at=now,
+        )
+        score.refresh_from_db(fields=['response_points', 'share_points', 'total_points'])
+    return ScoreUpdate(created, score.response_points, score.share_points, score.total_points)
+
+
+def add_points_many(*, round_id: int, member_ids: list[int], response_points: int = 0, share_points: int = 0) -> int:
+    """Add the same points to several members of one round in one upsert; returns how many rows were created."""
+    if not member_ids:
+        return 0
+    alias = router.db_for_write(PlayerScore)
+    connection = connections[alias]
+    if connection.vendor not in {'mysql', 'sqlite', 'postgresql'}:
+        return sum(
+            add_points(round_id=round_id, member_id=member_id, response_points=response_points, share_points=share_points).created
+            for member_id in member_ids
+        )
+
+    table, columns = _table_and_columns(connection)
+    total = response_points + share_points
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(member_ids))
+    params = []
+    for member_id in member_ids:
+        params.extend([round_id, member_id, response_points, share_points, total, now])
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'INSERT INTO {table} ({columns}) VALUES {values} ' + _MYSQL_UPSERT, params)
+            # 1 affected row per insert, 2 per update.
+            return 2 * len(member_ids) - cursor.rowcount
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'INSERT INTO {table} ({columns}) VALUES {values} ' + _on_conflict_clause(table), params)
+            return sum(1 for row in cursor.fetchall() if row[3])
+        cursor.execute(f'INSERT INTO {table} ({columns}) VALUES {values} ' + _ON_CONFLICT_SKIP, params)
+        created = {row[0] for row in cursor.fetchall()}
+        existing = [member_id for member_id in member_ids if member_id not in created]
+        if existing:
+            placeholders = ', '.join(['%s'] * len(existing))
+            cursor.execute(
+                _increment_sql(table) + f' AND member_id IN ({placeholders})',
+                [response_points, share_points, total, now, round_id, *existing],
+            )
+    return len(created)
+
+
+def increment_round(round_id: int, *, active_only: bool = False, **increments: int) -> bool:
+    """Race-free ``F()`` increments of GameRound counters.
+
+    The UPDATE also row-locks the round until the surrounding transaction
+    commits, which serializes the existence checks that follow it. With
+    ``active_only`` nothing is written to a closed round and ``False`` is
+    returned, so the caller can roll back instead of changing a finalized round.
+    """
+    increments = {field: amount for field, amount in increments.items() if amount}
+    if not increments:
+        return True
+    rounds = GameRound.objects.filter(id=round_id)
+    if active_only:
+        rounds = rounds.filter(status='active')
+    return rounds.update(**{field: F(field) + amount for field, amount in increments.items()}) > 0
+
+
+# Row alias instead of VALUES(), which MySQL 8.0.20 deprecated here.
+_MYSQL_UPSERT = (
+    'AS new ON DUPLICATE KEY UPDATE '
+    'response_points = response_points + new.response_points, '
+    'share_points = share_points + new.share_points, '
+    'total_points = total_points + new.total_points, '
+    'updated_at = new.updated_at'
+)
+
+_ON_CONFLICT_SKIP = 'ON CONFLICT (round_id, member_id) DO NOTHING RETURNING member_id'
+
+
+def _on_conflict_clause(table: str) -> str:
+    # xmax is 0 only on a row version the statement inserted.
+    return (
+        'ON CONFLICT (round_id, member_id) DO UPDATE SET '
+        f'response_points = {table}.response_points + excluded.response_points, '
+        f'share_points = {table}.share_points + excluded.share_points, '
+        f'total_points = {table}.total_points + excluded.total_points, '
+        'updated_at = excluded.updated_at '
+        f'RETURNING response_points, share_points, total_points, ({table}.xmax = 0)'
+    )
+
+
+def _increment_sql(table: str) -> str:
+    return (
+        f'UPDATE {table} SET '
+        'response_points = response_points + %s, '
+        'share_points = share_points + %s, '
+        'total_points = total_points + %s, '
+        'updated_at = %s '
+        'WHERE round_id = %s'
+    )
+
+
+def _table_and_columns(connection) -> tuple[str, str]:
+    qn = connection.ops.quote_name
+    columns = ', '.join(
+        qn(name) for name in ('round_id', 'member_id', 'response_points', 'share_points', 'total_points', 'updated_at')
+    )
+    return qn(PlayerScore._meta.db_table), columns
+
+
+def _add_points_mysql(connection, round_id, member_id, response_points, share_points, total, now) -> ScoreUpdate:
+    table, columns = _table_and_columns(connection)
+    sql = f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s, %s, %s) ' + _MYSQL_UPSERT
+    params = [round_id, member_id, response_points, share_points, total, connection.ops.adapt_datetimefield_value(now)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        # MySQL reports 1 affected row for an insert and 2 for an update.
+        created = cursor.rowcount == 1
+        cursor.execute(
+            f'SELECT response_points, share_points, total_points FROM {table} WHERE round_id = %s AND member_id = %s',
+            [round_id, member_id],
+        )
+        row = cursor.fetchone()
+    return ScoreUpdate(created, *row)
+
+
+def _add_points_on_conflict(connection, round_id, member_id, response_points, share_points, total, now) -> ScoreUpdate:
+    table, columns = _table_and_columns(connection)
+    sql = f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s, %s, %s) ' + _on_conflict_clause(table)
+    params = [round_id, member_id, response_points, share_points, total, connection.ops.adapt_datetimefield_value(now)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        *points, created = cursor.fetchone()
+    return ScoreUpdate(created, *points)
+
+
+def _add_points_sqlite(connection, round_id, member_id, response_points, share_points, total, now) -> ScoreUpdate:
+    # SQLite's upsert reports inserted and updated rows alike. A skipped insert means
+    # the row exists, and score rows only go away with their round, so the update
+    # that follows always finds it.
+    table, columns = _table_and_columns(connection)
+    now = connection.ops.adapt_datetimefield_value(now)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s, %s, %s) ' + _ON_CONFLICT_SKIP,
+            [round_id, member_id, response_points, share_points, total, now],
+        )
+        if cursor.fetchone() is not None:
+            return ScoreUpdate(True, response_points, share_points, total)
+        cursor.execute(
+            _increment_sql(table) + ' AND member_id = %s RETURNING response_points, share_points, total_points',
+            [response_points, share_points, total, now, round_id, member_id],
+        )
+        row = cursor.fetchone()
+    return ScoreUpdate(False, *row)
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AppUser, AuthSession
+
+
+SESSION_CACHE_TTL_SECONDS = 30.0
+SESSION_CACHE_MAX_ENTRIES = 10000
+SESSION_REVOCATION_POLL_SECONDS = 1.0
+# Re-read changes this far back on every poll: a row is stamped before its
+# transaction commits, and server clocks drift a little
+_POLL_OVERLAP = timedelta(seconds=5)
+
+
+class SessionCache:
+    """Bounded LRU of resolved sessions (with ``user`` and ``member`` loaded), keyed by token hash.
+
+    Invalidation is immediate within this process. Changes made by other processes
+    (logouts on other workers, ``import_teams``) are picked up by ``poll``, at most
+    every ``SESSION_REVOCATION_POLL_SECONDS``: it evicts sessions revoked since the
+    last poll (``AuthSession.revoked_at``) and all sessions of teams changed since
+    then (``AppUser.updated_at``). ``ttl`` bounds how long an entry is served
+    without being re-read. An entry is never served past the session's ``expires_at``.
+
+    ``teams_generation`` goes up whenever a poll finds changed teams, for other
+    per-process caches of team data (``identity_cache``) to drop their entries.
+    """
+
+    def __init__(self, *, ttl: float = SESSION_CACHE_TTL_SECONDS, max_entries: int = SESSION_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, AuthSession]] = OrderedDict()
+        self._poll_lock = threading.Lock()
+        self._polled_at: Optional[datetime] = None  # Database time the last poll covers up to
+        self._seen_changes: set[tuple[int, datetime]] = set()  # (user id, updated_at) already applied
+        self._last_poll = float('-inf')  # time.monotonic() of the last poll
+        self.teams_generation = 0
+
+    def get(self, token_hash: str) -> Optional[AuthSession]:
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            cached_until, session = entry
+            if time.monotonic() >= cached_until or session.expires_at <= timezone.now():
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return session
+
+    def set(self, session: AuthSession) -> None:
+        with self._lock:
+            self._entries[session.token_hash] = (time.monotonic() + self.ttl, session)
+            self._entries.move_to_end(session.token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(token_hash, None)
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> None:
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            stale = [key for key, (_, session) in self._entries.items() if session.user_id in user_ids]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def poll_due(self) -> bool:
+        """Whether ``poll`` would query the database now (async views hop to a thread only then)."""
+        interval = getattr(settings, 'SESSION_REVOCATION_POLL_SECONDS', SESSION_REVOCATION_POLL_SECONDS)
+        return time.monotonic() - self._last_poll >= interval
+
+    def poll(self) -> None:
+        """Evict sessions that other processes revoked, or whose team changed, since the last poll.
+
+        Runs two indexed range queries at most every ``SESSION_REVOCATION_POLL_SECONDS``;
+        a request arriving while another thread polls uses the cache as it is.
+        """
+        if not self.poll_due() or not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            started = timezone.now()
+            if self._polled_at is None:
+                # Nothing cached yet can predate the first poll
+                self._polled_at = started
+            else:
+                since = self._polled_at - _POLL_OVERLAP
+                revoked = list(AuthSession.objects.filter(revoked_at__gte=since).values_list('token_hash', flat=True))
+                changes = set(AppUser.objects.filter(updated_at__gte=since).values_list('id', 'updated_at'))
+                with self._lock:
+                    for token_hash in revoked:
+                        self._entries.pop(token_hash, None)
+                # Changes inside the overlap come back on every poll; act on each one once
+                new_changes = changes - self._seen_changes
+                if new_changes:
+                    self.invalidate_users(user_id for user_id, _ in new_changes)
+                    self.teams_generation += 1
+                self._seen_changes = changes
+                self._polled_at = started
+            self._last_poll = time.monotonic()
+        finally:
+            self._poll_lock.release()
+
+
+session_cache = SessionCache()
@@ -0,0 +1,141 @@
+"""Request coalescing: concurrent callers asking for the same key share one computation.
+
+The first caller for a key (the leader) runs the function; callers arriving while
+it is in flight wait for its result, or get its exception re-raised, instead of
+running it again. Sync callers (threaded WSGI) use ``do`` and async callers
+(ASGI) use ``ado``; both kinds can wait on the same flight, whichever kind leads.
+Nothing is cached: once the leader finishes, the next caller starts a new flight.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+_registry: dict[str, SingleFlight] = {}
+_registry_lock = threading.Lock()
+
+
+class SingleFlightTimeout(TimeoutError):
+    """A follower gave up waiting for the leader (or the leader was cancelled)."""
+
+
+class _Call:
+    __slots__ = ('event', 'done', 'result', 'error', 'async_waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def outcome(self, key: Hashable) -> Any:
+        if isinstance(self.error, asyncio.CancelledError):
+            raise SingleFlightTimeout(f'Leader for {key!r} was cancelled')
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    def __init__(self, name: str, *, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.name = name
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._counters = dict.fromkeys(('requests', 'executions', 'coalesced', 'errors', 'timeouts'), 0)
+        with _registry_lock:
+            _registry[name] = self
+
+    def do(self, key: Hashable, fn: Callable[[], T], *, timeout: Optional[float] = None) -> T:
+        call, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as exc:
+                self._finish(key, call, error=exc)
+                raise
+            self._finish(key, call, result=result)
+            return result
+
+        if not call.event.wait(self.timeout if timeout is None else timeout):
+            self._count('timeouts')
+            raise SingleFlightTimeout(f'Timed out waiting for {key!r}')
+        return call.outcome(key)
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]], *, timeout: Optional[float] = None) -> T:
+        call, leader = self._join(key)
+        if leader:
+            try:
+                result = await fn()
+            except BaseException as exc:
+                self._finish(key, call, error=exc)
+                raise
+            self._finish(key, call, result=result)
+            return result
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            pending = not call.done
+            if pending:
+                call.async_waiters.append((loop, future))
+        if pending:
+            try:
+                await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                self._count('timeouts')
+                raise SingleFlightTimeout(f'Timed out waiting for {key!r}') from None
+        return call.outcome(key)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, 'in_flight': len(self._calls)}
+
+    def _join(self, key: Hashable) -> tuple[_Call, bool]:
+        with self._lock:
+            self._counters['requests'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._counters['coalesced'] += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call, *, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+            self._counters['executions'] += 1
+            if error is not None:
+                self._counters['errors'] += 1
+            call.result, call.error, call.done = result, error, True
+            waiters, call.async_waiters = call.async_waiters, []
+        call.event.set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def singleflight_stats() -> dict[str, dict[str, int]]:
+    """Counters of every ``SingleFlight`` in the process, by name."""
+    with _registry_lock:
+        groups = list(_registry.values())
+    return {group.name: group.stats() for group in groups}
+
+
+# Aggregate reads behind the round endpoints (word counts, leaderboards)
+aggregate_reads = SingleFlight('aggregate_reads')
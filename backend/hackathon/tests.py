@@ -1,3 +1,1406 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import aclosing
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.models import F
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, Client, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .auth import (
+    OtpDispatchError,
+    adispatch_otp,
+    averify_otp_via_gateway,
+    create_session_token,
+    dispatch_otp,
+    get_session_times,
+    hash_session_token,
+    verify_otp_via_gateway,
+)
+from . import async_views
+from .finalize import close_round, refresh_snapshot, snapshots
+from .hashers import PBKDF2Hasher, ScryptHasher, StoredPassword, get_hasher, verify_stored
+from .identity import PHONE, identity_cache
+from .ingest import DUPLICATE, FULL, QUEUED, ResponseIngestor
+from .layout import LayoutStore
+from .leaderboard import IndexableSkiplist, LeaderboardEntry, RoundLeaderboard, leaderboards
+from .live import InMemoryBackend as InMemoryLiveBackend, LiveHub, sse_stream
+from .metrics import metrics
+from .middleware import ReadCacheMiddleware
+from .otp_gateway import CircuitBreaker, GatewayClient, GatewayUnavailable
+from .password_pool import LoginOverloaded, PasswordVerifier
+from .models import AppUser, AppUserMember, AuthSession, GameRound, OtpChallenge, PlayerScore, Response, ShareEvent
+from .ratelimit import CacheBackend, InMemoryBackend, RateLimiter
+from .reaper import reap
+from .render import RenderCache, render_svg
+from .scores import ScoreUpdate, add_points, add_points_many
+from .session_cache import session_cache
+from .singleflight import SingleFlight, SingleFlightTimeout
+from .wordfreq import WordFrequencyEngine, word_frequencies
+from .wordnorm import WordNormalizer
+
+
+def _create_member(team_no: int) -> tuple[AppUserMember, str]:
+    identity_cache.clear()  # may hold members of an earlier test's (flushed) database
+    user = AppUser.objects.create(
+        team_no=team_no,
+        username=f'Team {team_no}',
+        **PBKDF2Hasher(1000).encode(f'Team@{team_no:03d}').as_fields(),
+    )
+    member = AppUserMember.objects.create(
+        user=user,
+        member_id=f'M{team_no:03d}',
+        name=f'Member {team_no}',
+        email=f'member{team_no}@example.com',
+        phone=f'90000{team_no:05d}',
+    )
+    token = create_session_token()
+    times = get_session_times()
+    AuthSession.objects.create(
+        user=user,
+        member=member,
+        token_hash=hash_session_token(token),
+        created_at=times.created_at,
+        expires_at=times.expires_at,
+    )
+    return member, token
+
+
+@override_settings(READ_CACHE_TTL_SECONDS=0)
+class RoundVersionTests(TransactionTestCase):
+    def setUp(self):
+        # Round ids restart with every flushed database
+        word_frequencies.clear()
+        leaderboards.clear()
+        self.member, self.token = _create_member(1)
+        self.round_obj = GameRound.objects.create(creator=self.member.user, question='Favourite drink?')
+        self.base = f'/api/rounds/{self.round_obj.id}'
+
+    def _respond(self, word: str, token: str) -> None:
+        response = Client().post(f'{self.base}/respond', {'word': word}, 'application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 201)
+
+    def test_round_detail_answers_304_until_the_round_changes(self):
+        client = Client()
+        first = client.get(self.base)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(client.get(self.base, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self._respond('tea', self.token)
+        changed = client.get(self.base, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['response_count'], 1)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_word_cloud_answers_304_and_since_deltas(self):
+        client = Client()
+        first = client.get(f'{self.base}/wordcloud')
+        self.assertEqual(first.json(), {'version': 0, 'words': [], 'total_responses': 0})
+        self.assertEqual(client.get(f'{self.base}/wordcloud', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self._respond('tea', self.token)
+        after_tea = client.get(f'{self.base}/wordcloud', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(after_tea.status_code, 200)
+        self.assertEqual(after_tea.json()['version'], 1)
+
+        _, other_token = _create_member(2)
+        self._respond('coffee', other_token)
+        delta = client.get(f'{self.base}/wordcloud', {'since': 1}).json()
+        self.assertEqual(delta, {'version': 2, 'words': [{'text': 'coffee', 'count': 1}], 'total_responses': 2, 'since': 1})
+        self.assertEqual(len(client.get(f'{self.base}/wordcloud', {'since': 0}).json()['words']), 2)
+        self.assertEqual(client.get(f'{self.base}/wordcloud', {'since': 'x'}).status_code, 400)
+
+    def test_leaderboard_etag_follows_shares(self):
+        client = Client()
+        first = client.get(f'{self.base}/leaderboard')
+        self.assertEqual(client.get(f'{self.base}/leaderboard', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        response = client.post(f'{self.base}/share', {}, 'application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 200)
+        changed = client.get(f'{self.base}/leaderboard', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual([entry['member_name'] for entry in changed.json()['leaderboard']], ['Member 1'])
+
+    @override_settings(READ_CACHE_TTL_SECONDS=60)
+    def test_etags_follow_writes_behind_the_micro_cache(self):
+        client = Client()
+        paths = (self.base, f'{self.base}/wordcloud', f'{self.base}/leaderboard')
+        etags = {path: client.get(path)['ETag'] for path in paths}  # Now stored in the micro-cache
+        self._respond('tea', self.token)
+        for path in paths:
+            changed = client.get(path, HTTP_IF_NONE_MATCH=etags[path])
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed['ETag'], etags[path])
+
+
+@override_settings(SESSION_REVOCATION_POLL_SECONDS=0)
+class SessionCacheTests(TransactionTestCase):
+    def setUp(self):
+        session_cache.clear()
+        self.member, token = _create_member(1)
+        self.client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/me').status_code, 200)  # Now cached in this process
+
+    def test_logout_on_another_worker_revokes_the_cached_session(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/me').status_code, 200)
+        self.assertFalse(any('token_hash" =' in query['sql'] for query in queries))  # Served from the cache
+
+        # What ApiLogoutView does in another process: this process's cache is not told
+        AuthSession.objects.filter(member=self.member).update(revoked_at=timezone.now())
+        self.assertEqual(self.client.get('/api/me').status_code, 401)
+
+    def test_logout_drops_the_cached_session(self):
+        self.assertEqual(self.client.post('/api/logout').status_code, 200)
+        self.assertEqual(self.client.get('/api/me').status_code, 401)
+
+    def test_import_in_another_process_drops_sessions_of_touched_teams(self):
+        csv_path = Path(tempfile.mkdtemp()) / 'teams.csv'
+        self.addCleanup(csv_path.unlink)
+        csv_path.write_text('Team No.,Member ID,Name,Email,Phone\nTeam 1,M010,Replacement,,9000000010\n')
+        # The command's own invalidation only reaches its process
+        with mock.patch.object(session_cache, 'invalidate_users'):
+            call_command('import_teams', csv_path=str(csv_path), workers=0, stdout=StringIO())
+        self.assertEqual(self.client.get('/api/me').status_code, 401)
+
+
+class RoundCounterTests(TransactionTestCase):
+    def test_submits_keep_counters_and_recount_repairs_drift(self):
+        (first, first_token), (second, second_token) = _create_member(1), _create_member(2)
+        round_obj = GameRound.objects.create(creator=first.user, question='Favourite drink?')
+        for token, word in ((first_token, 'Tea'), (second_token, 'tea!')):
+            response = Client().post(
+                f'/api/rounds/{round_obj.id}/respond', {'word': word}, 'application/json', HTTP_AUTHORIZATION=f'Bearer {token}'
+            )
+            self.assertEqual(response.status_code, 201)
+        Response.objects.create(round=round_obj, word='coffee', word_normalized='coffee')  # Anonymous, behind the counters' back
+        round_obj.refresh_from_db()
+        self.assertEqual(
+            (round_obj.response_count, round_obj.distinct_word_count, round_obj.participant_count, round_obj.version),
+            (2, 1, 2, 2),
+        )
+        self.assertEqual(
+            set(PlayerScore.objects.filter(round=round_obj).values_list('member_id', flat=True)), {first.id, second.id}
+        )
+
+        out = StringIO()
+        call_command('recount_rounds', dry_run=True, stdout=out)
+        self.assertIn('response_count 2 -> 3, distinct_word_count 1 -> 2', out.getvalue())
+        round_obj.refresh_from_db()
+        self.assertEqual((round_obj.response_count, round_obj.version), (2, 2))
+
+        etag = Client().get(f'/api/rounds/{round_obj.id}')['ETag']
+        call_command('recount_rounds', stdout=StringIO())
+        round_obj.refresh_from_db()
+        self.assertEqual((round_obj.response_count, round_obj.distinct_word_count, round_obj.version), (3, 2, 3))
+        # Clients holding the pre-repair numbers get the new ones
+        self.assertEqual(Client().get(f'/api/rounds/{round_obj.id}', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        out = StringIO()
+        call_command('recount_rounds', stdout=out)
+        self.assertIn('0 repaired', out.getvalue())
+        round_obj.refresh_from_db()
+        self.assertEqual(round_obj.version, 3)
+
+
+class WordFrequencyTests(TransactionTestCase):
+    def setUp(self):
+        member, _ = _create_member(1)
+        self.round_obj = GameRound.objects.create(creator=member.user, question='Favourite drink?')
+        self.engine = WordFrequencyEngine(verify_interval=60)
+
+    def _add(self, word: str) -> Response:
+        return Response.objects.create(round=self.round_obj, word=word, word_normalized=word)
+
+    def _bump_version(self) -> int:
+        GameRound.objects.filter(id=self.round_obj.id).update(version=F('version') + 1)
+        self.round_obj.refresh_from_db()
+        return self.round_obj.version
+
+    def test_counts_follow_responses_from_this_and_other_processes(self):
+        for word in ('tea', 'coffee', 'tea'):
+            self._add(word)
+        version = self._bump_version()
+        self.assertEqual(self.engine.top(self.round_obj.id, version), ([('tea', 2), ('coffee', 1)], 3))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.engine.top(self.round_obj.id, version, limit=1), ([('tea', 2)], 3))
+
+        # Recorded by this process on commit
+        response = self._add('coffee')
+        self.engine.record(self.round_obj.id, response.id, 'coffee')
+        self.assertEqual(self.engine.top(self.round_obj.id, self._bump_version()), ([('coffee', 2), ('tea', 2)], 4))
+
+        # Written by another worker: only the new version tells
+        self._add('milk')
+        self.assertEqual(self.engine.top(self.round_obj.id, version)[1], 4)
+        self.assertEqual(self.engine.top(self.round_obj.id, self._bump_version())[0][-1], ('milk', 1))
+
+    def test_new_versions_read_only_the_new_rows(self):
+        self._add('tea')
+        self.engine.top(self.round_obj.id, self._bump_version())
+        self._add('coffee')
+        version = self._bump_version()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.engine.top(self.round_obj.id, version)[1], 2)
+        self.assertEqual(len(queries), 2)  # The rows after the last one counted, and the round's version
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+    def test_verification_rebuilds_when_rows_disappear(self):
+        engine = WordFrequencyEngine(verify_interval=0)
+        tea, _ = self._add('tea'), self._add('coffee')
+        engine.top(self.round_obj.id, self._bump_version())
+        tea.delete()
+        self.assertEqual(engine.top(self.round_obj.id, self._bump_version()), ([('coffee', 1)], 1))
+
+    def test_verify_interval_catches_writes_without_a_version_bump(self):
+        engine = WordFrequencyEngine(verify_interval=0)
+        self._add('tea')
+        engine.top(self.round_obj.id, self.round_obj.version)
+        self._add('tea')
+        self.assertEqual(engine.top(self.round_obj.id, self.round_obj.version), ([('tea', 2)], 2))
+
+    def test_least_recently_used_rounds_are_dropped(self):
+        engine = WordFrequencyEngine(max_rounds=1)
+        other = GameRound.objects.create(creator=self.round_obj.creator, question='Favourite food?')
+        engine.top(self.round_obj.id, 0)
+        engine.top(other.id, 0)
+        with self.assertNumQueries(0):
+            engine.top(other.id, 0)
+        with CaptureQueriesContext(connection) as queries:
+            engine.top(self.round_obj.id, 0)
+        self.assertTrue(queries)
+
+
+class LiveHubTests(TransactionTestCase):
+    def setUp(self):
+        word_frequencies.clear()
+        member, _ = _create_member(1)
+        self.round_obj = GameRound.objects.create(creator=member.user, question='Favourite drink?')
+
+    async def test_changes_fan_out_as_one_coalesced_delta(self):
+        hub = LiveHub(InMemoryLiveBackend(), interval=0)
+        first, second = hub.frames(self.round_obj.id), hub.frames(self.round_obj.id)
+        for frames in (first, second):
+            snapshot = await anext(frames)
+            self.assertEqual((snapshot['type'], snapshot['version'], snapshot['words']), ('snapshot', 0, []))
+
+        @sync_to_async
+        def respond(word):
+            Response.objects.create(round=self.round_obj, word=word, word_normalized=word)
+            GameRound.objects.filter(id=self.round_obj.id).update(version=F('version') + 1)
+
+        await respond('tea')
+        hub.publish(self.round_obj.id)
+        frame = await asyncio.wait_for(anext(first), 5)
+        self.assertEqual((frame['version'], frame['words']), (1, [{'text': 'tea', 'count': 1}]))
+        self.assertIs(await asyncio.wait_for(anext(second), 5), frame)  # Built once for all subscribers
+
+        await first.aclose()
+        await respond('coffee')
+        hub.publish(self.round_obj.id)
+        delta = await asyncio.wait_for(anext(second), 5)
+        self.assertEqual(delta['type'], 'delta')
+        self.assertEqual((delta['since'], delta['version'], delta['words']), (1, 2, [{'text': 'coffee', 'count': 1}]))
+        await second.aclose()
+        self.assertFalse(hub._subscriptions)
+
+    async def test_sse_stream_starts_with_a_snapshot_event(self):
+        async with aclosing(sse_stream(self.round_obj.id)) as stream:
+            self.assertEqual(await anext(stream), 'retry: 3000\n\n')
+            event = await anext(stream)
+        self.assertTrue(event.startswith('id: 0\nevent: snapshot\ndata: '))
+        self.assertEqual(json.loads(event.split('data: ', 1)[1])['total_responses'], 0)
+
+
+class MyRoundsPaginationTests(TransactionTestCase):
+    def setUp(self):
+        session_cache.clear()
+        member, token = _create_member(1)
+        self.client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        other, _ = _create_member(2)
+        GameRound.objects.create(creator=other.user, question='Not mine?')
+        created_at = timezone.now()  # Ties are broken by id
+        self.rounds = [
+            GameRound.objects.create(
+                creator=member.user,
+                question=f'Question {index}?',
+                status='closed' if index % 2 else 'active',
+                created_at=created_at - timedelta(minutes=index // 3),
+                response_count=index,
+            )
+            for index in range(7)
+        ]
+
+    @override_settings(SESSION_REVOCATION_POLL_SECONDS=60)
+    def test_cursor_walks_every_round_once_newest_first(self):
+        self.assertEqual(self.client.get('/api/me').status_code, 200)  # Session now cached
+        pages, cursor = [], None
+        while True:
+            params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                page = self.client.get('/api/rounds/my', params).json()
+            pages.append([(entry['question'], entry['response_count']) for entry in page['rounds']])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        expected = sorted(self.rounds, key=lambda round_obj: (round_obj.created_at, round_obj.id), reverse=True)
+        self.assertEqual(
+            [entry for page in pages for entry in page],
+            [(round_obj.question, round_obj.response_count) for round_obj in expected],
+        )
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+    def test_status_filter_and_invalid_parameters(self):
+        closed = self.client.get('/api/rounds/my', {'status': 'closed'}).json()
+        self.assertEqual({entry['status'] for entry in closed['rounds']}, {'closed'})
+        self.assertEqual((len(closed['rounds']), closed['next_cursor']), (3, None))
+        for params in ({'status': 'paused'}, {'cursor': 'garbage'}, {'limit': 'x'}):
+            self.assertEqual(self.client.get('/api/rounds/my', params).status_code, 400)
+
+
+class LeaderboardRankTests(SimpleTestCase):
+    def test_skiplist_matches_a_sorted_list(self):
+        rng = random.Random(7)
+        skiplist, expected = IndexableSkiplist(), []
+        for _ in range(2000):
+            key = rng.randrange(500)
+            if key in expected:
+                skiplist.remove(key)
+                expected.remove(key)
+            else:
+                skiplist.insert(key)
+                expected.append(key)
+                expected.sort()
+        self.assertEqual(len(skiplist), len(expected))
+        self.assertEqual(list(skiplist.islice(0, len(expected))), expected)
+        for position in (0, len(expected) // 2, len(expected) - 1):
+            self.assertEqual(skiplist.index(expected[position]), position)
+            self.assertEqual(list(skiplist.islice(position, position + 3)), expected[position:position + 3])
+        with self.assertRaises(KeyError):
+            skiplist.index(500)
+
+    def test_rank_of_and_around_follow_score_changes(self):
+        board = RoundLeaderboard()
+        now = timezone.now()
+
+        def score(member_id, points, seconds_ago):
+            board.upsert(LeaderboardEntry(member_id, f'Member {member_id}', points, 0, points, now - timedelta(seconds=seconds_ago)))
+
+        for member_id in range(1, 8):
+            score(member_id, member_id, 60)
+        self.assertEqual([entry.member_id for _, entry in board.top(3)], [7, 6, 5])
+        self.assertEqual(board.rank_of(1), 7)
+        self.assertEqual([(rank, entry.member_id) for rank, entry in board.around(4, 1)], [(3, 5), (4, 4), (5, 3)])
+        self.assertEqual([rank for rank, _ in board.around(7, 2)], [1, 2, 3])
+        self.assertEqual(board.around(99, 2), [])
+
+        score(1, 7, 0)  # Ties rank the most recent score first
+        self.assertEqual((board.rank_of(1), board.rank_of(7), board.rank_of(2)), (1, 2, 7))
+        score(1, 0, 120)  # An older read of the row never overwrites a newer one
+        self.assertEqual(board.rank_of(1), 1)
+
+
+class ResponseIngestTests(TransactionTestCase):
+    def setUp(self):
+        word_frequencies.clear()
+        self.member, self.token = _create_member(1)
+        self.round_obj = GameRound.objects.create(creator=self.member.user, question='Favourite drink?')
+        # Queue without the background writer, so each test decides when to flush
+        mock.patch.object(ResponseIngestor, '_ensure_started').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_duplicates_are_caught_in_memory_and_written_in_one_batch(self):
+        ingestor = ResponseIngestor()
+        round_id, member_id = self.round_obj.id, self.member.id
+        self.assertEqual(ingestor.submit(round_id, member_id, 'Tea', 'tea'), QUEUED)
+        self.assertEqual(ingestor.submit(round_id, member_id, 'Coffee', 'coffee'), DUPLICATE)
+        self.assertEqual(ingestor.submit(round_id, None, 'tea', 'tea'), QUEUED)
+        self.assertEqual(ingestor.submit(round_id, None, 'milk', 'milk'), QUEUED)
+        self.assertEqual(ingestor.flush(), 3)
+
+        self.round_obj.refresh_from_db()
+        self.assertEqual(
+            (
+                self.round_obj.response_count,
+                self.round_obj.distinct_word_count,
+                self.round_obj.participant_count,
+                self.round_obj.version,
+            ),
+            (3, 2, 1, 1),
+        )
+        self.assertEqual(PlayerScore.objects.get(member=self.member).response_points, 1)
+
+    def test_duplicates_accepted_by_another_process_are_logged_and_counted(self):
+        first, second = ResponseIngestor(), ResponseIngestor()
+        self.assertEqual(first.submit(self.round_obj.id, self.member.id, 'Tea', 'tea'), QUEUED)
+        self.assertEqual(second.submit(self.round_obj.id, self.member.id, 'Coffee', 'coffee'), QUEUED)
+        first.flush()
+        with self.assertLogs('hackathon.ingest', 'WARNING') as logs:
+            second.flush()
+        self.assertIn('Dropped 1 queued responses', logs.output[0])
+        self.assertEqual((first.duplicates_dropped, second.duplicates_dropped), (0, 1))
+        self.assertEqual(list(Response.objects.values_list('word', flat=True)), ['Tea'])
+
+    def test_responses_queued_before_the_close_reach_the_final_results(self):
+        ingestor = ResponseIngestor()  # Another worker's queue: the close does not flush it
+        self.assertEqual(ingestor.submit(self.round_obj.id, self.member.id, 'Tea', 'tea'), QUEUED)
+        closed = close_round(self.round_obj.id)
+        self.assertEqual(Client().get(f'/api/rounds/{self.round_obj.id}/wordcloud').json()['total_responses'], 0)
+
+        self.assertEqual(ingestor.flush(), 1)
+        self.round_obj.refresh_from_db()
+        self.assertEqual((self.round_obj.response_count, self.round_obj.participant_count), (1, 1))
+        self.assertGreater(self.round_obj.version, closed.version)
+        data = Client().get(f'/api/rounds/{self.round_obj.id}/wordcloud').json()
+        self.assertEqual((data['version'], data['words']), (self.round_obj.version, [{'text': 'tea', 'count': 1}]))
+
+    def test_failed_batch_is_retried_one_by_one(self):
+        ingestor = ResponseIngestor()
+        for word in ('tea', 'coffee'):
+            ingestor.submit(self.round_obj.id, None, word, word)
+        ingestor.submit(self.round_obj.id, self.member.id, 'milk', 'milk')
+        Response.objects.create(round=self.round_obj, member=self.member, word='water', word_normalized='water')
+        with mock.patch.object(ingestor, '_write_batch', side_effect=DatabaseError), self.assertLogs('hackathon.ingest'):
+            ingestor.flush()
+        # The member had answered through another worker meanwhile
+        self.assertEqual(
+            sorted(Response.objects.filter(round=self.round_obj).values_list('word_normalized', flat=True)),
+            ['coffee', 'tea', 'water'],
+        )
+
+    @override_settings(RESPONSE_INGEST_MODE='batched')
+    def test_full_queue_falls_back_to_a_synchronous_write(self):
+        with mock.patch.object(ResponseIngestor, 'submit', return_value=FULL), \
+                mock.patch.object(ResponseIngestor, 'asubmit', return_value=FULL):
+            response = Client().post(
+                f'/api/rounds/{self.round_obj.id}/respond', {'word': 'tea'}, 'application/json',
+                HTTP_AUTHORIZATION=f'Bearer {self.token}',
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Response.objects.filter(round=self.round_obj, member=self.member).exists())
+
+
+class ShareConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    SHARES_PER_THREAD = 10
+
+    def test_concurrent_shares_keep_exact_totals(self):
+        members = [_create_member(team_no) for team_no in range(1, 3)]
+        round_obj = GameRound.objects.create(creator=members[0][0].user, question='Stress test round?')
+        errors = []
+
+        def hammer(token: str) -> None:
+            client = Client()
+            try:
+                for _ in range(self.SHARES_PER_THREAD):
+                    response = client.post(
+                        f'/api/rounds/{round_obj.id}/share',
+                        json.dumps({}),
+                        content_type='application/json',
+                        HTTP_AUTHORIZATION=f'Bearer {token}',
+                    )
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=hammer, args=(members[i % len(members)][1],))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        shares_per_member = self.THREADS // len(members) * self.SHARES_PER_THREAD
+        for member, _ in members:
+            score = PlayerScore.objects.get(round=round_obj, member=member)
+            self.assertEqual(score.share_points, shares_per_member)
+            self.assertEqual(score.total_points, shares_per_member)
+
+        round_obj.refresh_from_db()
+        total_shares = self.THREADS * self.SHARES_PER_THREAD
+        self.assertEqual(ShareEvent.objects.filter(round=round_obj).count(), total_shares)
+        self.assertEqual(round_obj.share_count, total_shares)
+        self.assertEqual(round_obj.participant_count, len(members))
+        self.assertEqual(round_obj.version, total_shares)
+
+
+class ScoreUpsertTests(TransactionTestCase):
+    def test_created_is_reported_for_inserts_only(self):
+        (first, _), (second, _) = _create_member(1), _create_member(2)
+        round_obj = GameRound.objects.create(creator=first.user, question='Upserts?')
+
+        # A repeated increment that leaves the row holding exactly that increment is still an update
+        self.assertTrue(add_points(round_id=round_obj.id, member_id=first.id).created)
+        self.assertEqual(add_points(round_id=round_obj.id, member_id=first.id), ScoreUpdate(False, 0, 0, 0))
+        self.assertEqual(add_points(round_id=round_obj.id, member_id=first.id, share_points=1), ScoreUpdate(False, 0, 1, 1))
+
+        created = add_points_many(round_id=round_obj.id, member_ids=[first.id, second.id], response_points=1)
+        self.assertEqual(created, 1)
+        self.assertEqual(
+            sorted(PlayerScore.objects.filter(round=round_obj).values_list('member_id', 'response_points', 'total_points')),
+            [(first.id, 1, 2), (second.id, 1, 1)],
+        )
+
+
+class WordNormalizationTests(SimpleTestCase):
+    def test_variants_share_one_key(self):
+        normalizer = WordNormalizer()
+        keys = {result.normalized for result in normalizer.normalize_many(['Café', 'cafe', 'CAFE!', ' cafe '])}
+        self.assertEqual(keys, {'cafe'})
+
+    def test_default_stages_keep_answers_as_written(self):
+        normalizer = WordNormalizer()
+        for word, key in [
+            ('Redis', 'redis'), ('nodejs', 'nodejs'), ('Kubernetes', 'kubernetes'), ('Postgres', 'postgres'),
+            ('news', 'news'), ('Dies', 'dies'), ('cafés', 'cafes'),
+        ]:
+            self.assertEqual(normalizer.normalize(word).normalized, key, word)
+        for word in ['no', 'me', 'I', 'this', 'us', 'yes']:
+            self.assertIsNone(normalizer.normalize(word).error, word)
+        self.assertEqual(normalizer.normalize('Fuck!').error, 'This word is not allowed')
+
+    def test_invalid_and_blocked_words_are_rejected(self):
+        normalizer = WordNormalizer(blocked={'Shit'})
+        self.assertEqual(normalizer.normalize('').error, 'Word is required')
+        self.assertEqual(normalizer.normalize('two words').error, 'Only one word allowed')
+        self.assertEqual(normalizer.normalize('?!').error, 'Invalid word')
+        self.assertEqual(normalizer.normalize('SHIT').error, 'This word is not allowed')
+        self.assertIsNone(normalizer.normalize('fuck').error)  # ``blocked`` replaces the default list
+
+    def test_stemming_and_stopwords_are_opt_in(self):
+        normalizer = WordNormalizer(['nfkc_casefold', 'fold_accents', 'light_stem', 'stopwords', 'block'])
+        self.assertEqual(normalizer.normalize('cafés').normalized, 'cafe')
+        self.assertEqual(normalizer.normalize('SHITS').error, 'This word is not allowed')
+        self.assertEqual(normalizer.normalize('this').error, 'This word is not allowed')
+
+    def test_stages_are_configurable(self):
+        self.assertEqual(WordNormalizer(['nfkc_casefold']).normalize('Cafés').normalized, 'cafés')
+        with self.assertRaises(ValueError):
+            WordNormalizer(['soundex'])
+
+
+class RenormalizeWordsTests(TransactionTestCase):
+    def setUp(self):
+        word_frequencies.clear()
+        snapshots.clear()
+        self.member, _ = _create_member(1)
+
+    def _round_answered_under_old_rules(self) -> GameRound:
+        round_obj = GameRound.objects.create(creator=self.member.user, question='Favourite drink?')
+        for word, old_key in (('Café', 'café'), ('cafe', 'cafe'), ('Tea', 'tea')):
+            Response.objects.create(round=round_obj, word=word, word_normalized=old_key)
+        GameRound.objects.filter(id=round_obj.id).update(response_count=3, distinct_word_count=3, version=3)
+        return round_obj
+
+    def _words(self, round_obj: GameRound) -> tuple[int, list[dict]]:
+        data = Client().get(f'/api/rounds/{round_obj.id}/wordcloud').json()
+        return data['version'], data['words']
+
+    def test_live_counts_and_closed_snapshots_follow_the_new_keys(self):
+        active = self._round_answered_under_old_rules()
+        closed = self._round_answered_under_old_rules()
+        close_round(closed.id)
+        self.assertEqual(self._words(active)[1], [{'text': word, 'count': 1} for word in ('cafe', 'café', 'tea')])
+        closed_version, closed_words = self._words(closed)
+        self.assertEqual(len(closed_words), 3)
+
+        out = StringIO()
+        call_command('renormalize_words', stdout=out)
+        self.assertIn('2 changed in 2 rounds', out.getvalue())
+
+        expected = [{'text': 'cafe', 'count': 2}, {'text': 'tea', 'count': 1}]
+        self.assertEqual(self._words(active), (4, expected))  # No restart needed
+        version, words = self._words(closed)
+        self.assertGreater(version, closed_version)
+        self.assertEqual(words, expected)
+        closed.refresh_from_db()
+        self.assertEqual(closed.distinct_word_count, 2)
+
+
+class WordCloudLayoutTests(SimpleTestCase):
+    WORDS = [(f'word{i}', 40 - i) for i in range(40)]
+
+    @staticmethod
+    def _boxes(payload):
+        return {word['text']: (word['x'], word['y'], word['width'], word['height']) for word in payload['words']}
+
+    def test_placements_do_not_overlap(self):
+        payload = LayoutStore().layout(1, 1, self.WORDS, 1280, 720)
+        boxes = list(self._boxes(payload).values())
+        self.assertEqual(len(boxes), len(self.WORDS))
+        for i, (x, y, w, h) in enumerate(boxes):
+            self.assertTrue(0 <= x and x + w <= payload['width'] and 0 <= y and y + h <= payload['height'])
+            for ox, oy, ow, oh in boxes[i + 1:]:
+                self.assertFalse(x < ox + ow and ox < x + w and y < oy + oh and oy < y + h)
+
+    def test_new_word_leaves_existing_placements_alone(self):
+        store = LayoutStore()
+        before = self._boxes(store.layout(1, 1, self.WORDS, 1280, 720))
+        after = self._boxes(store.layout(1, 2, self.WORDS + [('newcomer', 1)], 1280, 720))
+        self.assertIn('newcomer', after)
+        self.assertEqual({text: after[text] for text in before}, before)
+
+
+class RenderCacheTests(SimpleTestCase):
+    def test_svg_contains_every_placed_word(self):
+        layout = LayoutStore().layout(1, 1, [('python', 3), ('<django>', 1)], 640, 480)
+        svg = render_svg(layout, 'dark').decode('utf-8')
+        self.assertIn('>python</text>', svg)
+        self.assertIn('&lt;django&gt;', svg)
+
+    def test_disk_tier_survives_memory_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = RenderCache(max_bytes=4, directory=Path(directory))
+            cache.set('ab12', b'12345')
+            cache.clear()
+            self.assertEqual(cache.get('ab12'), b'12345')
+            self.assertIsNone(cache.get('cd34'))
+
+
+class RenderDiskTierTests(TransactionTestCase):
+    def test_only_closed_rounds_are_written_to_disk(self):
+        member, token = _create_member(1)
+        round_obj = GameRound.objects.create(creator=member.user, question='Favourite drink?')
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(client.post(f'/api/rounds/{round_obj.id}/respond', {'word': 'tea'}, 'application/json').status_code, 201)
+        with tempfile.TemporaryDirectory() as name:
+            directory = Path(name)
+            mock.patch('hackathon.render._render_cache', RenderCache(directory=directory)).start()
+            self.addCleanup(mock.patch.stopall)
+            for theme in ('light', 'dark'):
+                self.assertEqual(client.get(f'/api/rounds/{round_obj.id}/wordcloud.svg?theme={theme}').status_code, 200)
+            self.assertEqual(list(directory.rglob('*')), [])
+
+            self.assertEqual(client.post(f'/api/rounds/{round_obj.id}/close').status_code, 200)
+            self.assertEqual(client.get(f'/api/rounds/{round_obj.id}/wordcloud.svg').status_code, 200)
+            self.assertEqual(len([path for path in directory.rglob('*') if path.is_file()]), 1)
+
+    def test_closed_round_is_rendered_again_after_its_snapshot_is_refreshed(self):
+        member, token = _create_member(1)
+        round_obj = GameRound.objects.create(creator=member.user, question='Favourite drink?')
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(client.post(f'/api/rounds/{round_obj.id}/respond', {'word': 'tea'}, 'application/json').status_code, 201)
+        self.assertEqual(client.post(f'/api/rounds/{round_obj.id}/close').status_code, 200)
+        with tempfile.TemporaryDirectory() as name:
+            directory = Path(name)
+            mock.patch('hackathon.render._render_cache', RenderCache(directory=directory)).start()
+            self.addCleanup(mock.patch.stopall)
+            first = client.get(f'/api/rounds/{round_obj.id}/wordcloud.svg')
+
+            # A response another worker accepted before the close, written after it
+            Response.objects.create(round=round_obj, word='coffee', word_normalized='coffee')
+            refresh_snapshot(round_obj.id)
+            second = client.get(f'/api/rounds/{round_obj.id}/wordcloud.svg')
+            self.assertNotEqual(second['ETag'], first['ETag'])
+            self.assertNotIn(b'coffee', first.content)
+            self.assertIn(b'coffee', second.content)
+            self.assertEqual(len([path for path in directory.rglob('*') if path.is_file()]), 2)
+
+
+class CloseRoundTests(TransactionTestCase):
+    def _post(self, path, token, body=None):
+        return Client().post(path, json.dumps(body or {}), content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_closed_round_is_served_from_its_snapshot(self):
+        (creator, creator_token), (player, player_token) = _create_member(1), _create_member(2)
+        round_obj = GameRound.objects.create(creator=creator.user, question='Favourite drink?')
+        base = f'/api/rounds/{round_obj.id}'
+        self.assertEqual(self._post(f'{base}/respond', creator_token, {'word': 'Coffee'}).status_code, 201)
+        self.assertEqual(self._post(f'{base}/respond', player_token, {'word': 'tea'}).status_code, 201)
+        self.assertEqual(self._post(f'{base}/share', player_token).status_code, 200)
+
+        self.assertEqual(self._post(f'{base}/close', player_token).status_code, 403)
+        closed = self._post(f'{base}/close', creator_token)
+        self.assertEqual(closed.status_code, 200)
+        self.assertEqual(closed.json()['status'], 'closed')
+
+        round_obj.refresh_from_db()
+        self.assertEqual(round_obj.snapshot['words'], [['coffee', 1], ['tea', 1]])
+        self.assertEqual(round_obj.snapshot['leaderboard'][0][0], player.id)
+
+        # Frozen: no more responses or share points
+        self.assertEqual(self._post(f'{base}/respond', player_token, {'word': 'juice'}).status_code, 400)
+        self.assertEqual(self._post(f'{base}/share', player_token).status_code, 400)
+
+        cloud = Client().get(f'{base}/wordcloud')
+        self.assertEqual(cloud.json()['words'], [{'text': 'coffee', 'count': 1}, {'text': 'tea', 'count': 1}])
+        self.assertIn('immutable', cloud['Cache-Control'])
+        board = Client().get(f'{base}/leaderboard?me=1', HTTP_AUTHORIZATION=f'Bearer {creator_token}').json()
+        self.assertEqual([entry['total_points'] for entry in board['leaderboard']], [2, 1])
+        self.assertEqual(board['me']['rank'], 2)
+        detail = Client().get(base).json()
+        self.assertEqual((detail['response_count'], detail['share_count'], detail['participant_count']), (2, 1, 2))
+
+
+@override_settings(READ_CACHE_TTL_SECONDS=0.5, COMPRESS_MIN_BYTES=200)
+class ReadCacheMiddlewareTests(TransactionTestCase):
+    def setUp(self):
+        member, _ = _create_member(1)
+        self.round_obj = GameRound.objects.create(creator=member.user, question='Pick a word?')
+        Response.objects.bulk_create(
+            Response(round=self.round_obj, word=f'word{i}', word_normalized=f'word{i}') for i in range(50)
+        )
+
+    def test_repeated_reads_are_served_from_the_micro_cache(self):
+        client = Client()
+        path = f'/api/rounds/{self.round_obj.id}/wordcloud'
+        first = client.get(path)
+        with CaptureQueriesContext(connection) as queries:
+            second = client.get(path, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(second.content), first.content)
+        self.assertTrue(second['ETag'].startswith('W/'))
+        self.assertEqual(client.get(path, HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304)
+
+    @override_settings(READ_CACHE_TTL_SECONDS=60)
+    def test_conditional_reads_see_writes_made_within_the_ttl(self):
+        client = Client()
+        path = f'/api/rounds/{self.round_obj.id}'
+        etag = client.get(path)['ETag']
+        self.assertEqual(client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        GameRound.objects.filter(id=self.round_obj.id).update(version=F('version') + 1)
+        changed = client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_preflight_short_circuits(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().options(f'/api/rounds/{self.round_obj.id}/respond', HTTP_ORIGIN='http://localhost:5173')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Access-Control-Allow-Origin'], 'http://localhost:5173')
+
+
+class SingleFlightTests(SimpleTestCase):
+    def _start_leader(self, flight, key, fn):
+        started, release = threading.Event(), threading.Event()
+
+        def leader():
+            started.set()
+            release.wait(5)
+            return fn()
+
+        results = []
+
+        def run():
+            try:
+                results.append(flight.do(key, leader))
+            except ValueError as exc:
+                results.append(exc)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        started.wait(5)
+        return release, thread, results
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight('test-share')
+        calls = []
+        release, leader, results = self._start_leader(flight, 'k', lambda: calls.append(1) or 'value')
+        followers = [threading.Thread(target=lambda: results.append(flight.do('k', lambda: 'own'))) for _ in range(5)]
+        for thread in followers:
+            thread.start()
+        while flight.stats()['coalesced'] < 5:
+            pass
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+        self.assertEqual((calls, results), ([1], ['value'] * 6))
+        self.assertEqual(flight.stats(), {'requests': 6, 'executions': 1, 'coalesced': 5, 'errors': 0, 'timeouts': 0, 'in_flight': 0})
+
+    def test_errors_propagate_and_slow_leaders_time_out(self):
+        flight = SingleFlight('test-errors')
+
+        def fail():
+            raise ValueError('boom')
+
+        release, leader, _ = self._start_leader(flight, 'k', fail)
+        with self.assertRaises(SingleFlightTimeout):
+            flight.do('k', fail, timeout=0.01)
+        errors = []
+
+        def follower():
+            try:
+                flight.do('k', lambda: 'own')
+            except ValueError as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=follower)
+        thread.start()
+        while flight.stats()['coalesced'] < 2:
+            pass
+        release.set()
+        thread.join(5)
+        leader.join(5)
+        self.assertEqual([str(exc) for exc in errors], ['boom'])
+        self.assertEqual(flight.stats()['timeouts'], 1)
+
+    def test_async_callers_coalesce_with_each_other_and_with_threads(self):
+        flight = SingleFlight('test-async')
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def gather():
+            return await asyncio.gather(*(flight.ado('k', compute) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(gather()), ['value'] * 4)
+        self.assertEqual(calls, [1])
+
+        async def follow_thread(release):
+            follower = asyncio.ensure_future(flight.ado('sync', compute))
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.wait_for(follower, 5)
+
+        release, leader, _ = self._start_leader(flight, 'sync', lambda: 'from thread')
+        self.assertEqual(asyncio.run(follow_thread(release)), 'from thread')
+        leader.join(5)
+        self.assertEqual(calls, [1])
+
+
+
+class AsyncViewTests(TransactionTestCase):
+    def setUp(self):
+        self.member, self.token = _create_member(1)
+        self.round_obj = GameRound.objects.create(creator=self.member.user, question='Favourite drink?')
+        self.base = f'/api/rounds/{self.round_obj.id}'
+        self.auth = {'Authorization': f'Bearer {self.token}'}
+
+    async def _call(self, view, method, path, body=None, **headers):
+        factory = AsyncRequestFactory()
+        if method == 'post':
+            request = factory.post(path, json.dumps(body or {}), content_type='application/json', headers=headers)
+        else:
+            request = factory.get(path, headers=headers)
+        return await view.as_view()(request, round_id=self.round_obj.id)
+
+    async def test_writes(self):
+        respond, share = f'{self.base}/respond', f'{self.base}/share'
+        submitted = await self._call(async_views.ApiSubmitResponseView, 'post', respond, {'word': 'Coffee'}, **self.auth)
+        self.assertEqual(submitted.status_code, 201)
+        again = await self._call(async_views.ApiSubmitResponseView, 'post', respond, {'word': 'tea'}, **self.auth)
+        self.assertEqual(again.status_code, 400)
+        shared = await self._call(async_views.ApiRecordShareView, 'post', share, **self.auth)
+        self.assertEqual(json.loads(shared.content)['total_points'], 2)
+        self.assertEqual(await Response.objects.filter(round=self.round_obj).acount(), 1)
+
+    @override_settings(READ_CACHE_TTL_SECONDS=0)
+    async def test_reads_match_the_sync_views(self):
+        await Response.objects.acreate(round=self.round_obj, member=self.member, word='Coffee', word_normalized='coffee')
+        await sync_to_async(PlayerScore.objects.create)(round=self.round_obj, member=self.member, response_points=1, total_points=1)
+        for view, path, headers in (
+            (async_views.ApiRoundDetailView, self.base, {}),
+            (async_views.ApiWordCloudDataView, f'{self.base}/wordcloud', {}),
+            (async_views.ApiLeaderboardView, f'{self.base}/leaderboard?me=1', self.auth),
+        ):
+            response = await self._call(view, 'get', path, **headers)
+            expected = await sync_to_async(Client().get)(path, headers=headers)
+            self.assertEqual((response.status_code, json.loads(response.content)), (200, expected.json()))
+            self.assertEqual(response['ETag'], expected['ETag'])
+            if view is not async_views.ApiRoundDetailView:
+                not_modified = await self._call(view, 'get', path, **headers, **{'If-None-Match': response['ETag']})
+                self.assertEqual(not_modified.status_code, 304)
+
+    async def test_unexpected_errors_are_logged_not_returned(self):
+        with mock.patch('hackathon.async_views.store_response', side_effect=RuntimeError('secret detail')), \
+                self.assertLogs('hackathon.async_views', 'ERROR'):
+            response = await self._call(async_views.ApiSubmitResponseView, 'post', f'{self.base}/respond', {'word': 'tea'}, **self.auth)
+        self.assertEqual((response.status_code, json.loads(response.content)), (500, {'error': 'Internal server error'}))
+
+    @override_settings(READ_CACHE_TTL_SECONDS=0.5)
+    async def test_read_cache_collapses_concurrent_async_requests(self):
+        calls = []
+
+        async def view(request):
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return HttpResponse('{}', content_type='application/json')
+
+        middleware = ReadCacheMiddleware(view)
+        responses = await asyncio.gather(*(middleware(AsyncRequestFactory().get(f'{self.base}/wordcloud')) for _ in range(20)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({response.status_code for response in responses}, {200})
+
+    async def test_otp_login(self):
+        factory = AsyncRequestFactory()
+
+        def post(path, body):
+            return factory.post(path, json.dumps(body), content_type='application/json')
+
+        with mock.patch('hackathon.views.rate_limiter', RateLimiter(InMemoryBackend())), \
+                mock.patch('hackathon.auth.dispatch_otp') as dispatch, \
+                mock.patch('hackathon.auth.verify_otp_via_gateway', return_value=True):
+            requested = await async_views.ApiOtpRequestView.as_view()(
+                post('/api/otp/request', {'channel': 'whatsapp', 'phone': self.member.phone})
+            )
+            self.assertEqual(requested.status_code, 200)
+            challenge_id = json.loads(requested.content)['challenge_id']
+            verified = await async_views.ApiOtpVerifyView.as_view()(
+                post('/api/otp/verify', {'challenge_id': challenge_id, 'otp': '123456'})
+            )
+        self.assertEqual(verified.status_code, 200)
+        self.assertEqual(dispatch.call_args.kwargs['identifier'], self.member.phone)
+        self.assertEqual(await AuthSession.objects.filter(member=self.member).acount(), 2)
+
+
+class _StubGateway(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests += 1
+        status, delay = self.server.script.pop(0) if self.server.script else (200, 0)
+        time.sleep(delay)
+        body = json.dumps({'status': 'success'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(OTP_GATEWAY_READ_TIMEOUT=0.3)
+class OtpGatewayTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubGateway)
+        self.server.connections = self.server.requests = 0
+        self.server.script = []  # (status, delay) per request; then 200s
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/otp'
+        env = mock.patch.dict(os.environ, {'OTP_GATEWAY_URL': self.url, 'OTP_GATEWAY_AUTH_HEADER': ''})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_calls_reuse_one_connection_and_retry_unavailable_responses(self):
+        self.server.script = [(503, 0)]
+        dispatch_otp(channel='email', identifier='member1@example.com')
+        self.assertTrue(verify_otp_via_gateway(identifier='member1@example.com', otp='123456'))
+        self.assertEqual((self.server.requests, self.server.connections), (3, 1))
+
+    def test_failures_that_may_have_sent_the_otp_are_not_retried(self):
+        self.server.script = [(200, 1.0)]
+        with self.assertRaisesMessage(OtpDispatchError, 'OTP gateway timed out'):
+            dispatch_otp(channel='email', identifier='member1@example.com')
+        self.assertEqual(self.server.requests, 1)
+        self.server.script = [(504, 0)]
+        with self.assertRaises(OtpDispatchError):
+            dispatch_otp(channel='email', identifier='member1@example.com')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_breaker_fails_fast_until_a_probe_succeeds(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        client = GatewayClient(self.url, max_retries=0, breaker=breaker)
+        self.addCleanup(client.close)
+        self.server.script = [(500, 0), (500, 0)]
+        for _ in range(2):
+            with self.assertRaisesMessage(Exception, 'HTTP 500'):
+                client.post({})
+        with self.assertRaises(GatewayUnavailable):
+            client.post({})
+        self.assertEqual((self.server.requests, breaker.state), (2, 'open'))
+
+        time.sleep(0.25)
+        self.assertEqual(client.post({}), {'status': 'success'})
+        self.assertEqual((self.server.requests, breaker.state), (3, 'closed'))
+
+    def test_async_calls_run_off_the_shared_sync_thread(self):
+        threads = []
+        post = GatewayClient.post
+
+        def recording_post(client, form):
+            threads.append(threading.get_ident())
+            return post(client, form)
+
+        async def login():
+            shared = await sync_to_async(threading.get_ident)()
+            await adispatch_otp(channel='email', identifier='member1@example.com')
+            self.assertTrue(await averify_otp_via_gateway(identifier='member1@example.com', otp='123456'))
+            return shared
+
+        with mock.patch.object(GatewayClient, 'post', recording_post):
+            shared = asyncio.run(login())
+        self.assertEqual(self.server.requests, 2)
+        self.assertNotIn(shared, threads)
+
+
+class PasswordVerifierTests(TransactionTestCase):
+    def test_matches_in_the_pool_and_rejects_when_full(self):
+        verifier = PasswordVerifier(workers=1, max_pending=1)
+        self.addCleanup(verifier.shutdown)
+        wrong, right = PBKDF2Hasher(1000).encode('nope'), PBKDF2Hasher(1000).encode('Team@001')
+        self.assertEqual(verifier.verify('Team@001', [wrong, right]).index, 1)
+        self.assertIsNone(verifier.verify('Team@002', [wrong, right]))
+
+        slow = PBKDF2Hasher(2_000_000).encode('Team@001')
+        thread = threading.Thread(target=verifier.verify, args=('x', [slow]))
+        thread.start()
+        while verifier.pending == 0:
+            time.sleep(0.001)
+        with self.assertRaises(LoginOverloaded):
+            verifier.verify('Team@001', [right])
+        thread.join(30)
+        self.assertEqual(asyncio.run(verifier.averify('Team@001', [right])).index, 0)
+
+    def test_timed_out_checks_hold_their_slot_until_the_worker_finishes(self):
+        verifier = PasswordVerifier(workers=1, max_pending=1, timeout=0.05)
+        self.addCleanup(verifier.shutdown)
+        right = PBKDF2Hasher(1000).encode('Team@001')
+        verifier.timeout = 30
+        verifier.verify('Team@001', [right])  # start the worker
+        verifier.timeout = 0.05
+
+        with self.assertRaisesMessage(LoginOverloaded, 'timed out'):
+            verifier.verify('x', [PBKDF2Hasher(2_000_000).encode('Team@001')])
+        self.assertEqual(verifier.pending, 1)
+        with self.assertRaisesMessage(LoginOverloaded, 'Too many logins'):
+            verifier.verify('Team@001', [right])
+        deadline = time.monotonic() + 30
+        while verifier.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(verifier.pending, 0)
+
+    def test_login_checks_a_shared_team_password_once(self):
+        member, _ = _create_member(1)
+        AppUserMember.objects.create(
+            user=member.user, member_id='M002', name='Member 2', email=member.email, phone='9000000099'
+        )
+        verifier = PasswordVerifier(workers=0)
+        with mock.patch('hackathon.views.get_password_verifier', return_value=verifier), \
+                mock.patch.object(verifier, 'verify', wraps=verifier.verify) as verify:
+            response = Client().post(
+                '/api/login', json.dumps({'username': member.email, 'password': 'Team@001'}), content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(verify.call_args.args[1]), 1)
+
+
+class PasswordHasherTests(TransactionTestCase):
+    def _login(self, member):
+        return Client().post(
+            '/api/login', json.dumps({'username': member.email, 'password': 'Team@001'}), content_type='application/json'
+        )
+
+    def test_schemes_verify_and_report_outdated_parameters(self):
+        for hasher in (PBKDF2Hasher(1000), ScryptHasher(2 ** 10)):
+            stored = hasher.encode('Team@001')
+            self.assertTrue(verify_stored('Team@001', stored))
+            self.assertFalse(verify_stored('Team@002', stored))
+            self.assertFalse(hasher.needs_rehash(stored))
+        self.assertTrue(PBKDF2Hasher(2000).needs_rehash(PBKDF2Hasher(1000).encode('x')))
+        self.assertTrue(ScryptHasher(2 ** 10).needs_rehash(PBKDF2Hasher(2 ** 10).encode('x')))
+        self.assertFalse(verify_stored('x', StoredPassword('md5', 'c2FsdA==', 'x', 1)))
+
+    @override_settings(PASSWORD_HASHER='scrypt', PASSWORD_SCRYPT_N=10 ** 4)
+    def test_scrypt_cost_must_be_a_power_of_two(self):
+        with self.assertRaisesMessage(ValueError, 'PASSWORD_SCRYPT_N must be a power of two'):
+            get_hasher()
+        with self.settings(PASSWORD_SCRYPT_N=2 ** 14):
+            self.assertEqual(get_hasher().work, 2 ** 14)
+
+    @override_settings(PASSWORD_POOL_WORKERS=0, PASSWORD_HASHER='scrypt', PASSWORD_SCRYPT_N=2 ** 10)
+    def test_login_upgrades_an_outdated_hash(self):
+        member, _ = _create_member(1)
+        verifier = PasswordVerifier(workers=0)
+        with mock.patch('hackathon.views.get_password_verifier', return_value=verifier):
+            self.assertEqual(self._login(member).status_code, 200)
+            user = AppUser.objects.get(id=member.user_id)
+            self.assertEqual((user.password_algorithm, user.password_iterations), ('scrypt', 2 ** 10))
+            self.assertTrue(verify_stored('Team@001', StoredPassword.of(user)))
+
+            # Already current: logging in again leaves it alone
+            self.assertEqual(self._login(member).status_code, 200)
+            self.assertEqual(AppUser.objects.get(id=member.user_id).password_hash_b64, user.password_hash_b64)
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_import_keeps_hashes_that_already_match(self):
+        csv_path = Path(tempfile.mkdtemp()) / 'teams.csv'
+        self.addCleanup(csv_path.unlink)
+        csv_path.write_text(
+            'Team No.,Member ID,Name,Email,Phone\n'
+            'Team 1,M001,Member 1,member1@example.com,9000000001\n'
+            'Team 2,M002,Member 2,member2@example.com,9000000002\n'
+        )
+        member, _ = _create_member(1)
+        original = AppUser.objects.get(id=member.user_id).password_hash_b64
+        AppUser.objects.create(team_no=2, username='Team 2', **PBKDF2Hasher(1000).encode('stale').as_fields())
+
+        out = StringIO()
+        call_command('import_teams', csv_path=str(csv_path), stdout=out)
+
+        self.assertIn('Passwords hashed: 1; stored hashes verified and kept: 1', out.getvalue())
+        self.assertEqual(AppUser.objects.get(team_no=1).password_hash_b64, original)
+        self.assertTrue(verify_stored('Team@002', StoredPassword.of(AppUser.objects.get(team_no=2))))
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class ImportTeamsTests(TransactionTestCase):
+    def _csv(self, text: str) -> str:
+        csv_path = Path(tempfile.mkdtemp()) / 'teams.csv'
+        self.addCleanup(csv_path.unlink)
+        csv_path.write_text('Team No.,Member ID,Name,Email,Phone\n' + text)
+        return str(csv_path)
+
+    def test_dry_run_plans_and_import_applies_moves_and_deletes(self):
+        member, _ = _create_member(1)
+        AppUserMember.objects.create(user=member.user, member_id='M009', name='Gone', phone='9000000009')
+        moving, _ = _create_member(3)
+        csv_path = self._csv(
+            'Team 1,M001,Renamed,member1@example.com,9000000001\n'
+            'Team 2,M002,Member 2,,9000000002\n'
+            'Team 2,M003,Member 3,member3@example.com,9000000003\n'
+        )
+
+        out = StringIO()
+        with mock.patch('hackathon.management.commands.import_teams.verify_stored') as verify:
+            call_command('import_teams', csv_path=csv_path, dry_run=True, stdout=out)
+        verify.assert_not_called()
+        for line in (
+            'Teams: 1 to create, 0 to rename/reactivate, stored passwords not checked',
+            'Members: 1 to create, 2 to update, 1 to delete',
+            'create Team 2',
+            'update member M003 (Team 3 -> Team 2)',
+            'delete member M009 from Team 1',
+        ):
+            self.assertIn(line, out.getvalue())
+        self.assertFalse(AppUser.objects.filter(team_no=2).exists())
+
+        call_command('import_teams', csv_path=csv_path, workers=2, batch_size=1, stdout=StringIO())
+        team2 = AppUser.objects.get(team_no=2)
+        self.assertTrue(verify_stored('Team@002', StoredPassword.of(team2)))
+        self.assertEqual(
+            dict(AppUserMember.objects.values_list('member_id', 'user__team_no')), {'M001': 1, 'M002': 2, 'M003': 2}
+        )
+        self.assertEqual(AppUserMember.objects.get(member_id='M001').name, 'Renamed')
+        self.assertEqual(AppUserMember.objects.get(id=moving.id).user_id, team2.id)
+
+    def test_only_hashes_that_no_longer_verify_are_replaced(self):
+        first, _ = _create_member(1)
+        second, _ = _create_member(2)
+        AppUser.objects.filter(id=second.user_id).update(**PBKDF2Hasher(1000).encode('old password').as_fields())
+        csv_path = self._csv('Team 1,M001,Member 1,,9000000001\nTeam 2,M002,Member 2,,9000000002\n')
+
+        out = StringIO()
+        call_command('import_teams', csv_path=csv_path, workers=0, stdout=out)
+        self.assertIn('0 to rename/reactivate, 1 to re-hash', out.getvalue())
+        self.assertTrue(verify_stored('Team@002', StoredPassword.of(AppUser.objects.get(id=second.user_id))))
+        self.assertEqual(AppUser.objects.get(id=first.user_id).password_hash_b64, first.user.password_hash_b64)
+
+    def test_append_only_does_not_claim_to_have_checked_passwords(self):
+        _create_member(1)
+        out = StringIO()
+        call_command('import_teams', csv_path=self._csv('Team 1,M002,Member 2,,9000000002\n'), append_only=True, workers=0, stdout=out)
+        self.assertIn('0 to rename/reactivate, stored passwords not checked', out.getvalue())
+        self.assertIn('Passwords hashed: 0; stored hashes not checked: 1', out.getvalue())
+
+    def test_append_only_rejects_members_of_other_teams(self):
+        _create_member(1)
+        csv_path = self._csv('Team 2,M001,Member 1,,9000000001\n')
+        with self.assertRaisesMessage(CommandError, 'already exists under Team 1'):
+            call_command('import_teams', csv_path=csv_path, append_only=True, workers=0, stdout=StringIO())
+        self.assertFalse(AppUser.objects.filter(team_no=2).exists())
+
+
+class ReaperTests(TransactionTestCase):
+    def test_deletes_dead_rows_past_retention_in_batches(self):
+        member, _ = _create_member(1)
+        live = AuthSession.objects.get()
+        now = timezone.now()
+        old, recent = now - timedelta(hours=3), now - timedelta(minutes=30)
+
+        def session(**fields):
+            return AuthSession.objects.create(
+                user=member.user, member=member, token_hash=create_session_token(), **{'expires_at': now + timedelta(days=1), **fields}
+            )
+
+        for _ in range(3):
+            session(expires_at=old)
+        session(expires_at=now + timedelta(days=1), revoked_at=old)
+        kept_sessions = {live.id, session(expires_at=recent).id, session(revoked_at=recent).id}
+        OtpChallenge.objects.create(identifier='a', expires_at=old)
+        OtpChallenge.objects.create(identifier='a', expires_at=now + timedelta(minutes=5), consumed_at=old)
+        kept_challenge = OtpChallenge.objects.create(identifier='a', expires_at=now + timedelta(minutes=5))
+
+        dry = reap(retention=timedelta(hours=1), batch_size=2, pause=0, dry_run=True)
+        self.assertEqual([(r.model, r.deleted) for r in dry], [('AuthSession', 4), ('OtpChallenge', 2)])
+        self.assertEqual(AuthSession.objects.count(), 7)
+
+        sessions, challenges = reap(retention=timedelta(hours=1), batch_size=2, pause=0)
+        self.assertEqual((sessions.deleted, sessions.batches, challenges.deleted), (4, 2, 2))
+        self.assertEqual(set(AuthSession.objects.values_list('id', flat=True)), kept_sessions)
+        self.assertEqual(list(OtpChallenge.objects.values_list('id', flat=True)), [kept_challenge.id])
+
+    def test_command_reports_rows_per_second(self):
+        OtpChallenge.objects.create(identifier='a', expires_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command('reap_auth', retention_hours=1, stdout=out)
+        self.assertIn('OtpChallenge: 1 rows deleted in 1 batches', out.getvalue())
+        self.assertFalse(OtpChallenge.objects.exists())
+
+
+class RateLimitTests(TransactionTestCase):
+    def test_token_bucket_refills_evenly(self):
+        backend = InMemoryBackend()
+        with mock.patch('hackathon.ratelimit.time.monotonic', return_value=100.0) as now:
+            self.assertEqual([backend.hit('k', 2, 60), backend.hit('k', 2, 60)], [0, 0])
+            self.assertAlmostEqual(backend.hit('k', 2, 60), 30.0)
+            now.return_value = 130.0
+            self.assertEqual(backend.hit('k', 2, 60), 0)
+            self.assertGreater(backend.hit('k', 2, 60), 0)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rl'}})
+    def test_sliding_window_in_the_shared_cache(self):
+        backend = CacheBackend()
+        with mock.patch('hackathon.ratelimit.time.time', return_value=6000.0 + 45) as now:
+            self.assertEqual([backend.hit('k', 2, 60), backend.hit('k', 2, 60)], [0, 0])
+            self.assertAlmostEqual(backend.hit('k', 2, 60), 15.0)
+            # A quarter into the next window, 3 * 0.75 of the last one still counts
+            now.return_value = 6060.0 + 15
+            self.assertGreater(backend.hit('k', 2, 60), 0)
+            now.return_value = 6060.0 + 59
+            self.assertEqual(backend.hit('k', 3, 60), 0)
+
+    @override_settings(RATE_LIMITS={'otp_request': {'ip': '5/m', 'identifier': '1/m'}})
+    def test_otp_request_is_shed_before_db_and_gateway_work(self):
+        member, _ = _create_member(1)
+        body = json.dumps({'channel': 'whatsapp', 'phone': member.phone})
+        with mock.patch('hackathon.views.rate_limiter', RateLimiter(InMemoryBackend())), \
+                mock.patch('hackathon.views.dispatch_otp') as dispatch, \
+                mock.patch('hackathon.auth.dispatch_otp', dispatch):
+            self.assertEqual(Client().post('/api/otp/request', body, content_type='application/json').status_code, 200)
+            with CaptureQueriesContext(connection) as queries:
+                response = Client().post('/api/otp/request', body, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual((len(queries), dispatch.call_count), (0, 1))
+
+    @override_settings(RATE_LIMITS={'respond': {'member': '1/m', 'ip': '2/m'}})
+    def test_teams_behind_one_address_are_limited_one_by_one(self):
+        members = [_create_member(team_no) for team_no in range(1, 4)]
+        round_obj = GameRound.objects.create(creator=members[0][0].user, question='Favourite drink?')
+        url = f'/api/rounds/{round_obj.id}/respond'
+
+        def respond(word, token=None):
+            headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+            return Client().post(url, {'word': word}, 'application/json', **headers).status_code
+
+        with mock.patch('hackathon.views.rate_limiter', RateLimiter(InMemoryBackend())):
+            self.assertEqual([respond('tea', token) for _, token in members], [201, 201, 201])
+            self.assertEqual(respond('coffee', members[0][1]), 429)
+            self.assertEqual([respond('milk'), respond('milk'), respond('milk')], [201, 201, 429])
+
+
+class IdentityIndexTests(TransactionTestCase):
+    @override_settings(SESSION_REVOCATION_POLL_SECONDS=60)
+    def test_resolves_every_team_of_a_login_in_one_probe_then_from_cache(self):
+        first, _ = _create_member(2)
+        second, _ = _create_member(1)
+        AppUserMember.objects.filter(id=second.id).update(phone=first.phone)
+        AppUserMember.objects.filter(id=first.id).update(email=' Member2@Example.COM ')
+        AppUserMember.objects.get(id=first.id).save()  # save() keeps email_normalized in step
+        session_cache.poll()  # Not due again during the test
+
+        with self.assertNumQueries(1):
+            identity = identity_cache.resolve(PHONE, first.phone)
+        self.assertEqual([m.user.team_no for m in identity.members], [1, 2])
+        self.assertEqual(identity.for_team(2).members[0].id, first.id)
+        with self.assertNumQueries(0):
+            identity_cache.resolve(PHONE, first.phone)
+
+        identity_cache.invalidate_users([first.user_id])
+        AppUser.objects.filter(id=first.user_id).update(is_active=False)
+        self.assertEqual([m.id for m in identity_cache.resolve(PHONE, first.phone).members], [second.id])
+
+        AppUser.objects.filter(id=first.user_id).update(is_active=True)
+        response = Client().post(
+            '/api/login', json.dumps({'username': 'MEMBER2@example.com', 'password': 'Team@002'}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SESSION_REVOCATION_POLL_SECONDS=0)
+    def test_a_team_changed_by_another_process_drops_cached_identities(self):
+        first, _ = _create_member(1)
+        second, _ = _create_member(2)
+        session_cache.poll()
+        self.assertEqual(len(identity_cache.resolve(PHONE, first.phone).members), 1)
+
+        # What import_teams does in another process: team 2 gains a member with the same phone
+        AppUserMember.objects.create(user=second.user, member_id='M003', name='Member 3', email=None, phone=first.phone)
+        AppUser.objects.filter(id=second.user_id).update(updated_at=timezone.now())
+        self.assertEqual([m.user.team_no for m in identity_cache.resolve(PHONE, first.phone).members], [1, 2])
+
+    def test_otp_request_lists_the_teams_of_a_shared_phone(self):
+        first, _ = _create_member(2)
+        second, _ = _create_member(1)
+        AppUserMember.objects.filter(id=second.id).update(phone=first.phone)
+        response = Client().post(
+            '/api/otp/request', json.dumps({'channel': 'whatsapp', 'phone': first.phone}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            response.json()['teams'], [{'team_no': 1, 'username': 'Team 1'}, {'team_no': 2, 'username': 'Team 2'}]
+        )
+
+
+@override_settings(METRICS_TOKEN='scrape-me')
+class MetricsTests(TransactionTestCase):
+    def setUp(self):
+        member, self.token = _create_member(1)
+        self.round_obj = GameRound.objects.create(creator=member.user, question='Pick a word?')
+        metrics.clear()
+
+    def test_counts_queries_and_bytes_per_url_name(self):
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/rounds/{self.round_obj.id}/leaderboard')
+        query_count = len(queries)  # later requests reset the connection's query log
+
+        self.assertEqual(client.get('/api/_metrics').status_code, 401)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(client.get('/api/_metrics', HTTP_AUTHORIZATION='Bearer scrape-me').status_code, 404)
+        text = client.get('/api/_metrics', HTTP_AUTHORIZATION='Bearer scrape-me').content.decode()
+        view = 'view="api_leaderboard"'
+        self.assertIn(f'wordcloud_requests_total{{{view},status="200"}} 1', text)
+        self.assertIn(f'wordcloud_db_queries_per_request_sum{{{view}}} {query_count}', text)
+        self.assertIn(f'wordcloud_response_bytes_total{{{view}}} {len(response.content)}', text)
+        self.assertIn(f'wordcloud_request_duration_seconds_bucket{{{view},le="+Inf"}} 1', text)
+        self.assertIn('wordcloud_ingest_duplicates_dropped_total 0', text)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('hackathon.metrics', 'WARNING') as logs:
+            Client().get('/api/rounds/my', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertIn('(api_my_rounds) -> 200', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
@@ -1,25 +1,36 @@
+from django.conf import settings
 from django.urls import path
 
+from . import async_views, views
 from .views import (
-    ApiLoginView, ApiLogoutView, ApiMeView, ApiOtpRequestView, ApiOtpVerifyView, HealthView,
-    ApiCreateRoundView, ApiMyRoundsView, ApiRoundDetailView, ApiSubmitResponseView,
-    ApiWordCloudDataView, ApiRecordShareView, ApiLeaderboardView
+    ApiLoginView, ApiLogoutView, ApiMeView, ApiMetricsView, HealthView,
+    ApiCreateRoundView, ApiMyRoundsView, ApiCloseRoundView,
+    ApiWordCloudLayoutView, ApiWordCloudImageView, ApiRoundLiveView
 )
 
+# The hot round endpoints and the OTP endpoints have native async versions for ASGI deployments
+hot = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
     path('', HealthView.as_view(), name='health'),
+    path('api/_metrics', ApiMetricsView.as_view(), name='api_metrics'),
     path('api/login', ApiLoginView.as_view(), name='api_login'),
-    path('api/otp/request', ApiOtpRequestView.as_view(), name='api_otp_request'),
-    path('api/otp/verify', ApiOtpVerifyView.as_view(), name='api_otp_verify'),
+    path('api/otp/request', hot.ApiOtpRequestView.as_view(), name='api_otp_request'),
+    path('api/otp/verify', hot.ApiOtpVerifyView.as_view(), name='api_otp_verify'),
     path('api/me', ApiMeView.as_view(), name='api_me'),
     path('api/logout', ApiLogoutView.as_view(), name='api_logout'),
     
     # Word cloud game endpoints
     path('api/rounds/create', ApiCreateRoundView.as_view(), name='api_create_round'),
     path('api/rounds/my', ApiMyRoundsView.as_view(), name='api_my_rounds'),
-    path('api/rounds/<int:round_id>', ApiRoundDetailView.as_view(), name='api_round_detail'),
-    path('api/rounds/<int:round_id>/respond', ApiSubmitResponseView.as_view(), name='api_submit_response'),
-    path('api/rounds/<int:round_id>/wordcloud', ApiWordCloudDataView.as_view(), name='api_wordcloud_data'),
-    path('api/rounds/<int:round_id>/share', ApiRecordShareView.as_view(), name='api_record_share'),
-    path('api/rounds/<int:round_id>/leaderboard', ApiLeaderboardView.as_view(), name='api_leaderboard'),
+    path('api/rounds/<int:round_id>', hot.ApiRoundDetailView.as_view(), name='api_round_detail'),
+    path('api/rounds/<int:round_id>/close', ApiCloseRoundView.as_view(), name='api_close_round'),
+    path('api/rounds/<int:round_id>/respond', hot.ApiSubmitResponseView.as_view(), name='api_submit_response'),
+    path('api/rounds/<int:round_id>/wordcloud', hot.ApiWordCloudDataView.as_view(), name='api_wordcloud_data'),
+    path('api/rounds/<int:round_id>/wordcloud/layout', ApiWordCloudLayoutView.as_view(), name='api_wordcloud_layout'),
+    path('api/rounds/<int:round_id>/wordcloud.svg', ApiWordCloudImageView.as_view(), {'fmt': 'svg'}, name='api_wordcloud_svg'),
+    path('api/rounds/<int:round_id>/wordcloud.png', ApiWordCloudImageView.as_view(), {'fmt': 'png'}, name='api_wordcloud_png'),
+    path('api/rounds/<int:round_id>/share', hot.ApiRecordShareView.as_view(), name='api_record_share'),
+    path('api/rounds/<int:round_id>/leaderboard', hot.ApiLeaderboardView.as_view(), name='api_leaderboard'),
+    path('api/rounds/<int:round_id>/live', ApiRoundLiveView.as_view(), name='api_round_live'),
 ]
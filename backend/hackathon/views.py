@@ -1,9 +1,16 @@
+import base64
 import json
+import logging
+import math
 import re
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from django.http import HttpRequest, JsonResponse
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.db import transaction
+from django.db.models import Q
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from django.utils import timezone
 from django.views import View
 from typing import Optional
@@ -16,9 +23,28 @@ from .auth import (
     hash_session_token,
     dispatch_otp,
     verify_otp_via_gateway,
-    verify_password,
 )
-from .models import AppUser, AppUserMember, AuthSession, OtpChallenge, GameRound, Response, ShareEvent, PlayerScore
+from .finalize import RoundClosed, close_round, round_leaderboard, round_words, round_words_since, snapshots
+from .ingest import DUPLICATE, QUEUED, batched_ingest_enabled, response_ingestor, store_response
+from .hashers import StoredPassword, get_hasher
+from .identity import EMAIL, PHONE, identity_cache
+from .layout import MAX_LAYOUT_WORDS, layouts, viewport_bucket
+from .leaderboard import leaderboards
+from .live import live_updates, sse_stream
+from .metrics import JsonResponse as TimedJsonResponse, metrics, metrics_authorized
+from .models import AppUser, AppUserMember, AuthSession, OtpChallenge, GameRound, Response, ShareEvent, normalize_email
+from .password_pool import LoginOverloaded, get_password_verifier
+from .ratelimit import client_ip, rate_limiter
+from .render import FORMATS, THEMES, render_key, rendered_cloud
+from .scores import add_points, increment_round
+from .session_cache import session_cache
+from .wordnorm import normalize_word
+
+
+logger = logging.getLogger(__name__)
+
+FINAL_MAX_AGE = 86400  # Seconds clients may cache responses about a closed round
+OTP_TTL = timedelta(minutes=5)
 
 
 def _normalize_phone(raw: str) -> str:
@@ -44,11 +70,113 @@ def _get_session(request: HttpRequest) -> Optional[AuthSession]:
         return None
 
     token_hash = hash_session_token(token)
-    return (
+    session_cache.poll()
+    session = session_cache.get(token_hash)
+    if session is not None:
+        return session
+
+    session = (
         AuthSession.objects.select_related('user', 'member')
         .filter(token_hash=token_hash, revoked_at__isnull=True, expires_at__gt=timezone.now())
         .first()
     )
+    if session is not None:
+        session_cache.set(session)
+    return session
+
+
+async def _get_session_async(request: HttpRequest) -> Optional[AuthSession]:
+    token = _get_bearer_token(request)
+    if not token:
+        return None
+
+    token_hash = hash_session_token(token)
+    if session_cache.poll_due():
+        await sync_to_async(session_cache.poll)()
+    session = session_cache.get(token_hash)
+    if session is not None:
+        return session
+
+    session = await (
+        AuthSession.objects.select_related('user', 'member')
+        .filter(token_hash=token_hash, revoked_at__isnull=True, expires_at__gt=timezone.now())
+        .afirst()
+    )
+    if session is not None:
+        session_cache.set(session)
+    return session
+
+
+def _gateway_failure(exc: OtpDispatchError | OtpVerifyError) -> JsonResponse:
+    if exc.retry_after is None:
+        return JsonResponse({'error': str(exc)}, status=502)
+    # The gateway is known to be down (or saturated); tell the client when to retry
+    response = JsonResponse({'error': str(exc)}, status=503)
+    response['Retry-After'] = str(max(1, round(exc.retry_after)))
+    return response
+
+
+def _throttled(scope: str, **keys: Optional[str]) -> Optional[JsonResponse]:
+    """A 429 if the request exceeds one of ``scope``'s rate limits (see hackathon/ratelimit.py)."""
+    retry_after = rate_limiter.check(scope, **keys)
+    if retry_after is None:
+        return None
+    response = JsonResponse({'error': 'Too many requests. Please try again later.'}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _round_etag(round_obj: GameRound) -> str:
+    return f'"{round_obj.id}-{round_obj.version}"'
+
+
+def _not_modified(request: HttpRequest, etag: str) -> Optional[HttpResponse]:
+    # Weak comparison: compressed responses carry the ETag as W/"..."
+    candidates = {candidate.removeprefix('W/') for candidate in parse_etags(request.headers.get('If-None-Match') or '')}
+    if etag not in candidates:
+        return None
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def _with_etag(response: HttpResponse, etag: str, *, final: bool = False, private: bool = False) -> HttpResponse:
+    """Set the ETag; ``final`` responses (closed rounds never change) may be cached for a day."""
+    response['ETag'] = etag
+    if final:
+        response['Cache-Control'] = f'{"private" if private else "public"}, max-age={FINAL_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _round_detail(round_obj: GameRound) -> dict:
+    return {
+        'id': round_obj.id,
+        'question': round_obj.question,
+        'status': round_obj.status,
+        'creator_id': round_obj.creator_id,
+        'response_count': round_obj.response_count,
+        'distinct_word_count': round_obj.distinct_word_count,
+        'share_count': round_obj.share_count,
+        'participant_count': round_obj.participant_count,
+        'created_at': round_obj.created_at.isoformat(),
+        'closed_at': round_obj.closed_at.isoformat() if round_obj.closed_at else None,
+    }
+
+
+def _encode_cursor(round_obj: GameRound) -> str:
+    raw = f'{round_obj.created_at.isoformat()}|{round_obj.id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> Optional[tuple[datetime, int]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at_raw, id_raw = raw.split('|', 1)
+        return datetime.fromisoformat(created_at_raw), int(id_raw)
+    except (ValueError, UnicodeError):
+        return None
 
 
 def _json_body(request: HttpRequest) -> dict:
@@ -65,6 +193,19 @@ class HealthView(View):
         return JsonResponse({'status': 'ok'})
 
 
+class ApiMetricsView(View):
+    """Request metrics in Prometheus text format, for scrapers holding ``METRICS_TOKEN``."""
+    def get(self, request: HttpRequest) -> HttpResponse:
+        authorized = metrics_authorized(request)
+        if authorized is None:
+            return JsonResponse({'error': 'Not found'}, status=404)
+        if not authorized:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        response = HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
 class ApiLoginView(View):
     def post(self, request: HttpRequest) -> JsonResponse:
         payload = _json_body(request)
@@ -74,37 +215,46 @@ class ApiLoginView(View):
         if not username_raw or not password:
             return JsonResponse({'error': 'Please enter username and password.'}, status=400)
 
-        members_qs = AppUserMember.objects.select_related('user').filter(user__is_active=True)
         if '@' in username_raw:
-            members_qs = members_qs.filter(email__iexact=username_raw)
+            kind, identifier = EMAIL, normalize_email(username_raw)
         else:
-            phone = _normalize_phone(username_raw)
-            if not phone:
+            kind, identifier = PHONE, _normalize_phone(username_raw)
+            if not identifier:
                 return JsonResponse({'error': 'Please enter username and password.'}, status=400)
-            members_qs = members_qs.filter(phone=phone)
 
-        members = list(members_qs)
+        throttled = _throttled('login', ip=client_ip(request), identifier=identifier)
+        if throttled is not None:
+            return throttled
+
+        members = identity_cache.resolve(kind, identifier).members
         if not members:
             return JsonResponse({'error': 'Invalid username or password.'}, status=401)
 
-        matched_user: Optional[AppUser] = None
-        matched_member: Optional[AppUserMember] = None
+        # Members of one team share the team's password: check each account once.
+        accounts: dict[int, AppUserMember] = {}
         for member in members:
-            user = member.user
-            if verify_password(
-                password,
-                salt_b64=user.password_salt_b64,
-                password_hash_b64=user.password_hash_b64,
-                iterations=user.password_iterations,
-            ):
-                matched_user = user
-                matched_member = member
-                break
-
-        if matched_user is None:
+            accounts.setdefault(member.user_id, member)
+        candidates = list(accounts.values())
+        try:
+            match = get_password_verifier().verify(
+                password, [StoredPassword.of(m.user) for m in candidates], upgrade_to=get_hasher()
+            )
+        except LoginOverloaded as exc:
+            response = JsonResponse({'error': 'Too many login attempts right now. Please try again.'}, status=503)
+            response['Retry-After'] = str(exc.retry_after)
+            return response
+
+        if match is None:
             return JsonResponse({'error': 'Invalid username or password.'}, status=401)
 
-        user = matched_user
+        matched_member = candidates[match.index]
+        user = matched_member.user
+        if match.rehashed is not None:
+            # Unless an import replaced the password meanwhile
+            AppUser.objects.filter(id=user.id, password_hash_b64=user.password_hash_b64).update(
+                **match.rehashed.as_fields()
+            )
+            identity_cache.invalidate_users([user.id])
 
         raw_token = create_session_token()
         times = get_session_times()
@@ -161,156 +311,181 @@ class ApiLogoutView(View):
         if session is None:
             return JsonResponse({'ok': True})
 
-        session.revoked_at = timezone.now()
-        session.save(update_fields=['revoked_at'])
+        session_cache.invalidate(session.token_hash)
+        AuthSession.objects.filter(id=session.id).update(revoked_at=timezone.now())
         return JsonResponse({'ok': True})
 
 
-class ApiOtpRequestView(View):
-    OTP_TTL = timedelta(minutes=5)
+def _otp_request_target(request: HttpRequest) -> JsonResponse | tuple[AppUserMember, str, str]:
+    """Validate an OTP request: an error response, or ``(member, channel, identifier)`` to send the OTP to."""
+    payload = _json_body(request)
+    channel = (payload.get('channel') or '').strip().lower()
+    phone = _normalize_phone(payload.get('phone') or payload.get('username') or '')
+    email = (payload.get('email') or payload.get('username') or '').strip()
+    team_no_raw = payload.get('team_no')
 
-    def post(self, request: HttpRequest) -> JsonResponse:
-        payload = _json_body(request)
-        channel = (payload.get('channel') or '').strip().lower()
-        phone = _normalize_phone(payload.get('phone') or payload.get('username') or '')
-        email = (payload.get('email') or payload.get('username') or '').strip()
-        team_no_raw = payload.get('team_no')
+    if channel not in {'whatsapp', 'email'}:
+        return JsonResponse({'error': 'Invalid OTP channel.'}, status=400)
 
-        if channel not in {'whatsapp', 'email'}:
-            return JsonResponse({'error': 'Invalid OTP channel.'}, status=400)
+    if channel == 'whatsapp' and not phone:
+        return JsonResponse({'error': 'Please enter mobile number.'}, status=400)
+    if channel == 'email' and not email:
+        return JsonResponse({'error': 'Please enter email id.'}, status=400)
 
-        if channel == 'whatsapp' and not phone:
-            return JsonResponse({'error': 'Please enter mobile number.'}, status=400)
-        if channel == 'email' and not email:
-            return JsonResponse({'error': 'Please enter email id.'}, status=400)
+    throttled = _throttled(
+        'otp_request', ip=client_ip(request), identifier=phone if channel == 'whatsapp' else email.lower()
+    )
+    if throttled is not None:
+        return throttled
 
+    team_no = None
+    if team_no_raw is not None and str(team_no_raw).strip() != '':
+        try:
+            team_no = int(team_no_raw)
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'Invalid team number.'}, status=400)
+
+    if channel == 'whatsapp':
+        identity = identity_cache.resolve(PHONE, phone)
+    else:
+        identity = identity_cache.resolve(EMAIL, normalize_email(email))
+    if team_no is not None:
+        identity = identity.for_team(team_no)
+
+    if not identity.members:
         if channel == 'whatsapp':
-            members_qs = (
-                AppUserMember.objects.select_related('user')
-                .filter(phone=phone)
-                .filter(user__is_active=True)
-            )
-        else:
-            members_qs = (
-                AppUserMember.objects.select_related('user')
-                .filter(email__iexact=email)
-                .filter(user__is_active=True)
-            )
+            return JsonResponse({'error': 'Mobile number not registered.'}, status=404)
+        return JsonResponse({'error': 'Email id not registered.'}, status=404)
 
-        if team_no_raw is not None and str(team_no_raw).strip() != '':
-            try:
-                team_no = int(team_no_raw)
-            except (TypeError, ValueError):
-                return JsonResponse({'error': 'Invalid team number.'}, status=400)
-            members_qs = members_qs.filter(user__team_no=team_no)
+    if len(identity.members) > 1:
+        identifier_label = 'mobile number' if channel == 'whatsapp' else 'email id'
+        return JsonResponse(
+            {
+                'error': f'Multiple team accounts found for this {identifier_label}. Please select team number.',
+                'teams': identity.teams,
+            },
+            status=409,
+        )
 
-        members = list(members_qs)
-        if not members:
-            if channel == 'whatsapp':
-                return JsonResponse({'error': 'Mobile number not registered.'}, status=404)
-            return JsonResponse({'error': 'Email id not registered.'}, status=404)
-
-        if len(members) > 1:
-            identifier_label = 'mobile number' if channel == 'whatsapp' else 'email id'
-            teams = []
-            for m in members:
-                teams.append({'team_no': m.user.team_no, 'username': m.user.username})
-            teams = sorted(teams, key=lambda t: (t['team_no'] is None, t['team_no'] or 0))
-            return JsonResponse(
-                {
-                    'error': f'Multiple team accounts found for this {identifier_label}. Please select team number.',
-                    'teams': teams,
-                },
-                status=409,
-            )
+    member = identity.members[0]
+
+    identifier = phone if channel == 'whatsapp' else (member.email or email)
+    return member, channel, identifier
+
+
+def _issue_otp_challenge(member: AppUserMember, identifier: str) -> JsonResponse:
+    """Record the challenge for an OTP the gateway has sent, replacing the member's open ones."""
+    now = timezone.now()
+    expires_at = now + OTP_TTL
+
+    with transaction.atomic():
+        OtpChallenge.objects.filter(
+            member=member,
+            identifier=identifier,
+            consumed_at__isnull=True,
+            expires_at__gt=now,
+        ).update(consumed_at=now)
 
-        member = members[0]
+        challenge = OtpChallenge.objects.create(
+            identifier=identifier,
+            member=member,
+            created_at=now,
+            expires_at=expires_at,
+        )
+
+    return JsonResponse({'challenge_id': challenge.id, 'expires_at': expires_at.isoformat()})
+
+
+def _otp_challenge(request: HttpRequest) -> JsonResponse | tuple[OtpChallenge, str]:
+    """Validate an OTP verification: an error response, or ``(challenge, otp)`` to check with the gateway."""
+    payload = _json_body(request)
+    challenge_id = payload.get('challenge_id')
+    otp = (payload.get('otp') or '').strip()
+
+    if not challenge_id or not otp:
+        return JsonResponse({'error': 'Please enter OTP.'}, status=400)
+
+    try:
+        challenge_id_int = int(challenge_id)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'Invalid OTP request.'}, status=400)
+
+    throttled = _throttled('otp_verify', ip=client_ip(request), challenge=str(challenge_id_int))
+    if throttled is not None:
+        return throttled
+
+    challenge = (
+        OtpChallenge.objects.select_related('member', 'member__user')
+        .filter(id=challenge_id_int)
+        .first()
+    )
+    if challenge is None or not challenge.is_valid() or challenge.member is None:
+        return JsonResponse({'error': 'Invalid or expired OTP.'}, status=401)
+    return challenge, otp
 
-        identifier = phone if channel == 'whatsapp' else (member.email or email)
+
+def _consume_otp_challenge(challenge: OtpChallenge) -> JsonResponse:
+    """Use up a challenge whose OTP the gateway accepted and start a session for its member."""
+    now = timezone.now()
+
+    with transaction.atomic():
+        updated = OtpChallenge.objects.filter(id=challenge.id, consumed_at__isnull=True).update(consumed_at=now)
+        if updated != 1:
+            return JsonResponse({'error': 'Invalid or expired OTP.'}, status=401)
+
+        member = challenge.member
+        user = member.user
+
+        raw_token = create_session_token()
+        times = get_session_times()
+        AuthSession.objects.create(
+            user=user,
+            member=member,
+            token_hash=hash_session_token(raw_token),
+            created_at=times.created_at,
+            expires_at=times.expires_at,
+        )
+
+    return JsonResponse(
+        {
+            'token': raw_token,
+            'expires_at': times.expires_at.isoformat(),
+            'user': {'id': user.id, 'username': user.username},
+        }
+    )
+
+
+class ApiOtpRequestView(View):
+    def post(self, request: HttpRequest) -> JsonResponse:
+        target = _otp_request_target(request)
+        if isinstance(target, HttpResponse):
+            return target
+        member, channel, identifier = target
 
         try:
             dispatch_otp(channel=channel, identifier=identifier, display_name=member.name)
         except OtpDispatchError as exc:
-            return JsonResponse({'error': str(exc)}, status=502)
-
-        now = timezone.now()
-        expires_at = now + self.OTP_TTL
-
-        with transaction.atomic():
-            OtpChallenge.objects.filter(
-                member=member,
-                identifier=identifier,
-                consumed_at__isnull=True,
-                expires_at__gt=now,
-            ).update(consumed_at=now)
-
-            challenge = OtpChallenge.objects.create(
-                identifier=identifier,
-                member=member,
-                created_at=now,
-                expires_at=expires_at,
-            )
+            return _gateway_failure(exc)
 
-        return JsonResponse({'challenge_id': challenge.id, 'expires_at': expires_at.isoformat()})
+        return _issue_otp_challenge(member, identifier)
 
 
 class ApiOtpVerifyView(View):
     def post(self, request: HttpRequest) -> JsonResponse:
-        payload = _json_body(request)
-        challenge_id = payload.get('challenge_id')
-        otp = (payload.get('otp') or '').strip()
-
-        if not challenge_id or not otp:
-            return JsonResponse({'error': 'Please enter OTP.'}, status=400)
-
-        try:
-            challenge_id_int = int(challenge_id)
-        except (TypeError, ValueError):
-            return JsonResponse({'error': 'Invalid OTP request.'}, status=400)
-
-        challenge = (
-            OtpChallenge.objects.select_related('member', 'member__user')
-            .filter(id=challenge_id_int)
-            .first()
-        )
-        if challenge is None or not challenge.is_valid() or challenge.member is None:
-            return JsonResponse({'error': 'Invalid or expired OTP.'}, status=401)
+        checked = _otp_challenge(request)
+        if isinstance(checked, HttpResponse):
+            return checked
+        challenge, otp = checked
 
         try:
             ok = verify_otp_via_gateway(identifier=challenge.identifier, otp=otp)
         except OtpVerifyError as exc:
-            return JsonResponse({'error': str(exc)}, status=502)
+            return _gateway_failure(exc)
 
         if not ok:
             return JsonResponse({'error': 'Invalid or expired OTP.'}, status=401)
 
-        now = timezone.now()
-
-        with transaction.atomic():
-            updated = OtpChallenge.objects.filter(id=challenge.id, consumed_at__isnull=True).update(consumed_at=now)
-            if updated != 1:
-                return JsonResponse({'error': 'Invalid or expired OTP.'}, status=401)
-
-            member = challenge.member
-            user = member.user
-
-            raw_token = create_session_token()
-            times = get_session_times()
-            AuthSession.objects.create(
-                user=user,
-                member=member,
-                token_hash=hash_session_token(raw_token),
-                created_at=times.created_at,
-                expires_at=times.expires_at,
-            )
-
-        return JsonResponse(
-            {
-                'token': raw_token,
-                'expires_at': times.expires_at.isoformat(),
-                'user': {'id': user.id, 'username': user.username},
-            }
-        )
+        return _consume_otp_challenge(challenge)
 
 
 class ApiCreateRoundView(View):
@@ -342,62 +517,127 @@ class ApiCreateRoundView(View):
                 'status': round_obj.status,
                 'created_at': round_obj.created_at.isoformat(),
             }, status=201)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return JsonResponse({'error': f'Internal server error: {str(e)}'}, status=500)
+        except Exception:
+            logger.exception('Creating a round failed')
+            return JsonResponse({'error': 'Internal server error'}, status=500)
 
 
 class ApiMyRoundsView(View):
-    """Get all rounds created by the authenticated user"""
+    """Get rounds created by the authenticated user, newest first.
+
+    Paginated with ``?limit=`` and the opaque ``next_cursor`` of the previous
+    page (``?cursor=``); ``?status=active|closed`` filters by status.
+    """
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
+    
     def get(self, request: HttpRequest) -> JsonResponse:
         session = _get_session(request)
         if session is None or not session.user.is_active:
             return JsonResponse({'error': 'Unauthorized'}, status=401)
         
-        rounds = GameRound.objects.filter(creator=session.user).order_by('-created_at')
+        try:
+            limit = int(request.GET.get('limit') or self.DEFAULT_LIMIT)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid limit'}, status=400)
+        limit = max(1, min(limit, self.MAX_LIMIT))
+        
+        rounds = GameRound.objects.filter(creator=session.user)
+        
+        status = request.GET.get('status')
+        if status:
+            if status not in dict(GameRound.STATUS_CHOICES):
+                return JsonResponse({'error': 'Invalid status'}, status=400)
+            rounds = rounds.filter(status=status)
+        
+        cursor = request.GET.get('cursor')
+        if cursor:
+            position = _decode_cursor(cursor)
+            if position is None:
+                return JsonResponse({'error': 'Invalid cursor'}, status=400)
+            created_at, last_id = position
+            rounds = rounds.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+        
+        # One query for the page; fetch one extra row to know whether another page exists
+        rounds = list(rounds.order_by('-created_at', '-id')[: limit + 1])
+        has_more = len(rounds) > limit
+        rounds = rounds[:limit]
         
         rounds_data = []
         for round_obj in rounds:
-            response_count = Response.objects.filter(round=round_obj).count()
             rounds_data.append({
                 'id': round_obj.id,
                 'question': round_obj.question,
                 'status': round_obj.status,
-                'response_count': response_count,
+                'response_count': round_obj.response_count,
                 'created_at': round_obj.created_at.isoformat(),
             })
         
-        return JsonResponse({'rounds': rounds_data})
+        return TimedJsonResponse({
+            'rounds': rounds_data,
+            'next_cursor': _encode_cursor(rounds[-1]) if has_more else None,
+        })
 
 
 class ApiRoundDetailView(View):
     """Get details of a specific round"""
     def get(self, request: HttpRequest, round_id: int) -> JsonResponse:
-        round_obj = GameRound.objects.filter(id=round_id).first()
+        round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
         if not round_obj:
             return JsonResponse({'error': 'Round not found'}, status=404)
         
-        response_count = Response.objects.filter(round=round_obj).count()
+        etag = _round_etag(round_obj)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
         
-        return JsonResponse({
-            'id': round_obj.id,
-            'question': round_obj.question,
-            'status': round_obj.status,
-            'response_count': response_count,
-            'created_at': round_obj.created_at.isoformat(),
-        })
+        return _with_etag(TimedJsonResponse(_round_detail(round_obj)), etag, final=round_obj.status == 'closed')
+
+
+class ApiCloseRoundView(View):
+    """Close a round (creator only) and freeze its final results"""
+    def post(self, request: HttpRequest, round_id: int) -> JsonResponse:
+        session = _get_session(request)
+        if session is None or not session.user.is_active:
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+        
+        round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
+        if not round_obj:
+            return JsonResponse({'error': 'Round not found'}, status=404)
+        if round_obj.creator_id != session.user.id:
+            return JsonResponse({'error': 'Only the creator can close this round'}, status=403)
+        
+        if batched_ingest_enabled():
+            # Write out responses this process has already accepted; other workers' queued
+            # ones still land after the close and rebuild the snapshot (see ingest.py)
+            response_ingestor.flush()
+        round_obj = close_round(round_obj.id)
+        live_updates.publish(round_obj.id)
+        return JsonResponse(_round_detail(round_obj))
 
 
 class ApiSubmitResponseView(View):
-    """Submit a single-word response to a round"""
+    """Submit a single-word response to a round
+
+    With batched ingest a 202 means the response was queued, not stored. Duplicates
+    are caught per process, so if another server process has already stored this
+    member's response, the queued one is dropped when its batch is written (logged
+    and counted in ``wordcloud_ingest_duplicates_dropped_total``).
+    """
     def post(self, request: HttpRequest, round_id: int) -> JsonResponse:
         try:
             # Get session but don't require it (allow anonymous responses)
             session = _get_session(request)
             member = session.member if session else None
+            # Members are limited one by one; the address limit is for anonymous requests
+            if member is not None:
+                throttled = _throttled('respond', member=str(member.id))
+            else:
+                throttled = _throttled('respond', ip=client_ip(request))
+            if throttled is not None:
+                return throttled
             
-            round_obj = GameRound.objects.filter(id=round_id).first()
+            round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
             if not round_obj:
                 return JsonResponse({'error': 'Round not found'}, status=404)
             
@@ -405,20 +645,23 @@ class ApiSubmitResponseView(View):
                 return JsonResponse({'error': 'This round is closed'}, status=400)
             
             payload = _json_body(request)
-            word = (payload.get('word') or '').strip()
-            
-            if not word:
-                return JsonResponse({'error': 'Word is required'}, status=400)
+            checked = normalize_word(str(payload.get('word') or ''))
+            if checked.error:
+                return JsonResponse({'error': checked.error}, status=400)
+            word_clean, word_normalized = checked.word, checked.normalized
             
-            # Validate single word (only letters, numbers, basic punctuation)
-            word_clean = re.sub(r'[^\w\s-]', '', word)
-            if ' ' in word_clean or '\t' in word_clean or '\n' in word_clean:
-                return JsonResponse({'error': 'Only one word allowed'}, status=400)
-            
-            if len(word_clean) == 0:
-                return JsonResponse({'error': 'Invalid word'}, status=400)
-            
-            word_normalized = word_clean.lower()
+            if batched_ingest_enabled():
+                # Write-behind: duplicates are caught in memory, the DB write happens in a batch
+                result = response_ingestor.submit(round_obj.id, member.id if member else None, word_clean, word_normalized)
+                if result == DUPLICATE:
+                    return JsonResponse({'error': 'You have already responded to this round'}, status=400)
+                if result == QUEUED:
+                    return JsonResponse({
+                        'success': True,
+                        'word': word_clean,
+                        'message': 'Response submitted successfully'
+                    }, status=202)
+                # Queue full: fall through to the synchronous write
             
             # Check if member already responded (only for authenticated users)
             if member:
@@ -426,64 +669,144 @@ class ApiSubmitResponseView(View):
                 if existing:
                     return JsonResponse({'error': 'You have already responded to this round'}, status=400)
             
-            with transaction.atomic():
-                # Create response (member can be None for anonymous)
-                Response.objects.create(
-                    round=round_obj,
-                    member=member,
-                    word=word_clean,
-                    word_normalized=word_normalized
-                )
-                
-                # Update or create player score (only for authenticated users)
-                if member:
-                    score, _ = PlayerScore.objects.get_or_create(
-                        round=round_obj,
-                        member=member,
-                        defaults={'response_points': 0, 'share_points': 0, 'total_points': 0}
-                    )
-                    score.response_points += 1
-                    score.total_points = score.response_points + score.share_points
-                    score.save()
+            if store_response(round_obj, member, word_clean, word_normalized) is None:
+                return JsonResponse({'error': 'This round is closed'}, status=400)
             
             return JsonResponse({
                 'success': True,
                 'word': word_clean,
                 'message': 'Response submitted successfully'
             }, status=201)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return JsonResponse({'error': f'Internal server error: {str(e)}'}, status=500)
+        except Exception:
+            logger.exception('Storing a response failed')
+            return JsonResponse({'error': 'Internal server error'}, status=500)
 
 
 class ApiWordCloudDataView(View):
-    """Get word cloud data (word frequencies) for a round"""
-    def get(self, request: HttpRequest, round_id: int) -> JsonResponse:
-        round_obj = GameRound.objects.filter(id=round_id).first()
+    """Get word cloud data (word frequencies) for a round.
+
+    Pass ``?since=<version>`` to receive only the words whose counts changed
+    after that version; unchanged polls get a 304 via ``If-None-Match``.
+    """
+    def get(self, request: HttpRequest, round_id: int) -> HttpResponse:
+        round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
         if not round_obj:
             return JsonResponse({'error': 'Round not found'}, status=404)
         
-        # Get word frequencies using aggregation
-        from django.db.models import Count
+        etag = _round_etag(round_obj)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
         
-        word_frequencies = (
-            Response.objects
-            .filter(round=round_obj)
-            .values('word_normalized')
-            .annotate(count=Count('id'))
-            .order_by('-count')
-        )
+        since_raw = request.GET.get('since')
+        since = None
+        if since_raw is not None:
+            try:
+                since = int(since_raw)
+            except ValueError:
+                return JsonResponse({'error': 'Invalid since version'}, status=400)
+        
+        # Closed rounds come from their snapshot (always in full); active ones from the
+        # in-process counts, which re-sync with Response on their own
+        final = round_obj.status == 'closed'
+        if final:
+            since = None
+        if since is None:
+            ranked, total = round_words(round_obj)
+        else:
+            ranked, total = round_words_since(round_obj, since)
         
         words_data = [
-            {'text': item['word_normalized'], 'count': item['count']}
-            for item in word_frequencies
+            {'text': text, 'count': count}
+            for text, count in ranked
         ]
         
-        return JsonResponse({
+        data = {
+            'version': round_obj.version,
             'words': words_data,
-            'total_responses': sum(w['count'] for w in words_data)
-        })
+            'total_responses': total
+        }
+        if since is not None:
+            data['since'] = since
+        return _with_etag(TimedJsonResponse(data), etag, final=final)
+
+
+class ApiWordCloudLayoutView(View):
+    """Word cloud placements for a viewport, computed and cached on the server.
+
+    ``?width=&height=`` is rounded to a viewport bucket; the response carries the
+    bucket size so the client can scale the boxes to its exact canvas.
+    """
+    def get(self, request: HttpRequest, round_id: int) -> HttpResponse:
+        try:
+            width = int(request.GET.get('width', 1280))
+            height = int(request.GET.get('height', 720))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid width or height'}, status=400)
+        
+        round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
+        if not round_obj:
+            return JsonResponse({'error': 'Round not found'}, status=404)
+        
+        bucket_w, bucket_h = viewport_bucket(width, height)
+        etag = f'"{round_obj.id}-{round_obj.version}-{bucket_w}x{bucket_h}"'
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        
+        ranked, total = round_words(round_obj, MAX_LAYOUT_WORDS)
+        data = layouts.layout(round_obj.id, round_obj.version, ranked, bucket_w, bucket_h)
+        return _with_etag(TimedJsonResponse({**data, 'total_responses': total}), etag, final=round_obj.status == 'closed')
+
+
+class ApiWordCloudImageView(View):
+    """Rendered word cloud for sharing/embedding: ``wordcloud.svg`` or ``wordcloud.png``.
+
+    Optional ``?width=&height=`` (rounded like the layout endpoint) and ``?theme=light|dark``.
+    """
+    def get(self, request: HttpRequest, round_id: int, fmt: str) -> HttpResponse:
+        try:
+            width = int(request.GET.get('width', 1200))
+            height = int(request.GET.get('height', 630))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid width or height'}, status=400)
+        theme = request.GET.get('theme', 'light')
+        if theme not in THEMES:
+            return JsonResponse({'error': f'Unknown theme: {theme}'}, status=400)
+        
+        round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
+        if not round_obj:
+            return JsonResponse({'error': 'Round not found'}, status=404)
+        
+        width, height = viewport_bucket(width, height)
+        etag = f'"{render_key(round_obj, fmt, width, height, theme)}"'
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        
+        _, body = rendered_cloud(round_obj, fmt, width, height, theme)
+        return _with_etag(HttpResponse(body, content_type=FORMATS[fmt]), etag, final=round_obj.status == 'closed')
+
+
+def _record_share(round_obj: GameRound, member: AppUserMember):
+    with transaction.atomic():
+        # Create share event
+        ShareEvent.objects.create(
+            round=round_obj,
+            member=member
+        )
+
+        # Update or create player score in one statement
+        score = add_points(round_id=round_obj.id, member_id=member.id, share_points=1)
+
+        # Round counters go last so the round row stays locked only until commit;
+        # a close that got there first rolls the share back
+        if not increment_round(
+            round_obj.id, active_only=True, version=1, share_count=1, participant_count=int(score.created)
+        ):
+            raise RoundClosed(round_obj.id)
+        transaction.on_commit(lambda: live_updates.publish(round_obj.id))
+    return score
 
 
 class ApiRecordShareView(View):
@@ -493,28 +816,18 @@ class ApiRecordShareView(View):
         if session is None or session.member is None:
             return JsonResponse({'error': 'Unauthorized'}, status=401)
         
-        round_obj = GameRound.objects.filter(id=round_id).first()
+        round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
         if not round_obj:
             return JsonResponse({'error': 'Round not found'}, status=404)
         
-        with transaction.atomic():
-            # Create share event
-            ShareEvent.objects.create(
-                round=round_obj,
-                member=session.member
-            )
-            
-            # Update or create player score
-            score, created = PlayerScore.objects.get_or_create(
-                round=round_obj,
-                member=session.member,
-                defaults={'response_points': 0, 'share_points': 1, 'total_points': 1}
-            )
-            
-            if not created:
-                score.share_points += 1
-                score.total_points = score.response_points + score.share_points
-                score.save(update_fields=['share_points', 'total_points', 'updated_at'])
+        # Points of a closed round are frozen in its snapshot
+        if round_obj.status != 'active':
+            return JsonResponse({'error': 'This round is closed'}, status=400)
+        
+        try:
+            score = _record_share(round_obj, session.member)
+        except RoundClosed:
+            return JsonResponse({'error': 'This round is closed'}, status=400)
         
         return JsonResponse({
             'success': True,
@@ -523,29 +836,61 @@ class ApiRecordShareView(View):
         })
 
 
+def _my_rank(round_obj: GameRound, member_id: int, k: int) -> tuple[Optional[dict], list[dict]]:
+    """A member's leaderboard entry and the ``k`` entries either side of it."""
+    # Closed rounds are ranked from their snapshot
+    snapshot = snapshots.get(round_obj)
+    if snapshot is not None:
+        return snapshot.rank_of(member_id), snapshot.around(member_id, k)
+    return leaderboards.rank_of(round_obj, member_id), leaderboards.around(round_obj, member_id, k)
+
+
 class ApiLeaderboardView(View):
-    """Get leaderboard for a round"""
-    def get(self, request: HttpRequest, round_id: int) -> JsonResponse:
-        round_obj = GameRound.objects.filter(id=round_id).first()
+    """Get leaderboard for a round.
+
+    With ``?me=1`` (authenticated) the response also carries the caller's own
+    rank (``me``) and the entries ranked just above and below it (``around``).
+    """
+    AROUND_SIZE = 2
+    
+    def get(self, request: HttpRequest, round_id: int) -> HttpResponse:
+        member = None
+        if request.GET.get('me') == '1':
+            session = _get_session(request)
+            if session is None or session.member is None:
+                return JsonResponse({'error': 'Unauthorized'}, status=401)
+            member = session.member
+        
+        round_obj = GameRound.objects.filter(id=round_id).defer('snapshot').first()
         if not round_obj:
             return JsonResponse({'error': 'Round not found'}, status=404)
         
-        scores = (
-            PlayerScore.objects
-            .filter(round=round_obj)
-            .select_related('member')
-            .order_by('-total_points', '-updated_at')[:10]
-        )
+        etag = _round_etag(round_obj)
+        if member is not None:
+            etag = f'"{round_obj.id}-{round_obj.version}-m{member.id}"'
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
         
-        leaderboard_data = []
-        for rank, score in enumerate(scores, start=1):
-            leaderboard_data.append({
-                'rank': rank,
-                'member_name': score.member.name,
-                'response_points': score.response_points,
-                'share_points': score.share_points,
-                'total_points': score.total_points,
-            })
+        data = {'version': round_obj.version, 'leaderboard': round_leaderboard(round_obj)}
+        if member is not None:
+            data['me'], data['around'] = _my_rank(round_obj, member.id, self.AROUND_SIZE)
         
-        return JsonResponse({'leaderboard': leaderboard_data})
+        response = _with_etag(
+            TimedJsonResponse(data), etag, final=round_obj.status == 'closed', private=member is not None
+        )
+        if member is not None:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
 
+class ApiRoundLiveView(View):
+    """Stream word cloud and leaderboard updates for a round as Server-Sent Events (ASGI only)"""
+    async def get(self, request: HttpRequest, round_id: int) -> HttpResponse:
+        if not await GameRound.objects.filter(id=round_id).aexists():
+            return JsonResponse({'error': 'Round not found'}, status=404)
+        
+        response = StreamingHttpResponse(sse_stream(round_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
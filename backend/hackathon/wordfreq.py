@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.db.models import Count, Max
+
+from .models import GameRound, Response
+
+
+VERIFY_INTERVAL_SECONDS = 2.0
+MAX_TRACKED_ROUNDS = 256
+
+
+@dataclass
+class _RoundCounts:
+    counts: dict[str, int] = field(default_factory=dict)
+    # Round version at (or after) which each word's count last changed.
+    stamps: dict[str, int] = field(default_factory=dict)
+    # Words counted locally by record() that have not been stamped yet.
+    pending: set[str] = field(default_factory=set)
+    total: int = 0
+    last_response_id: int = 0
+    version: int = -1
+    words_revision: int = 0
+    verified_at: float = 0.0
+    ranked: Optional[list[tuple[str, int]]] = None
+
+
+class WordFrequencyEngine:
+    """Per-round word counts kept in process and updated on every committed response.
+
+    When the round's ``version`` moves on, only the responses after the last one
+    counted are read. The counts are checked against the whole round (COUNT/MAX)
+    at most every ``verify_interval`` seconds, so that restarts, deletes and
+    out-of-order commits cannot leave them wrong for long. A new ``words_revision``
+    (stored keys rewritten by ``renormalize_words``) rebuilds them.
+    """
+
+    def __init__(self, *, verify_interval: float = VERIFY_INTERVAL_SECONDS, max_rounds: int = MAX_TRACKED_ROUNDS):
+        self.verify_interval = verify_interval
+        self.max_rounds = max_rounds
+        self._lock = threading.Lock()
+        self._rounds: OrderedDict[int, _RoundCounts] = OrderedDict()
+
+    def record(self, round_id: int, response_id: int, word_normalized: str) -> None:
+        with self._lock:
+            state = self._rounds.get(round_id)
+            if state is None or response_id <= state.last_response_id:
+                # Not loaded yet, or already part of the last sync.
+                return
+            self._count(state, word_normalized)
+            state.pending.add(word_normalized)
+            state.last_response_id = response_id
+
+    def top(self, round_id: int, version: int, limit: Optional[int] = None) -> tuple[list[tuple[str, int]], int]:
+        """Return ``(words, total_responses)`` with words ordered by count descending."""
+        state = self._sync(round_id, version)
+        with self._lock:
+            if state.ranked is None:
+                state.ranked = sorted(state.counts.items(), key=lambda item: (-item[1], item[0]))
+            ranked = state.ranked
+            total = state.total
+        if limit is not None:
+            ranked = ranked[:limit]
+        return ranked, total
+
+    def changed_since(self, round_id: int, version: int, since: int) -> tuple[list[tuple[str, int]], int]:
+        """Return ``(words, total_responses)`` for words whose count changed after ``since``."""
+        state = self._sync(round_id, version)
+        with self._lock:
+            changed = [
+                (word, count)
+                for word, count in state.counts.items()
+                if word in state.pending or state.stamps.get(word, since + 1) > since
+            ]
+            total = state.total
+        changed.sort(key=lambda item: (-item[1], item[0]))
+        return changed, total
+
+    def rebuild(self, round_id: int, version: int) -> _RoundCounts:
+        _, last_id = self._db_watermark(round_id)
+        rows = (
+            Response.objects
+            .filter(round_id=round_id, id__lte=last_id)
+            .values('word_normalized')
+            .annotate(count=Count('id'))
+        )
+        counts = {row['word_normalized']: row['count'] for row in rows}
+        # What changed before the rebuild is unknown, so every word counts as changed now.
+        stamp, words_revision = self._db_round(round_id)
+        state = _RoundCounts(
+            counts=counts,
+            stamps=dict.fromkeys(counts, stamp),
+            total=sum(counts.values()),
+            last_response_id=last_id,
+            version=version,
+            words_revision=words_revision,
+            verified_at=time.monotonic(),
+        )
+        with self._lock:
+            self._rounds[round_id] = state
+            self._rounds.move_to_end(round_id)
+            while len(self._rounds) > self.max_rounds:
+                self._rounds.popitem(last=False)
+        return state
+
+    def discard(self, round_id: int) -> None:
+        with self._lock:
+            self._rounds.pop(round_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rounds.clear()
+
+    def _sync(self, round_id: int, version: int) -> _RoundCounts:
+        with self._lock:
+            state = self._rounds.get(round_id)
+            if state is not None:
+                self._rounds.move_to_end(round_id)
+                moved = state.version < version or bool(state.pending)
+                due = time.monotonic() - state.verified_at >= self.verify_interval
+                if not moved and not due:
+                    return state
+        if state is None:
+            return self.rebuild(round_id, version)
+
+        # A new version only needs the rows after the last one counted; the full
+        # COUNT/MAX check (deletes, lower ids committed late) waits until it is due.
+        db_total = db_last_id = None
+        if due:
+            db_total, db_last_id = self._db_watermark(round_id)
+        with self._lock:
+            since_id = state.last_response_id
+            pending, state.pending = state.pending, set()
+        if db_last_id is not None and db_last_id < since_id:
+            return self.rebuild(round_id, version)
+
+        rows = []
+        if db_last_id is None or db_last_id > since_id:
+            new_rows = Response.objects.filter(round_id=round_id, id__gt=since_id)
+            if db_last_id is not None:
+                new_rows = new_rows.filter(id__lte=db_last_id)
+            rows = list(new_rows.order_by('id').values_list('id', 'word_normalized'))
+        stamp = version
+        if moved or rows:
+            db_version, words_revision = self._db_round(round_id)
+            if words_revision != state.words_revision:
+                return self.rebuild(round_id, version)
+            if rows or pending:
+                stamp = db_version
+
+        with self._lock:
+            for response_id, word in rows:
+                if response_id > state.last_response_id:
+                    self._count(state, word)
+                    state.last_response_id = response_id
+                    pending.add(word)
+            for word in pending:
+                state.stamps[word] = stamp
+            consistent = db_total is None or state.total == db_total or state.last_response_id > db_last_id
+            if consistent:
+                state.version = max(state.version, version)
+                if due:
+                    state.verified_at = time.monotonic()
+        if not consistent:
+            # A lower id committed after a higher one, or rows were deleted.
+            return self.rebuild(round_id, version)
+        return state
+
+    @staticmethod
+    def _count(state: _RoundCounts, word: str) -> None:
+        state.counts[word] = state.counts.get(word, 0) + 1
+        state.total += 1
+        state.ranked = None
+
+    @staticmethod
+    def _db_watermark(round_id: int) -> tuple[int, int]:
+        agg = Response.objects.filter(round_id=round_id).aggregate(total=Count('id'), last_id=Max('id'))
+        return agg['total'] or 0, agg['last_id'] or 0
+
+    @staticmethod
+    def _db_round(round_id: int) -> tuple[int, int]:
+        """``(version, words_revision)``; read after the rows, so the version covers them."""
+        row = GameRound.objects.filter(id=round_id).values_list('version', 'words_revision').first()
+        return row or (0, 0)
+
+
+word_frequencies = WordFrequencyEngine()
@@ -0,0 +1,180 @@
+"""Validation and normalization of submitted words.
+
+A submission is cleaned (punctuation stripped), validated as a single word and
+then run through a configurable list of stages to get the key the word cloud
+groups by, so that "Café", "cafe" and "CAFE!" all count as ``cafe``. The cloud
+shows that key, so the defaults only fold case and accents and reject
+profanity. Plural folding (``'light_stem'``: "cafés" -> ``cafe``, but also
+"Redis" -> ``redi``) and rejecting stopwords (``'stopwords'``: "no", "me", "this")
+are opt-in. A stage takes the current form and returns the next one, or
+``None`` to reject the word. Results are memoized per ``WordNormalizer``.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+
+
+MAX_WORD_LENGTH = 100  # Response.word / Response.word_normalized max_length
+CACHE_SIZE = 8192
+_MAX_INPUT_LENGTH = 4 * MAX_WORD_LENGTH
+
+DEFAULT_STAGES = ('nfkc_casefold', 'fold_accents', 'block')
+
+# Rejected by the opt-in 'stopwords' stage: words that carry little meaning on their own
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have he her his i if in into is it its me my no not of on or our '
+    'she so than that the their them then there these they this to us was we were what when which who will with '
+    'you your'.split()
+)
+PROFANITY = frozenset(
+    'arse arsehole ass asshole bastard bitch bollocks bullshit cock crap cunt dick dickhead fuck fucker fucking '
+    'motherfucker piss prick pussy shit slut twat wank wanker whore'.split()
+)
+
+_DISALLOWED = re.compile(r'[^\w\s-]')
+_WHITESPACE = re.compile(r'\s')
+_COMBINING_DIACRITICS = re.compile(r'[\u0300-\u036f]+')
+
+
+@dataclass(frozen=True)
+class NormalizedWord:
+    word: str  # As submitted, punctuation stripped (what Response.word stores)
+    normalized: str  # Grouping key (what Response.word_normalized stores)
+    error: Optional[str] = None
+
+
+def nfkc_casefold(word: str) -> str:
+    return unicodedata.normalize('NFKC', word).casefold()
+
+
+def fold_accents(word: str) -> str:
+    # Only the Latin/Greek/Cyrillic combining block is dropped, so vowel signs in
+    # scripts such as Devanagari survive.
+    return unicodedata.normalize('NFC', _COMBINING_DIACRITICS.sub('', unicodedata.normalize('NFD', word)))
+
+
+def light_stem(word: str) -> str:
+    """Harman's S-stemmer: folds regular English plurals onto the singular."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith('ies') and not word.endswith(('eies', 'aies')):
+        return word[:-3] + 'y'
+    if word.endswith('es') and not word.endswith(('aes', 'ees', 'oes')):
+        return word[:-1]
+    if word.endswith('s') and not word.endswith(('us', 'ss')):
+        return word[:-1]
+    return word
+
+
+def _block(blocked: frozenset[str]) -> Callable[[str], Optional[str]]:
+    def block(word: str) -> Optional[str]:
+        return None if word in blocked else word
+    return block
+
+
+STAGES: dict[str, Callable[[str], str]] = {
+    'nfkc_casefold': nfkc_casefold,
+    'fold_accents': fold_accents,
+    'light_stem': light_stem,
+}
+_BLOCKING_STAGES = ('block', 'stopwords')
+
+
+class WordNormalizer:
+    """Runs the configured stages over a word.
+
+    ``'block'`` rejects words in ``blocked`` and ``'stopwords'`` those in
+    ``STOPWORDS``. Their word lists are passed through the stages before them when
+    the normalizer is built, so "FUCK" is caught like "fuck" (and, with
+    ``'light_stem'`` first, "Shits" like "shit").
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[str] = DEFAULT_STAGES,
+        *,
+        blocked: Iterable[str] = PROFANITY,
+        cache_size: int = CACHE_SIZE,
+    ):
+        self.stages = tuple(stages)
+        unknown = [name for name in self.stages if name not in _BLOCKING_STAGES and name not in STAGES]
+        if unknown:
+            raise ValueError(f'Unknown word normalization stage(s): {", ".join(unknown)}')
+        self._pipeline: tuple[Callable[[str], Optional[str]], ...] = ()
+        for name in self.stages:
+            if name in _BLOCKING_STAGES:
+                words = blocked if name == 'block' else STOPWORDS
+                stage = _block(frozenset(filter(None, (self._transform(word) for word in words))))
+            else:
+                stage = STAGES[name]
+            self._pipeline += (stage,)
+        self._cached_normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def normalize(self, raw: str) -> NormalizedWord:
+        if raw and len(raw) > _MAX_INPUT_LENGTH:
+            # Not worth a cache slot; cannot be valid after trimming and cleaning anyway.
+            return NormalizedWord('', '', 'Word is too long')
+        return self._cached_normalize(raw)
+
+    def cache_info(self):
+        return self._cached_normalize.cache_info()
+
+    def cache_clear(self) -> None:
+        self._cached_normalize.cache_clear()
+
+    def normalize_many(self, words: Iterable[str]) -> list[NormalizedWord]:
+        """Normalize a batch (e.g. historical ``Response.word`` values); repeats hit the cache."""
+        normalize = self.normalize
+        return [normalize(word) for word in words]
+
+    def _transform(self, word: str) -> Optional[str]:
+        for stage in self._pipeline:
+            word = stage(word)
+            if word is None:
+                return None
+        return word
+
+    def _normalize(self, raw: str) -> NormalizedWord:
+        word = unicodedata.normalize('NFC', (raw or '').strip())
+        if not word:
+            return NormalizedWord('', '', 'Word is required')
+
+        # Only letters, numbers, underscores and hyphens are kept
+        word = _DISALLOWED.sub('', word)
+        if _WHITESPACE.search(word):
+            return NormalizedWord(word, '', 'Only one word allowed')
+        if not word:
+            return NormalizedWord(word, '', 'Invalid word')
+        if len(word) > MAX_WORD_LENGTH:
+            return NormalizedWord(word, '', 'Word is too long')
+
+        normalized = self._transform(word)
+        if normalized is None:
+            return NormalizedWord(word, '', 'This word is not allowed')
+        if not normalized or len(normalized) > MAX_WORD_LENGTH:
+            return NormalizedWord(word, '', 'Invalid word')
+        return NormalizedWord(word, normalized)
+
+
+_normalizer: Optional[WordNormalizer] = None
+
+
+def get_normalizer() -> WordNormalizer:
+    """The normalizer configured by ``WORD_NORMALIZATION_STAGES`` and ``WORD_BLOCKLIST``."""
+    global _normalizer
+    if _normalizer is None:
+        blocked = PROFANITY | frozenset(getattr(settings, 'WORD_BLOCKLIST', ()))
+        _normalizer = WordNormalizer(getattr(settings, 'WORD_NORMALIZATION_STAGES', DEFAULT_STAGES), blocked=blocked)
+    return _normalizer
+
+
+def normalize_word(raw: str) -> NormalizedWord:
+    return get_normalizer().normalize(raw)
+
+
+def normalize_many(words: Iterable[str]) -> list[NormalizedWord]:
+    return get_normalizer().normalize_many(words)
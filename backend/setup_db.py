@@ -1,36 +1,27 @@
-import os
-import sys
-import django
-from pathlib import Path
-
-# Setup Django
-sys.path.insert(0, str(Path(__file__).parent))
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
-django.setup()
-
-from django.db import connection
-
-print("Creating database tables...")
-
-# Read SQL file
-sql_file = Path(__file__).parent / 'create_tables.sql'
-with open(sql_file, 'r') as f:
-    sql_commands = f.read()
-
-# Split by semicolon and execute each statement
-with connection.cursor() as cursor:
-    for statement in sql_commands.split(';'):
-        statement = statement.strip()
-        if statement:
-            try:
-                cursor.execute(statement)
-                print(f"✓ Executed: {statement[:50]}...")
-            except Exception as e:
-                # Table might already exist
-                if 'already exists' in str(e).lower():
-                    print(f"⚠ Table already exists (skipping)")
-                else:
-                    print(f"✗ Error: {e}")
-
-print("\n✅ Database setup complete!")
-print("Starting Django server...")
+import os
+import sys
+import django
+from pathlib import Path
+
+# Setup Django
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+
+print("Creating database tables...")
+
+# The game tables used to come from create_tables.sql, outside migration state.
+# Such a database already has what migration 0002 creates: record it as applied.
+applied = MigrationRecorder(connection).applied_migrations()
+if 'hackathon_gameround' in connection.introspection.table_names() and ('hackathon', '0002_game_tables') not in applied:
+    print("⚠ Game tables were created by create_tables.sql; marking migration 0002 as applied")
+    call_command('migrate', 'hackathon', '0002', fake=True)
+
+call_command('migrate')
+
+print("\n✅ Database setup complete!")
+print("Starting Django server...")
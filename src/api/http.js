@@ -1,4 +1,4 @@
-function resolveUrl(path) {
+export function resolveUrl(path) {
   if (typeof path !== 'string' || !path) return path
   if (/^https?:\/\//i.test(path)) return path
 
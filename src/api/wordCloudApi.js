@@ -1,17 +1,25 @@
-import { httpGet, httpPost } from './http.js'
+import { httpGet, httpPost, resolveUrl } from './http.js'
 
 export async function createRound(question) {
   return httpPost('/api/rounds/create', { question })
 }
 
-export async function getMyRounds() {
-  return httpGet('/api/rounds/my')
+export async function getMyRounds({ cursor, status } = {}) {
+  const params = new URLSearchParams()
+  if (cursor) params.set('cursor', cursor)
+  if (status) params.set('status', status)
+  const query = params.toString()
+  return httpGet(query ? `/api/rounds/my?${query}` : '/api/rounds/my')
 }
 
 export async function getRoundDetails(roundId) {
   return httpGet(`/api/rounds/${roundId}`)
 }
 
+export async function closeRound(roundId) {
+  return httpPost(`/api/rounds/${roundId}/close`, {})
+}
+
 export async function submitResponse(roundId, word) {
   return httpPost(`/api/rounds/${roundId}/respond`, { word })
 }
@@ -20,10 +28,23 @@ export async function getWordCloudData(roundId) {
   return httpGet(`/api/rounds/${roundId}/wordcloud`)
 }
 
+export async function getWordCloudLayout(roundId, width, height) {
+  const params = new URLSearchParams({ width: Math.round(width), height: Math.round(height) })
+  return httpGet(`/api/rounds/${roundId}/wordcloud/layout?${params}`)
+}
+
+export function getWordCloudImageUrl(roundId, format = 'png', { theme = 'light' } = {}) {
+  return resolveUrl(`/api/rounds/${roundId}/wordcloud.${format}?theme=${theme}`)
+}
+
 export async function recordShare(roundId) {
   return httpPost(`/api/rounds/${roundId}/share`, {})
 }
 
-export async function getLeaderboard(roundId) {
-  return httpGet(`/api/rounds/${roundId}/leaderboard`)
+export async function getLeaderboard(roundId, { me = false } = {}) {
+  return httpGet(`/api/rounds/${roundId}/leaderboard${me ? '?me=1' : ''}`)
+}
+
+export function getLiveUpdatesUrl(roundId) {
+  return resolveUrl(`/api/rounds/${roundId}/live`)
 }
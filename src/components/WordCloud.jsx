@@ -1,4 +1,5 @@
 import { useEffect, useRef, useState } from 'react'
+import { getWordCloudLayout } from '../api/wordCloudApi.js'
 import './WordCloud.css'
 
 // Vibrant color palette for word cloud
@@ -8,10 +9,17 @@ const COLORS = [
     '#6C5B7B', '#F67280', '#355C7D', '#99B898', '#E84A5F'
 ]
 
-function WordCloud({ words }) {
+function colorFor(text) {
+    // Keyed by the word, so a word keeps its colour as the ranking changes
+    const hash = text.split('').reduce((acc, char) => (acc * 31 + char.charCodeAt(0)) >>> 0, 7)
+    return COLORS[hash % COLORS.length]
+}
+
+function WordCloud({ roundId, version }) {
     const canvasRef = useRef(null)
     const containerRef = useRef(null)
     const [dimensions, setDimensions] = useState({ width: 0, height: 0 })
+    const [layout, setLayout] = useState(null)
 
     useEffect(() => {
         if (containerRef.current) {
@@ -26,11 +34,29 @@ function WordCloud({ words }) {
         }
     }, [])
 
+    // Placements are computed (and cached per version and viewport size) on the server
     useEffect(() => {
-        if (words.length > 0 && dimensions.width && dimensions.height) {
+        if (!dimensions.width || !dimensions.height) return
+        let cancelled = false
+        const timer = setTimeout(async () => {
+            try {
+                const data = await getWordCloudLayout(roundId, dimensions.width, dimensions.height)
+                if (!cancelled) setLayout(data)
+            } catch (err) {
+                console.error('Failed to load word cloud layout:', err)
+            }
+        }, 150)
+        return () => {
+            cancelled = true
+            clearTimeout(timer)
+        }
+    }, [roundId, version, dimensions])
+
+    useEffect(() => {
+        if (layout && dimensions.width && dimensions.height) {
             drawWordCloud()
         }
-    }, [words, dimensions])
+    }, [layout, dimensions])
 
     function drawWordCloud() {
         const canvas = canvasRef.current
@@ -45,96 +71,27 @@ function WordCloud({ words }) {
         // Clear canvas
         ctx.clearRect(0, 0, width, height)
 
-        // Calculate font sizes
-        const maxCount = Math.max(...words.map(w => w.count))
-        const minFontSize = 16
-        const maxFontSize = Math.min(80, width / 8)
-
-        // Create word layout data
-        const wordData = words.map((word, index) => {
-            const fontSize = minFontSize + (word.count / maxCount) * (maxFontSize - minFontSize)
-            const color = COLORS[index % COLORS.length]
-            // Fixed rotation based on word text (not random, so it doesn't change)
-            // Use simple hash of word text to determine if vertical or horizontal
-            const hash = word.text.split('').reduce((acc, char) => acc + char.charCodeAt(0), 0)
-            const rotation = hash % 3 === 0 ? 90 : 0  // ~33% will be vertical
-            return {
-                text: word.text,
-                count: word.count,
-                fontSize,
-                color,
-                rotation,
-                x: 0,
-                y: 0,
-                width: 0,
-                height: 0
-            }
-        })
-
-        // Measure text dimensions
-        wordData.forEach(word => {
-            ctx.font = `bold ${word.fontSize}px Inter, sans-serif`
-            const metrics = ctx.measureText(word.text)
-            // Swap dimensions for vertical text
-            if (word.rotation === 90) {
-                word.width = word.fontSize
-                word.height = metrics.width
-            } else {
-                word.width = metrics.width
-                word.height = word.fontSize
+        // The layout is for a viewport bucket; scale it to the actual canvas
+        const scale = Math.min(width / layout.width, height / layout.height)
+        const offsetX = (width - layout.width * scale) / 2
+        const offsetY = (height - layout.height * scale) / 2
+
+        layout.words.forEach(word => {
+            const boxLength = (word.rotate === 90 ? word.height : word.width) * scale
+            let fontSize = word.font_size * scale
+            ctx.font = `bold ${fontSize}px Inter, sans-serif`
+            // Server-side text widths are estimates; shrink to fit the box if needed
+            const measured = ctx.measureText(word.text).width
+            if (measured > boxLength) {
+                fontSize *= boxLength / measured
             }
-        })
 
-        // Simple spiral placement algorithm
-        const centerX = width / 2
-        const centerY = height / 2
-        const placedWords = []
-
-        wordData.forEach(word => {
-            let placed = false
-            let angle = 0
-            let radius = 0
-            const angleStep = 0.1
-            const radiusStep = 5
-
-            while (!placed && radius < Math.max(width, height)) {
-                const x = centerX + radius * Math.cos(angle) - word.width / 2
-                const y = centerY + radius * Math.sin(angle) + word.height / 3
-
-                // Check collision with placed words
-                let collision = false
-                for (const placed of placedWords) {
-                    if (
-                        x < placed.x + placed.width + 10 &&
-                        x + word.width + 10 > placed.x &&
-                        y < placed.y + placed.height + 10 &&
-                        y + word.height + 10 > placed.y
-                    ) {
-                        collision = true
-                        break
-                    }
-                }
-
-                if (!collision && x >= 0 && x + word.width <= width && y >= 0 && y + word.height <= height) {
-                    word.x = x
-                    word.y = y
-                    placedWords.push(word)
-                    placed = true
-                }
-
-                angle += angleStep
-                radius += radiusStep * angleStep
-            }
-        })
-
-        // Draw words
-        placedWords.forEach(word => {
             ctx.save() // Save current state
 
-            ctx.font = `bold ${word.fontSize}px Inter, sans-serif`
-            ctx.fillStyle = word.color
-            ctx.textAlign = 'left'
-            ctx.textBaseline = 'top'
+            ctx.font = `bold ${fontSize}px Inter, sans-serif`
+            ctx.fillStyle = colorFor(word.text)
+            ctx.textAlign = 'center'
+            ctx.textBaseline = 'middle'
 
             // Add subtle shadow
             ctx.shadowColor = 'rgba(0, 0, 0, 0.1)'
@@ -142,20 +99,14 @@ function WordCloud({ words }) {
             ctx.shadowOffsetX = 2
             ctx.shadowOffsetY = 2
 
-            // Apply rotation if needed
-            if (word.rotation === 90) {
-                ctx.translate(word.x + word.width / 2, word.y + word.height / 2)
+            ctx.translate(
+                offsetX + (word.x + word.width / 2) * scale,
+                offsetY + (word.y + word.height / 2) * scale
+            )
+            if (word.rotate === 90) {
                 ctx.rotate(Math.PI / 2)
-                ctx.fillText(word.text, -word.height / 2, -word.width / 2)
-            } else {
-                ctx.fillText(word.text, word.x, word.y)
             }
-
-            // Reset shadow
-            ctx.shadowColor = 'transparent'
-            ctx.shadowBlur = 0
-            ctx.shadowOffsetX = 0
-            ctx.shadowOffsetY = 0
+            ctx.fillText(word.text, 0, 0)
 
             ctx.restore() // Restore state
         })
@@ -9,6 +9,8 @@ function Dashboard() {
     const navigate = useNavigate()
     const { user, member, signOut } = useAuth()
     const [rounds, setRounds] = useState([])
+    const [nextCursor, setNextCursor] = useState(null)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [loading, setLoading] = useState(true)
     const [showCreateModal, setShowCreateModal] = useState(false)
     const [menuOpen, setMenuOpen] = useState(false)
@@ -23,6 +25,7 @@ function Dashboard() {
             setLoading(true)
             const data = await getMyRounds()
             setRounds(data.rounds || [])
+            setNextCursor(data.next_cursor || null)
         } catch (err) {
             showToast(err?.message || 'Failed to load rounds', 'error')
         } finally {
@@ -30,6 +33,20 @@ function Dashboard() {
         }
     }
 
+    async function loadMoreRounds() {
+        if (!nextCursor) return
+        try {
+            setLoadingMore(true)
+            const data = await getMyRounds({ cursor: nextCursor })
+            setRounds((prev) => [...prev, ...(data.rounds || [])])
+            setNextCursor(data.next_cursor || null)
+        } catch (err) {
+            showToast(err?.message || 'Failed to load rounds', 'error')
+        } finally {
+            setLoadingMore(false)
+        }
+    }
+
     async function handleCreateRound(question) {
         try {
             const newRound = await createRound(question)
@@ -179,6 +196,18 @@ function Dashboard() {
                             ))}
                         </div>
                     )}
+
+                    {!loading && nextCursor && (
+                        <div className="rounds-load-more">
+                            <button
+                                className="btn btn-secondary"
+                                onClick={loadMoreRounds}
+                                disabled={loadingMore}
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </section>
 
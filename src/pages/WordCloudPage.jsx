@@ -4,8 +4,11 @@ import { useAuth } from '../auth/AuthContext.jsx'
 import {
     getRoundDetails,
     getWordCloudData,
+    closeRound,
     recordShare,
-    getLeaderboard
+    getLeaderboard,
+    getLiveUpdatesUrl,
+    getWordCloudImageUrl
 } from '../api/wordCloudApi.js'
 import WordCloud from '../components/WordCloud.jsx'
 import './WordCloudPage.css'
@@ -17,6 +20,7 @@ function WordCloudPage() {
     const [round, setRound] = useState(null)
     const [cloudData, setCloudData] = useState({ words: [], total_responses: 0 })
     const [leaderboard, setLeaderboard] = useState([])
+    const [myRank, setMyRank] = useState(null)
     const [loading, setLoading] = useState(true)
     const [toast, setToast] = useState(null)
     const pollIntervalRef = useRef(null)
@@ -24,19 +28,57 @@ function WordCloudPage() {
     useEffect(() => {
         loadData()
 
-        // Poll for updates every 3 seconds
-        pollIntervalRef.current = setInterval(() => {
-            loadWordCloudData()
-            loadLeaderboard()
-        }, 3000)
+        function startPolling() {
+            if (pollIntervalRef.current) return
+            // Poll for updates every 3 seconds
+            pollIntervalRef.current = setInterval(() => {
+                loadWordCloudData()
+                loadLeaderboard()
+            }, 3000)
+        }
+
+        // Prefer server-pushed updates; fall back to polling when they are unavailable
+        let source = null
+        if (typeof EventSource !== 'undefined') {
+            source = new EventSource(getLiveUpdatesUrl(roundId))
+            source.addEventListener('snapshot', (event) => applyLiveFrame(JSON.parse(event.data)))
+            source.addEventListener('delta', (event) => applyLiveFrame(JSON.parse(event.data)))
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    startPolling()
+                }
+            }
+        } else {
+            startPolling()
+        }
 
         return () => {
+            if (source) {
+                source.close()
+            }
             if (pollIntervalRef.current) {
                 clearInterval(pollIntervalRef.current)
+                pollIntervalRef.current = null
             }
         }
     }, [roundId])
 
+    function applyLiveFrame(frame) {
+        if (frame.type === 'snapshot') {
+            setCloudData({ version: frame.version, words: frame.words, total_responses: frame.total_responses })
+        } else {
+            setCloudData((prev) => {
+                const counts = new Map(prev.words.map((w) => [w.text, w.count]))
+                frame.words.forEach((w) => counts.set(w.text, w.count))
+                const words = Array.from(counts, ([text, count]) => ({ text, count }))
+                words.sort((a, b) => b.count - a.count || a.text.localeCompare(b.text))
+                return { version: frame.version, words, total_responses: frame.total_responses }
+            })
+        }
+        setLeaderboard(frame.leaderboard || [])
+        setRound((prev) => (prev && frame.status && prev.status !== frame.status ? { ...prev, status: frame.status } : prev))
+    }
+
     async function loadData() {
         try {
             setLoading(true)
@@ -63,8 +105,11 @@ function WordCloudPage() {
     }
 
     async function loadLeaderboard() {
-        const data = await getLeaderboard(roundId)
+        const data = await getLeaderboard(roundId, { me: Boolean(user) })
         setLeaderboard(data.leaderboard || [])
+        if (user) {
+            setMyRank(data.me || null)
+        }
     }
 
     function showToast(message, type = 'info') {
@@ -72,6 +117,18 @@ function WordCloudPage() {
         setTimeout(() => setToast(null), 3000)
     }
 
+    async function handleCloseRound() {
+        if (!window.confirm('Close this round? No more responses will be accepted.')) return
+        try {
+            const data = await closeRound(roundId)
+            setRound(data)
+            await Promise.all([loadWordCloudData(), loadLeaderboard()])
+            showToast('Round closed', 'success')
+        } catch (err) {
+            showToast(err?.message || 'Failed to close round', 'error')
+        }
+    }
+
     function copyShareLink() {
         const link = `${window.location.origin}/round/${roundId}/share`
         navigator.clipboard.writeText(link).then(async () => {
@@ -171,6 +228,12 @@ function WordCloudPage() {
                                 <span className={`stat-badge ${round?.status}`}>
                                     {round?.status || 'active'}
                                 </span>
+                                {round?.status === 'active' && user && round?.creator_id === user.id && (
+                                    <button className="btn btn-small btn-secondary" onClick={handleCloseRound}>
+                                        <i className="bi bi-lock"></i>
+                                        Close round
+                                    </button>
+                                )}
                             </div>
                         </div>
 
@@ -182,7 +245,7 @@ function WordCloudPage() {
                             </div>
                         ) : (
                             <div className="cloud-wrapper">
-                                <WordCloud words={cloudData.words} />
+                                <WordCloud roundId={roundId} version={cloudData.version} />
                             </div>
                         )}
 
@@ -214,6 +277,14 @@ function WordCloudPage() {
                                     <i className="bi bi-twitter"></i>
                                     Twitter
                                 </button>
+                                <a className="btn btn-medium btn-secondary" href={getWordCloudImageUrl(roundId, 'png')} download={`wordcloud-${roundId}.png`}>
+                                    <i className="bi bi-image"></i>
+                                    PNG
+                                </a>
+                                <a className="btn btn-medium btn-secondary" href={getWordCloudImageUrl(roundId, 'svg')} download={`wordcloud-${roundId}.svg`}>
+                                    <i className="bi bi-filetype-svg"></i>
+                                    SVG
+                                </a>
                             </div>
                         </div>
                     </div>
@@ -252,6 +323,12 @@ function WordCloudPage() {
                                 ))}
                             </div>
                         )}
+                        {myRank && (
+                            <div className="leaderboard-hint">
+                                <i className="bi bi-person-fill"></i>
+                                Your rank: #{myRank.rank} ({myRank.total_points} points)
+                            </div>
+                        )}
                         <div className="leaderboard-hint">
                             <i className="bi bi-info-circle"></i>
                             Earn +1 for responding, +1 per share